@@ -0,0 +1,91 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+CHAR FILTER BENCHMARK
+======================
+
+Checks that "has_allowed_chars" accepts exactly the same lines as the
+original per character test of the cleaner, on every character below 300 and
+a few beyond, then compares how fast both are on lines shaped like the parsed
+comments.
+
+    Z:\\alice>py benchmarks\\char_filter_benchmark.py 1000000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import random
+import time
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+from filters import has_allowed_chars, special_chars
+
+words = ('i think you are right but that is not what happened when my friend '
+         'tried it last year so maybe try again tomorrow').split()
+
+
+def reference_allowed_chars(line):
+    """The character test of the cleaner before it was compiled."""
+    return all(ord(char) < 123 and ord(char) not in special_chars for char in line)
+
+
+def get_comment_lines(line_count, rng):
+    """Lines shaped like the parsed comments, some with a rejected character."""
+    lines = []
+    for _ in range(line_count):
+        line = ' '.join(rng.choice(words) for _ in range(rng.randrange(3, 30)))
+        if rng.random() < 0.1:
+            line += rng.choice(['"', '(', '1', '@', '~', '\xe9'])
+        lines.append(line)
+    return lines
+
+
+def timed(function, lines):
+    start_time = time.perf_counter()
+    for line in lines:
+        function(line)
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+
+    chars = [chr(code) for code in range(300)] + ['\u2019', '\U0001f600', '\udcff']
+    lines = [''] + chars + [''.join(rng.choice(chars) for _ in range(rng.randrange(1, 4)))
+                            for _ in range(100000)]
+    for line in lines:
+        if has_allowed_chars(line) != reference_allowed_chars(line):
+            print('# Different result for {!r}.'.format(line))
+            sys.exit(1)
+    print('# Same result on {:,} lines.'.format(len(lines)))
+
+    comment_lines = get_comment_lines(line_count, rng)
+    reference_time = timed(reference_allowed_chars, comment_lines)
+    allowed_time = timed(has_allowed_chars, comment_lines)
+    print('# {:,.0f} lines/s before, {:,.0f} lines/s now, speedup {:.1f}x.'.format(
+        line_count / reference_time, line_count / allowed_time, reference_time / allowed_time))
@@ -0,0 +1,121 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+CODEC BENCHMARK
+================
+
+Compresses the same synthetic comment dump with every supported codec and
+compares how many lines per second are read from each, decompressing only and
+decompressing followed by "parse_raw_batch". The ".zst" dump is skipped when
+"zstandard" is not installed.
+
+    Z:\\alice>py benchmarks\\codec_benchmark.py 1000000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+import os
+import bz2
+import sys
+import json
+import lzma
+import shutil
+import tempfile
+import time
+import contextlib
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+from decompression import zstandard
+from parser import Parser, _read_raw_batches
+from synthetic_dump import generate_comments
+import alice_config as alice
+
+
+def get_dump_data(line_count):
+    """Synthetic dump lines, see "synthetic_dump"."""
+    return b''.join((json.dumps(comment) + '\n').encode('utf-8')
+                    for comment in generate_comments(line_count))
+
+
+def write_dump_files(dump_dir, data):
+    """Writes the dump once per codec and returns the file names."""
+    dump_files = []
+    with open(os.path.join(dump_dir, 'comments.ndjson'), 'wb') as dump_file:
+        dump_file.write(data)
+    dump_files.append('comments.ndjson')
+    with bz2.open(os.path.join(dump_dir, 'comments.bz2'), 'wb') as dump_file:
+        dump_file.write(data)
+    dump_files.append('comments.bz2')
+    with lzma.open(os.path.join(dump_dir, 'comments.xz'), 'wb') as dump_file:
+        dump_file.write(data)
+    dump_files.append('comments.xz')
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(
+            compression_params=zstandard.ZstdCompressionParameters.from_level(
+                19, window_log=31, enable_ldm=True))
+        with open(os.path.join(dump_dir, 'comments.zst'), 'wb') as dump_file:
+            dump_file.write(compressor.compress(data))
+        dump_files.append('comments.zst')
+    else:
+        print('# "zstandard" is not installed, skipping ".zst".')
+    return dump_files
+
+
+def timed(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+if __name__ == '__main__':
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    dump_dir = tempfile.mkdtemp()
+    alice.datasets_dir = dump_dir
+    alice.pparams_file = os.path.join(package_dir, 'engine', 'json', 'pparams.json')
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = Parser()
+
+    try:
+        dump_files = write_dump_files(dump_dir, get_dump_data(line_count))
+        for dump_file in dump_files:
+            def read():
+                for _ in _read_raw_batches(dump_file):
+                    pass
+
+            def parse():
+                for raw_batch in _read_raw_batches(dump_file):
+                    parser.parse_raw_batch(raw_batch)
+
+            read_time = timed(read)
+            parse_time = timed(parse, 1)
+            print('# {:<16} {:>6.1f} MB, read {:>10,.0f} lines/s, read and parse {:>8,.0f} lines/s.'.format(
+                dump_file, os.path.getsize(os.path.join(dump_dir, dump_file)) / 2 ** 20,
+                line_count / read_time, line_count / parse_time))
+    finally:
+        shutil.rmtree(dump_dir)
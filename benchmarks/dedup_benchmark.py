@@ -0,0 +1,127 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+DEDUP BENCHMARK
+================
+
+Makes random pairs, a share of which are copies of a few "copypasta" pairs
+with a token changed here and there, and runs them through the near-duplicate
+index. Reports how many of the copies were removed, how many of the other
+pairs were removed by mistake, how fast it is and the size of the index.
+Also checks that the fingerprints are the same with and without NumPy.
+
+    Z:\\alice>py benchmarks\\dedup_benchmark.py 200000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import argparse
+import random
+import time
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+import dedup
+
+words = ['word{}'.format(index) for index in range(5000)]
+
+
+def get_random_tokens(rng):
+    return [rng.choice(words) for _ in range(rng.randrange(8, 33))]
+
+
+def get_copy(tokens, rng, changes):
+    """Returns the tokens with a few of them replaced."""
+    tokens = list(tokens)
+    for _ in range(changes):
+        tokens[rng.randrange(len(tokens))] = rng.choice(words)
+    return tokens
+
+
+def get_pairs(pair_count, copy_share, rng):
+    """
+    Returns (source tokens, target tokens, copypasta index or None) for
+    every pair.
+    """
+    copypastas = [(get_random_tokens(rng), get_random_tokens(rng)) for _ in range(100)]
+    pairs = []
+    for _ in range(pair_count):
+        if rng.random() < copy_share:
+            copypasta_index = rng.randrange(len(copypastas))
+            source_tokens, target_tokens = copypastas[copypasta_index]
+            pairs.append((get_copy(source_tokens, rng, rng.randrange(0, 2)),
+                          get_copy(target_tokens, rng, rng.randrange(0, 2)), copypasta_index))
+        else:
+            pairs.append((get_random_tokens(rng), get_random_tokens(rng), None))
+    return pairs
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Measure the near-duplicate removal.')
+    arg_parser.add_argument('pairs', nargs='?', type=int, default=200000)
+    arg_parser.add_argument('--threshold', type=float, default=0.7)
+    arg_parser.add_argument('--copy-share', type=float, default=0.3)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    pairs = get_pairs(args.pairs, args.copy_share, rng)
+
+    hasher = dedup.MinHasher()
+    if dedup.np is not None:
+        numpy = dedup.np
+        for source_tokens, target_tokens, _ in pairs[:2000]:
+            shingles = hasher.get_shingles(source_tokens, target_tokens)
+            dedup.np = None
+            python_signature = hasher.get_signature(shingles)
+            dedup.np = numpy
+            if hasher.get_signature(shingles) != python_signature:
+                print('# Different fingerprints with NumPy.')
+                sys.exit(1)
+        print('# Same fingerprints with and without NumPy.')
+
+    dedup_index = dedup.NearDuplicateIndex(args.threshold, window=args.pairs)
+    seen_copypastas = set()
+    removed_copies = kept_copies = removed_others = 0
+    start_time = time.perf_counter()
+    for source_tokens, target_tokens, copypasta_index in pairs:
+        removed = dedup_index.is_duplicate(source_tokens, target_tokens)
+        if copypasta_index is None:
+            removed_others += removed
+        elif copypasta_index in seen_copypastas:
+            removed_copies += removed
+            kept_copies += not removed
+        seen_copypastas.add(copypasta_index)
+    elapsed_time = time.perf_counter() - start_time
+    memory = sys.getsizeof(dedup_index.signatures) + sys.getsizeof(dedup_index.buckets) + \
+        sum(sys.getsizeof(key) + sys.getsizeof(slots) + sum(sys.getsizeof(slot) for slot in slots)
+            for key, slots in dedup_index.buckets.items())
+
+    print('# {:,} of {:,} pairs removed in {:.1f} s, {:,.0f} pairs/s.'.format(
+        dedup_index.duplicate_count, len(pairs), elapsed_time, len(pairs) / elapsed_time))
+    print('# Copies removed {:,}, kept {:,}, other pairs removed {:,}.'.format(
+        removed_copies, kept_copies, removed_others))
+    print('# Index of {:.1f} MB, {:.0f} bytes per kept pair.'.format(
+        memory / 2 ** 20, memory / dedup_index.added_count))
@@ -0,0 +1,107 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+EXCEPTION INDEX BENCHMARK
+==========================
+
+Writes an exception file of random words and checks that the sorted index
+finds exactly the words the set finds, for exceptions and for other words.
+Then compares the memory both take and how many lookups per second they do.
+
+    Z:\\alice>py benchmarks\\exception_index_benchmark.py 1000000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+import exception_index
+
+letters = 'abcdefghijklmnopqrstuvwxyz\'-.'
+
+
+def get_random_words(word_count, rng):
+    return [''.join(rng.choice(letters) for _ in range(rng.randrange(1, 12)))
+            for _ in range(word_count)]
+
+
+def timed(exception_words, words):
+    start_time = time.perf_counter()
+    for word in words:
+        word in exception_words
+    return len(words) / (time.perf_counter() - start_time)
+
+
+def loaded(function, *args):
+    """Returns what the function returns and the memory it kept."""
+    tracemalloc.start()
+    result = function(*args)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, memory
+
+
+if __name__ == '__main__':
+    word_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    words = get_random_words(word_count, rng)
+    root_dir = tempfile.mkdtemp()
+    try:
+        exception_file = os.path.join(root_dir, 'exception.xames3')
+        with open(exception_file, 'w') as output_file:
+            for word in words:
+                output_file.write('{}\n'.format(word))
+
+        start_time = time.perf_counter()
+        exception_index.write_sorted_index(
+            exception_file, exception_index.get_index_path(exception_file))
+        print('# Index of {:,} words sorted in {:.1f} s.'.format(
+            word_count, time.perf_counter() - start_time))
+
+        exception_set, set_memory = loaded(exception_index.load_exception_words, exception_file)
+        index, index_memory = loaded(exception_index.load_exception_index, exception_file, 0)
+
+        members = rng.sample(words, min(word_count, 200000))
+        others = [word + '#' for word in members]
+        for word in members + get_random_words(len(members), rng):
+            if (word in index) != (word in exception_set):
+                print('# Different answers for {!r}.'.format(word))
+                sys.exit(1)
+        print('# Same answers on {:,} lookups.'.format(2 * len(members)))
+        print('# Memory: set {:.1f} MB, index {:.1f} MB.'.format(
+            set_memory / 2 ** 20, index_memory / 2 ** 20))
+        for label, lookup_words in [('exceptions', members), ('other words', others)]:
+            print('# Lookups of {}: {:,.0f}/s in the set, {:,.0f}/s in the index.'.format(
+                label, timed(exception_set, lookup_words), timed(index, lookup_words)))
+        index.close()
+    finally:
+        shutil.rmtree(root_dir)
@@ -0,0 +1,100 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+MATCHER BENCHMARK
+==================
+
+Compares the substring blacklist loop used by "post_qualifies" before with the
+Aho-Corasick matcher for 15, 150 and 1,500 patterns.
+
+    Z:\\alice>py benchmarks\\matcher_benchmark.py
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import json
+import random
+import string
+import timeit
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+from matcher import SubstringMatcher, ahocorasick
+
+pparams_file = os.path.join(package_dir, 'engine', 'json', 'pparams.json')
+words = ['the', 'a', 'is', 'it', 'that', 'this', 'you', 'for', 'and', 'not',
+         'what', 'just', 'like', 'really', 'think', 'people', 'good', 'time',
+         'would', 'know', 'because', 'there', 'they', 'about', 'lol', 'yeah']
+
+
+def loop_search(patterns, body):
+    """The blacklist check as it was done in "post_qualifies"."""
+    for substring in patterns:
+        if body.find(substring) >= 0:
+            return True
+    return False
+
+
+def get_patterns(count, rng):
+    """Blacklist from "pparams.json" padded with random substrings."""
+    with open(pparams_file, 'r') as params_file:
+        patterns = list(json.load(params_file)['substring_blacklist'])
+    while len(patterns) < count:
+        pattern = ''.join(rng.choice(string.ascii_lowercase)
+                          for _ in range(rng.randint(4, 10)))
+        if pattern not in patterns:
+            patterns.append(pattern)
+    return set(patterns[:count])
+
+
+def get_bodies(count, rng):
+    """Reddit like comment bodies between 8 and 240 characters."""
+    bodies = []
+    for _ in range(count):
+        body = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 45)))
+        bodies.append(body[:240])
+    return bodies
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    bodies = get_bodies(20000, rng)
+    print('# Matching {:,} bodies, pyahocorasick is {}.'.format(
+        len(bodies), 'installed' if ahocorasick is not None else 'not installed'))
+
+    for count in [15, 150, 1500]:
+        patterns = get_patterns(count, rng)
+        matcher = SubstringMatcher(patterns)
+        assert [loop_search(patterns, body) for body in bodies] == \
+            [matcher.search(body) for body in bodies]
+
+        loop_time = min(timeit.repeat(
+            lambda: [loop_search(patterns, body) for body in bodies], number=1, repeat=3))
+        matcher_time = min(timeit.repeat(
+            lambda: [matcher.search(body) for body in bodies], number=1, repeat=3))
+        print('# {:>5,} patterns: loop {:.2f} us/body, matcher ({}) {:.2f} us/body, speedup {:.1f}x.'.format(
+            count, loop_time / len(bodies) * 1e6, matcher.backend,
+            matcher_time / len(bodies) * 1e6, loop_time / matcher_time))
@@ -0,0 +1,120 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+NORMALIZER BENCHMARK
+=====================
+
+Checks that "get_formatted_line" gives exactly the same lines as the original
+cleaner formatting on a large random corpus, heavy on dots, dashes, spaces,
+tags and repeated punctuation, then compares how fast both are on it and on
+lines shaped like the parsed comments.
+
+    Z:\\alice>py benchmarks\\normalizer_benchmark.py 1000000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import re
+import sys
+import random
+import time
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+from filters import get_formatted_line
+
+pieces = ['.', '.', '..', '...', '-', '--', ' ', ' ', '  ', '\t', '\n', '\xa0', '\u2003',
+          '\x1c', "'", " ' ", '?', '??', '!', '!!', 'm', 'mm', 'mmm', '<', '>', '<b>',
+          '</i>', ' .', ' ?', ' !', 'word', 'Hello', 'it', 'x', '<a href>', '. .', '- -']
+words = ('i think you are right but that is not what happened when my friend '
+         'tried it last year so maybe try again tomorrow').split()
+
+
+def reference_formatted_line(line):
+    """The formatting of the cleaner before it was precompiled."""
+    pattern_dot = re.compile(r'\.\s+\.')
+    pattern_dash = re.compile(r'-\s+-')
+    pattern_html = re.compile(r'<.*?>')
+
+    while re.search(pattern_dot, line):
+        line = re.sub(pattern_dot, '..', line)
+
+    while re.search(pattern_dash, line):
+        line = re.sub(pattern_dash, '--', line)
+
+    line = re.sub('\\.{3,}', '... ', line)
+    line = re.sub('-{2,}', ' -- ', line)
+    line = line.replace(' \' ', '\'')
+    line = re.sub('\\s+', ' ', line).strip()
+    line = line.replace(' .', '.').replace(' ?', '?').replace(' !', '!')
+    line = re.sub(pattern_html, '', line)
+    line = re.sub('\\?{2,}', '?', line)
+    line = re.sub('!{2,}', '!', line)
+    line = re.sub('m{3,}', 'mm', line)
+    return line
+
+
+def get_random_lines(line_count, rng):
+    """Lines made of the pieces every formatting rule looks for."""
+    return [''.join(rng.choice(pieces) for _ in range(rng.randrange(1, 30)))
+            for _ in range(line_count)]
+
+
+def get_comment_lines(line_count, rng):
+    """Lines shaped like the parsed comments, mostly plain words."""
+    lines = []
+    for _ in range(line_count):
+        line = ' '.join(rng.choice(words) for _ in range(rng.randrange(3, 30)))
+        if rng.random() < 0.3:
+            line += rng.choice(['.', '?', '!', '...', ' - right', '!!', ' . .'])
+        lines.append(line)
+    return lines
+
+
+def timed(function, lines):
+    start_time = time.perf_counter()
+    for line in lines:
+        function(line)
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+
+    random_lines = get_random_lines(line_count, rng)
+    for line in random_lines:
+        if get_formatted_line(line) != reference_formatted_line(line):
+            print('# Different output for {!r}.'.format(line))
+            sys.exit(1)
+    print('# Same output on {:,} random lines.'.format(line_count))
+
+    comment_lines = get_comment_lines(line_count, rng)
+    for label, lines in [('random', random_lines), ('comment', comment_lines)]:
+        reference_time = timed(reference_formatted_line, lines)
+        formatted_time = timed(get_formatted_line, lines)
+        print('# {} lines: {:,.0f} lines/s before, {:,.0f} lines/s now, speedup {:.1f}x.'.format(
+            label, line_count / reference_time, line_count / formatted_time,
+            reference_time / formatted_time))
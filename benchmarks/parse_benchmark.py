@@ -0,0 +1,225 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+PARSE BENCHMARK
+================
+
+Runs "Parser.parse" on a synthetic dump in a temporary folder and reports the
+lines parsed per second, the peak resident memory and the time spent in every
+stage of the parse. The results are compared with the ones saved in
+"parse_baseline.json" under the same name, and the script exits with an error
+if any of them got worse by more than the tolerance.
+
+    Z:\\alice>py benchmarks\\parse_benchmark.py --lines 500000
+    Z:\\alice>py benchmarks\\parse_benchmark.py --name numpy --params "{\\"thread_builder\\": \\"numpy\\"}" --save
+
+## Stages:
+    * read: Decompressing and splitting the dump into lines.
+    * parse_raw_batch: Decoding and filtering lines, "post_qualifies"
+      included.
+    * post_qualifies: Filtering and cleaning the decoded lines.
+    * thread_builder: Linking the cached lines into conversations and
+      writing them.
+    * checkpoint: Saving the checkpoints.
+
+Each run measures a fresh process, so run one configuration at a time. With
+"parse_workers" above 1 the lines are parsed in other processes and only the
+read and thread builder stages are measured.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+import parser
+import alice_config as alice
+from synthetic_dump import write_synthetic_dump
+
+pparams_file = os.path.join(package_dir, 'engine', 'json', 'pparams.json')
+baseline_file = os.path.join(package_dir, 'benchmarks', 'parse_baseline.json')
+
+# Results compared with the baseline, a higher value is worse unless noted
+checked_stages = ['post_qualifies', 'thread_builder']
+
+
+class TimedParser(parser.Parser):
+    """Parser which adds up the time spent in every stage."""
+
+    def __init__(self):
+        parser.Parser.__init__(self)
+        self.stage_times = dict.fromkeys(
+            ['read', 'parse_raw_batch', 'post_qualifies', 'thread_builder', 'checkpoint'], 0.0)
+
+    def timed(self, stage, function, *args):
+        start_time = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.stage_times[stage] += time.perf_counter() - start_time
+
+    def get_raw_batch_enumerator(self, position=None):
+        raw_batches = parser.Parser.get_raw_batch_enumerator(self, position)
+        while True:
+            start_time = time.perf_counter()
+            raw_batch = next(raw_batches, None)
+            self.stage_times['read'] += time.perf_counter() - start_time
+            if raw_batch is None:
+                return
+            yield raw_batch
+
+    def parse_raw_batch(self, raw_batch):
+        return self.timed('parse_raw_batch', parser.Parser.parse_raw_batch, self, raw_batch)
+
+    def post_qualifies(self, json_object):
+        return self.timed('post_qualifies', parser.Parser.post_qualifies, self, json_object)
+
+    def process_cached_conversation_lines(self, *args):
+        return self.timed('thread_builder', parser.Parser.process_cached_conversation_lines, self, *args)
+
+    def write_cached_conversation_lines(self, *args):
+        return self.timed('thread_builder', parser.Parser.write_cached_conversation_lines, self, *args)
+
+    def build_cached_conversation_lines(self, *args):
+        return self.timed('thread_builder', parser.Parser.build_cached_conversation_lines, self, *args)
+
+    def save_checkpoint(self, *args):
+        return self.timed('checkpoint', parser.Parser.save_checkpoint, self, *args)
+
+
+def set_up_folders(root_dir, params):
+    """Points the parser at a temporary datasets folder and config file."""
+    with open(pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+    config_file.update(params)
+    alice.datasets_dir = os.path.join(root_dir, 'datasets')
+    alice.parsed_dir = os.path.join(alice.datasets_dir, 'parsed')
+    alice.pparams_file = os.path.join(root_dir, 'pparams.json')
+    alice.subreddits_file = os.path.join(root_dir, 'subreddits.xames3')
+    alice.cassiopeia_file = os.path.join(alice.parsed_dir, 'cassiopeia.xames3')
+    alice.cassiopeia_output_file = os.path.join(alice.parsed_dir, 'cassiopeia.bz2')
+    alice.cassiopeia_index_file = os.path.join(alice.parsed_dir, 'cassiopeia_index.sqlite')
+    alice.cassiopeia_checkpoint_file = os.path.join(alice.parsed_dir, 'cassiopeia.checkpoint')
+    os.makedirs(alice.parsed_dir)
+    with open(alice.pparams_file, 'w') as params_file:
+        json.dump(config_file, params_file)
+
+
+def run_benchmark(line_count, params, seed=0):
+    """Returns the results of parsing a synthetic dump."""
+    root_dir = tempfile.mkdtemp()
+    try:
+        set_up_folders(root_dir, params)
+        print('# Writing a synthetic dump of {:,} lines.'.format(line_count))
+        write_synthetic_dump(os.path.join(alice.datasets_dir, 'RC_synthetic.bz2'),
+                             line_count, seed=seed)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            timed_parser = TimedParser()
+            start_time = time.perf_counter()
+            timed_parser.parse()
+            elapsed_time = time.perf_counter() - start_time
+
+        peak_memory = alice.peak_memory_usage()
+        return {'lines': line_count,
+                'params': params,
+                'conversations': timed_parser.conversation_count,
+                'lines_per_second': round(line_count / elapsed_time),
+                'peak_rss_mb': round(peak_memory / 2 ** 20, 1) if peak_memory else None,
+                'stage_seconds': {stage: round(stage_time, 3)
+                                  for stage, stage_time in timed_parser.stage_times.items()}}
+    finally:
+        shutil.rmtree(root_dir)
+
+
+def get_regressions(result, baseline, tolerance):
+    """Lists the results which are worse than the baseline."""
+    regressions = []
+
+    def check(label, value, baseline_value, higher_is_worse=True):
+        if not value or not baseline_value:
+            return
+        change = value / baseline_value - 1 if higher_is_worse else baseline_value / value - 1
+        if change > tolerance:
+            regressions.append('{} {} against {} in the baseline'.format(label, value, baseline_value))
+
+    check('lines_per_second', result['lines_per_second'], baseline['lines_per_second'], False)
+    check('peak_rss_mb', result['peak_rss_mb'], baseline['peak_rss_mb'])
+    for stage in checked_stages:
+        check(stage, result['stage_seconds'][stage], baseline['stage_seconds'].get(stage))
+    return regressions
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Measure the parser on a synthetic dump.')
+    arg_parser.add_argument('--lines', type=int, default=200000)
+    arg_parser.add_argument('--name', default='default',
+                            help='name of the results in the baseline file')
+    arg_parser.add_argument('--params', default='{}',
+                            help='json object overriding "pparams.json"')
+    arg_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='largest change accepted against the baseline')
+    arg_parser.add_argument('--save', action='store_true',
+                            help='save the results as the new baseline')
+    args = arg_parser.parse_args()
+
+    result = run_benchmark(args.lines, json.loads(args.params))
+    print('# {:,} lines per second, {:,} conversations, peak memory {} MB.'.format(
+        result['lines_per_second'], result['conversations'], result['peak_rss_mb']))
+    for stage, stage_time in result['stage_seconds'].items():
+        print('#   {}: {:.2f} s.'.format(stage, stage_time))
+
+    baselines = {}
+    if os.path.isfile(baseline_file):
+        with open(baseline_file, 'r') as baseline_data:
+            baselines = json.load(baseline_data)
+
+    if args.save:
+        baselines[args.name] = result
+        with open(baseline_file, 'w') as baseline_data:
+            json.dump(baselines, baseline_data, indent=4, sort_keys=True)
+            baseline_data.write('\n')
+        print('# Saved as the "{}" baseline.'.format(args.name))
+    elif args.name in baselines:
+        baseline = baselines[args.name]
+        if (baseline['lines'], baseline['params']) != (result['lines'], result['params']):
+            print('# The "{}" baseline was measured with other settings.'.format(args.name))
+            sys.exit(1)
+        regressions = get_regressions(result, baseline, args.tolerance)
+        for regression in regressions:
+            print('# Regression: {}.'.format(regression))
+        if regressions:
+            sys.exit(1)
+        print('# No regressions against the "{}" baseline.'.format(args.name))
+    else:
+        print('# There is no "{}" baseline yet, save one with --save.'.format(args.name))
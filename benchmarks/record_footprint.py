@@ -0,0 +1,127 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+RECORD FOOTPRINT
+=================
+
+Measures with "tracemalloc" the bytes each cached comment costs the parser,
+its key included, for the previous conversation line with a "__dict__" and
+string ids in a dictionary, for the "__slots__" line in the memory comment
+store and for the packed comment store. The check fails if the packed store
+does not hold at least three times as many comments in the same memory.
+
+    Z:\\alice>py benchmarks\\record_footprint.py
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import json
+import random
+import tracemalloc
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+from comment_store import MemoryCommentStore, PackedCommentStore
+from parser import RedditConversationLine, encode_reddit_id
+
+record_count = 200000
+min_packed_ratio = 3
+author_count = 20000
+subreddits = ['AskReddit', 'funny', 'pics', 'gaming', 'worldnews', 'movies']
+
+
+class DictConversationLine(object):
+    """The conversation line as it was cached before."""
+
+    def __init__(self, json_object):
+        self.body = json_object['body']
+        self.score = json_object['ups'] - json_object['downs']
+        self.author = json_object['author']
+        self.parent_id = json_object['parent_id']
+        self.child_id = None
+
+
+def get_raw_lines(rng, line_count=record_count, user_count=author_count):
+    """Encoded json lines, so that every string is a fresh copy when decoded."""
+    raw_lines = []
+    for index in range(line_count):
+        raw_lines.append(json.dumps({
+            'body': 'x' * rng.randint(8, 120), 'ups': rng.randint(0, 50),
+            'downs': 0, 'author': 'user_{}'.format(rng.randrange(user_count)),
+            'subreddit': rng.choice(subreddits), 'created_utc': 1500000000 + index,
+            'name': 't1_c{}'.format(base36(10 ** 8 + index)),
+            'parent_id': 't1_c{}'.format(base36(10 ** 8 + rng.randrange(index + 1)))}))
+    return raw_lines
+
+
+def base36(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    text = ''
+    while number:
+        number, digit = divmod(number, 36)
+        text = digits[digit] + text
+    return text
+
+
+def measure(raw_lines, cache, cache_line):
+    """Bytes held per record by a cache filled from the raw lines."""
+    tracemalloc.start()
+    for raw_line in raw_lines:
+        json_object = json.loads(raw_line)
+        name, line = cache_line(json_object)
+        cache[name] = line
+        del json_object, line
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(cache)
+
+
+def get_packed_line(json_object):
+    return encode_reddit_id(json_object['name']), RedditConversationLine(json_object)
+
+
+def get_footprints(raw_lines):
+    """Bytes per record of the previous line, the memory and the packed store."""
+    return (measure(raw_lines, {}, lambda json_object: (
+                json_object['name'], DictConversationLine(json_object))),
+            measure(raw_lines, MemoryCommentStore(), get_packed_line),
+            measure(raw_lines, PackedCommentStore(RedditConversationLine), get_packed_line))
+
+
+if __name__ == '__main__':
+    raw_lines = get_raw_lines(random.Random(0))
+    dict_size, memory_size, packed_size = get_footprints(raw_lines)
+    body_size = sum(len(json.loads(raw_line)['body']) for raw_line in raw_lines) / record_count
+
+    print('# {:,} records, {:,} authors, bodies of {:.0f} characters.'.format(
+        record_count, author_count, body_size))
+    print('# __dict__ record: {:.0f} bytes.'.format(dict_size))
+    print('# Memory store: {:.0f} bytes, {:.1f}x more records.'.format(
+        memory_size, dict_size / memory_size))
+    print('# Packed store: {:.0f} bytes, {:.1f}x more records.'.format(
+        packed_size, dict_size / packed_size))
+    assert dict_size / packed_size >= min_packed_ratio, \
+        'the packed store holds less than {}x the records'.format(min_packed_ratio)
@@ -0,0 +1,195 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+SYNTHETIC DUMP
+===============
+
+Synthetic Dump writes comment lines in the format of the Reddit dumps, so the
+parser can be measured without downloading one. Comments of many threads are
+interleaved the way they are in a real dump, in the order they were posted.
+
+## Shape of the dump:
+    * thread_depth: Average number of comments in a thread. Most comments
+      reply to the previous one, the rest to an earlier comment of the same
+      thread.
+    * body_words: Median number of words of a body, lengths are log-normal
+      so some bodies are too short or too long to qualify.
+    * blacklist_rate: Share of the comments which are blacklisted, half by
+      the subreddit and half by a substring of the body.
+    * subreddit_skew: Zipf exponent of the subreddit sizes, 0 for subreddits
+      of the same size.
+
+    Z:\\alice>py benchmarks\\synthetic_dump.py Z:\\datasets\\RC_synthetic.bz2 --lines 1000000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import bz2
+import sys
+import json
+import lzma
+import argparse
+import bisect
+import itertools
+import random
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+import alice_config as alice
+
+pparams_file = os.path.join(package_dir, 'engine', 'json', 'pparams.json')
+
+words = ('the quick brown fox jumps over the lazy dog while we talk about '
+         'something else entirely and nobody seems to mind it at all i think '
+         'you are right but that is not what happened when my friend tried '
+         'it last year so maybe try again &amp; see').split()
+
+dump_writers = {
+    alice.bz2_file: lambda path: bz2.open(path, 'wb'),
+    alice.xz_file: lambda path: lzma.open(path, 'wb'),
+    alice.json_file: lambda path: open(path, 'wb'),
+    alice.ndjson_file: lambda path: open(path, 'wb'),
+}
+
+
+def base36(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    encoded = ''
+    while True:
+        number, digit = divmod(number, 36)
+        encoded = digits[digit] + encoded
+        if number == 0:
+            return encoded
+
+
+def generate_comments(line_count, thread_depth=4, body_words=12, blacklist_rate=0.05,
+                      subreddit_skew=1.1, seed=0, subreddit_count=1000, active_threads=200):
+    """
+    Yields comments as dictionaries in the order they were posted.
+
+    Arguments:
+        line_count: Number of comments.
+        thread_depth: Average number of comments in a thread.
+        body_words: Median number of words of a body.
+        blacklist_rate: Share of the comments which are blacklisted.
+        subreddit_skew: Zipf exponent of the subreddit sizes.
+        seed: Seed of the random choices, the same seed gives the same dump.
+        subreddit_count: Number of subreddits.
+        active_threads: Number of threads which are commented on at once.
+
+    """
+    rng = random.Random(seed)
+    with open(pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+    substring_blacklist = config_file['substring_blacklist']
+    subreddit_blacklist = config_file['subreddit_blacklist']
+
+    subreddits = ['subreddit{}'.format(index) for index in range(subreddit_count)]
+    subreddit_weights = list(itertools.accumulate(
+        1.0 / (rank ** subreddit_skew) for rank in range(1, subreddit_count + 1)))
+
+    def new_thread():
+        subreddit = subreddits[bisect.bisect(
+            subreddit_weights, rng.random() * subreddit_weights[-1])]
+        return {'subreddit': subreddit, 'link_id': 't3_{}'.format(base36(rng.randrange(36 ** 6))),
+                'comments': [], 'remaining': max(1, int(rng.expovariate(1.0 / thread_depth) + 0.5))}
+
+    threads = [new_thread() for _ in range(active_threads)]
+    created_utc = 1500000000
+    for index in range(line_count):
+        thread_index = rng.randrange(active_threads)
+        thread = threads[thread_index]
+        comments = thread['comments']
+        # Comments are kept as (name, author, author of the parent)
+        parent = None
+        if not comments:
+            parent_id = thread['link_id']
+        else:
+            parent = comments[-1] if rng.random() < 0.7 else rng.choice(comments)
+            parent_id = parent[0]
+        # Back and forth between two authors happens often
+        if parent is not None and parent[2] is not None and rng.random() < 0.3:
+            author = parent[2]
+        else:
+            author = 'user{}'.format(rng.randrange(20000))
+
+        word_count = max(1, int(rng.lognormvariate(0, 1) * body_words))
+        body = ' '.join(rng.choices(words, k=word_count))
+        subreddit = thread['subreddit']
+        if rng.random() < blacklist_rate:
+            if rng.random() < 0.5:
+                subreddit = rng.choice(subreddit_blacklist)
+            else:
+                body += ' ' + rng.choice(substring_blacklist)
+
+        name = 't1_{}'.format(base36(36 ** 5 + index))
+        created_utc += rng.randrange(3)
+        comments.append((name, author, parent[1] if parent is not None else None))
+        yield {'author': author, 'body': body, 'controversiality': 0,
+               'created_utc': created_utc, 'downs': 0, 'gilded': 0,
+               'link_id': thread['link_id'], 'name': name, 'parent_id': parent_id,
+               'score': 0, 'subreddit': subreddit, 'ups': rng.randrange(-5, 100)}
+
+        thread['remaining'] -= 1
+        if thread['remaining'] == 0:
+            threads[thread_index] = new_thread()
+
+
+def write_synthetic_dump(path, line_count, **shape):
+    """
+    Writes a synthetic dump file, compressed by its extension.
+
+    Arguments:
+        path: Dump file to be written, ".bz2", ".xz", ".json" or ".ndjson".
+        line_count: Number of comments.
+        shape: Keyword arguments of "generate_comments".
+
+    """
+    for extension, writer in dump_writers.items():
+        if path.endswith(extension):
+            break
+    else:
+        raise ValueError('"{}" is not a supported dump file.'.format(path))
+    with writer(path) as dump_file:
+        for comment in generate_comments(line_count, **shape):
+            dump_file.write((json.dumps(comment) + '\n').encode('utf-8'))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Write a synthetic Reddit dump.')
+    arg_parser.add_argument('path', help='dump file, ".bz2", ".xz", ".json" or ".ndjson"')
+    arg_parser.add_argument('--lines', type=int, default=1000000)
+    arg_parser.add_argument('--thread-depth', type=float, default=4)
+    arg_parser.add_argument('--body-words', type=float, default=12)
+    arg_parser.add_argument('--blacklist-rate', type=float, default=0.05)
+    arg_parser.add_argument('--subreddit-skew', type=float, default=1.1)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+
+    write_synthetic_dump(args.path, args.lines, thread_depth=args.thread_depth,
+                         body_words=args.body_words, blacklist_rate=args.blacklist_rate,
+                         subreddit_skew=args.subreddit_skew, seed=args.seed)
+    print('# {:,} comments written to "{}", {}.'.format(
+        args.lines, args.path, alice.file_size(args.path)))
@@ -0,0 +1,116 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+THREAD BUILDER BENCHMARK
+=========================
+
+Compares "process_cached_conversation_lines" followed by
+"write_cached_conversation_lines" with the NumPy thread builder on a cache of
+synthetic comments, after checking that both write the same conversations.
+
+    Z:\\alice>py benchmarks\\thread_builder_benchmark.py 1000000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+import os
+import sys
+import random
+import time
+import contextlib
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+from comment_store import MemoryCommentStore
+from parser import Parser, RedditConversationLine, encode_reddit_id
+from thread_builder import NumpyThreadBuilder
+
+
+class ListOutputHandler(object):
+    """Keeps the written conversations in a list."""
+
+    def __init__(self):
+        self.conversations = []
+
+    def write(self, output_string):
+        self.conversations.append(output_string)
+
+
+def get_cached_lines(line_count, rng):
+    """(name, line) pairs replying to one of the previous 300 comments."""
+    cached_lines = []
+    for index in range(1, line_count + 1):
+        if index > 1 and rng.random() < 0.85:
+            parent_id = 't1_{:x}'.format(max(1, index - rng.randint(1, 300)))
+        else:
+            parent_id = 't3_{:x}'.format(rng.randrange(1, 10 ** 6))
+        cached_lines.append((encode_reddit_id('t1_{:x}'.format(index)), RedditConversationLine({
+            'body': 'comment {}'.format(index), 'ups': rng.randrange(50), 'downs': 0,
+            'author': 'user{}'.format(rng.randrange(5000)), 'subreddit': 'AskReddit',
+            'created_utc': index, 'parent_id': parent_id})))
+    return cached_lines
+
+
+def run_python(parser, cached_lines):
+    conversation_line_dict = MemoryCommentStore(cached_lines)
+    output_handler = ListOutputHandler()
+    parser.process_cached_conversation_lines(conversation_line_dict)
+    parser.write_cached_conversation_lines(conversation_line_dict, output_handler)
+    return output_handler.conversations
+
+
+def run_numpy(parser, cached_lines):
+    thread_builder = NumpyThreadBuilder()
+    for name, conversation_line in cached_lines:
+        thread_builder[name] = conversation_line
+    output_handler = ListOutputHandler()
+    parser.build_cached_conversation_lines(thread_builder, output_handler)
+    return output_handler.conversations
+
+
+if __name__ == '__main__':
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    parser = Parser.__new__(Parser)
+    parser.print_every = line_count + 1
+
+    # Both engines change the cached lines, so every run gets a fresh copy
+    def timed(run):
+        times = []
+        for seed in range(3):
+            cached_lines = get_cached_lines(line_count, random.Random(seed))
+            with contextlib.redirect_stdout(io.StringIO()):
+                start_time = time.perf_counter()
+                run(parser, cached_lines)
+                times.append(time.perf_counter() - start_time)
+        return min(times)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert run_python(parser, get_cached_lines(20000, random.Random(0))) == \
+            run_numpy(parser, get_cached_lines(20000, random.Random(0)))
+
+    python_time = timed(run_python)
+    numpy_time = timed(run_numpy)
+    print('# {:,} cached lines: Python {:.2f} s, NumPy {:.2f} s, speedup {:.1f}x.'.format(
+        line_count, python_time, numpy_time, python_time / numpy_time))
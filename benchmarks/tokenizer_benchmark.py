@@ -0,0 +1,135 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TOKENIZER BENCHMARK
+====================
+
+Checks that "tokenizer.word_tokenize" gives exactly the same tokens as
+"nltk.word_tokenize" on the lines of a corpus file, "cassiopeia_temp.xames3"
+for instance, or on random lines heavy on quotes, contractions and sentence
+ends if no file is given. Then compares how fast both are, with the cache of
+the tokenizer empty and full.
+
+    Z:\\alice>py benchmarks\\tokenizer_benchmark.py Z:\\alice\\datasets\\parsed\\cassiopeia_temp.xames3
+    Z:\\alice>py benchmarks\\tokenizer_benchmark.py --lines 200000
+
+Without the "punkt" data of "nltk", both split sentences with an untrained
+"punkt", which knows no abbreviations but follows the same rules.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import random
+import argparse
+import time
+
+import nltk
+from nltk.tokenize.destructive import NLTKWordTokenizer
+from nltk.tokenize.punkt import PunktSentenceTokenizer
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+import tokenizer
+
+pieces = ['word', 'Hello', 'it', "it's", "don't", "can't", 'cannot', 'gonna', 'Wanna', "'tis",
+          "I'm", "you're", "we'll", "'s", ' ', ' ', ' ', '  ', '\t', '.', '.', '. ', '...', '?',
+          '? ', '!', '! ', ',', ':', ';', '$', '%', '&', '*', '-', '--', '"', "'", "''", '``',
+          '(', ')', '[', ']', '<', '>', '3', '3.5', '1,000', 'A', 'The', 'e.g.', 'Mr.',
+          '\u201c', '\u201d', '\u2019', '\u2014', '\xa0']
+words = ('i think you are right but that is not what happened when my friend '
+         'tried it last year so maybe try again tomorrow').split()
+
+
+def get_random_lines(line_count, rng):
+    """Lines made of the pieces every tokenizer rule looks for."""
+    return [''.join(rng.choice(pieces) for _ in range(rng.randrange(0, 30)))
+            for _ in range(line_count)]
+
+
+def get_comment_lines(line_count, rng):
+    """Lines shaped like the cleaned conversations."""
+    lines = []
+    for _ in range(line_count):
+        line = ' '.join(rng.choice(words) for _ in range(rng.randrange(8, 30)))
+        line = line.replace(' i ', rng.choice([' i ', " i'm ", " don't ", ', ']), 1)
+        if rng.random() < 0.3:
+            line = line.replace(' so ', '. So ', 1)
+        lines.append(line + rng.choice(['', '.', '?', '!', '...', '."']))
+    return lines
+
+
+def get_reference_tokenizer():
+    """Returns "nltk.word_tokenize", with an untrained "punkt" if needed."""
+    try:
+        nltk.sent_tokenize('A test. Another one.')
+        return nltk.word_tokenize
+    except LookupError:
+        print('# The "punkt" data is missing, sentences are split by an untrained "punkt".')
+        sentence_tokenizer = PunktSentenceTokenizer()
+        word_tokenizer = NLTKWordTokenizer()
+        nltk.sent_tokenize = sentence_tokenizer.tokenize
+        return lambda text: [token for sentence in sentence_tokenizer.tokenize(text)
+                             for token in word_tokenizer.tokenize(sentence)]
+
+
+def timed(function, lines):
+    start_time = time.perf_counter()
+    for line in lines:
+        function(line)
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Compare the tokenizer with nltk.')
+    arg_parser.add_argument('path', nargs='?', help='corpus file, one text per line')
+    arg_parser.add_argument('--lines', type=int, default=200000)
+    args = arg_parser.parse_args()
+
+    reference_tokenize = get_reference_tokenizer()
+    rng = random.Random(0)
+    if args.path:
+        with open(args.path, 'r', encoding='iso-8859-1') as corpus_file:
+            corpora = [('corpus', [line.strip() for line in corpus_file if line.strip()])]
+    else:
+        corpora = [('random', get_random_lines(args.lines, rng)),
+                   ('comment', get_comment_lines(args.lines, rng))]
+
+    for label, lines in corpora:
+        for line in lines:
+            if tokenizer.word_tokenize(line) != reference_tokenize(line):
+                print('# Different tokens for {!r}.'.format(line))
+                sys.exit(1)
+        print('# Same tokens on {:,} {} lines.'.format(len(lines), label))
+
+        reference_time = timed(reference_tokenize, lines)
+        tokenizer.get_tokens.cache_clear()
+        cold_time = timed(tokenizer.word_tokenize, lines)
+        warm_time = timed(tokenizer.word_tokenize, lines[-tokenizer.cache_size:])
+        warm_time *= len(lines) / min(len(lines), tokenizer.cache_size)
+        print('# {} lines: {:,.0f} lines/s with nltk, {:,.0f} lines/s now, speedup {:.1f}x, '
+              '{:.1f}x when cached.'.format(
+                  label, len(lines) / reference_time, len(lines) / cold_time,
+                  reference_time / cold_time, reference_time / warm_time))
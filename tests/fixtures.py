@@ -0,0 +1,169 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+FIXTURES
+=========
+
+Fixtures shared by the tests: small Reddit dumps written on the fly and a
+test case which points the parser at a temporary folder and pparams, and
+puts the paths of "alice_config" back once the test is done.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import bz2
+import contextlib
+import io
+import json
+import random
+import shutil
+import tempfile
+import unittest
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(package_dir, 'utils'))
+
+import alice_config as alice
+import parser
+
+pparams_file = os.path.join(package_dir, 'engine', 'json', 'pparams.json')
+
+words = ('the quick brown fox jumps over the lazy dog while we talk about '
+         'something else entirely and nobody seems to mind it at all i think '
+         'you are right but that is not what happened when my friend tried '
+         'it last year so maybe try again &amp; see').split()
+subreddits = ['AskReddit', 'funny', 'pics', 'gaming', 'worldnews', 'announcements']
+
+
+def base36(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    encoded = ''
+    while True:
+        number, digit = divmod(number, 36)
+        encoded = digits[digit] + encoded
+        if number == 0:
+            return encoded
+
+
+def write_dump(path, line_count, seed=0, active_threads=50):
+    """
+    Writes a ".bz2" dump whose comments form threads, interleaved in the
+    order they were posted like in a real dump.
+
+    Arguments:
+        path: Dump file to be written.
+        line_count: Number of comments.
+        seed: Seed of the random choices, the same seed gives the same dump.
+        active_threads: Number of threads which are commented on at once.
+
+    """
+    rng = random.Random(seed)
+    threads = [None] * active_threads
+    created_utc = 1500000000
+    with bz2.open(path, 'wt', encoding='utf-8') as dump_file:
+        for index in range(line_count):
+            thread_index = rng.randrange(active_threads)
+            if threads[thread_index] is None or rng.random() < 0.2:
+                threads[thread_index] = ('t3_{}'.format(base36(rng.randrange(36 ** 6))),
+                                         rng.choice(subreddits), [])
+            link_id, subreddit, names = threads[thread_index]
+            if not names:
+                parent_id = link_id
+            elif rng.random() < 0.7:
+                parent_id = names[-1]
+            else:
+                parent_id = rng.choice(names)
+
+            body = ' '.join(rng.choices(words, k=max(1, int(rng.lognormvariate(0, 1) * 12))))
+            if rng.random() < 0.03:
+                body += ' reddit'
+            name = 't1_{}'.format(base36(36 ** 5 + index))
+            names.append(name)
+            created_utc += rng.randrange(3)
+            dump_file.write(json.dumps({
+                'author': 'user{}'.format(rng.randrange(50)), 'body': body,
+                'created_utc': created_utc, 'downs': 0, 'link_id': link_id, 'name': name,
+                'parent_id': parent_id, 'score': 0, 'subreddit': subreddit,
+                'ups': rng.randrange(-5, 100)}) + '\n')
+
+
+class ParseTestCase(unittest.TestCase):
+    """Test case with a temporary folder, removed with the test."""
+
+    def setUp(self):
+        self.alice_paths = dict(vars(alice))
+        self.root_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        vars(alice).update(self.alice_paths)
+        shutil.rmtree(self.root_dir)
+
+    def set_up_folders(self, params):
+        """
+        Points the parser at a new datasets folder and at pparams with the
+        given values, and returns the folder.
+
+        Arguments:
+            self: An instance of the class.
+            params: Pparams which differ from the ones of the repository.
+
+        """
+        with open(pparams_file, 'r') as params_file:
+            config_file = json.load(params_file)
+        config_file.update(params)
+
+        root_dir = tempfile.mkdtemp(dir=self.root_dir)
+        alice.datasets_dir = os.path.join(root_dir, 'datasets')
+        alice.parsed_dir = os.path.join(alice.datasets_dir, 'parsed')
+        alice.pparams_file = os.path.join(root_dir, 'pparams.json')
+        alice.subreddits_file = os.path.join(root_dir, 'subreddits.xames3')
+        alice.cassiopeia_file = os.path.join(alice.parsed_dir, 'cassiopeia.xames3')
+        alice.cassiopeia_output_file = os.path.join(alice.parsed_dir, 'cassiopeia.bz2')
+        alice.cassiopeia_index_file = os.path.join(alice.parsed_dir, 'cassiopeia_index.sqlite')
+        alice.cassiopeia_checkpoint_file = os.path.join(alice.parsed_dir, 'cassiopeia.checkpoint')
+        os.makedirs(alice.parsed_dir)
+        with open(alice.pparams_file, 'w') as params_file:
+            json.dump(config_file, params_file)
+        return root_dir
+
+    def parse(self, params, dumps=(('RC_a.bz2', 5000, 0),)):
+        """
+        Parses new dumps with the given pparams and returns the
+        conversations written.
+
+        Arguments:
+            self: An instance of the class.
+            params: Pparams which differ from the ones of the repository.
+            dumps: (file name, number of comments, seed) of every dump.
+
+        """
+        self.set_up_folders(params)
+        for dump_file, line_count, seed in dumps:
+            write_dump(os.path.join(alice.datasets_dir, dump_file), line_count, seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser.Parser().parse()
+            parser.uncompress_output_files(alice.cassiopeia_file)
+        with open(alice.cassiopeia_file, 'r') as parsed_file:
+            return parsed_file.read()
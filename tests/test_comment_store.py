@@ -0,0 +1,169 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TEST COMMENT STORE
+===================
+
+Checks that the packed comment store holds the same lines as the memory one
+and that it fits at least three times as many comments in the same memory.
+
+    Z:\\alice>py -m unittest discover tests
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import sys
+import json
+import random
+import tracemalloc
+import unittest
+
+from fixtures import ParseTestCase, base36
+from comment_store import MemoryCommentStore, PackedCommentStore
+from parser import RedditConversationLine, encode_reddit_id
+
+
+class DictConversationLine(object):
+    """The conversation line as the parser cached it before."""
+
+    def __init__(self, json_object):
+        self.body = json_object['body']
+        self.score = json_object['ups'] - json_object['downs']
+        self.author = json_object['author']
+        self.parent_id = json_object['parent_id']
+        self.child_id = None
+
+
+def get_line(rng):
+    line = RedditConversationLine.__new__(RedditConversationLine)
+    line.body = rng.choice(['', 'caf\u00e9', 'two\nlines', 'x' * rng.randrange(200)])
+    line.score = rng.randint(-1000, 1000)
+    line.author = rng.choice(['alice', 'bob', '[deleted]'])
+    line.subreddit = rng.choice(['AskReddit', 'funny'])
+    line.created_utc = rng.randrange(2 ** 32)
+    line.parent_id = rng.choice([None, rng.randrange(20000), 't3_link', 1 << 70])
+    line.child_id = None
+    return line
+
+
+def get_name(rng):
+    return rng.choice([rng.randrange(20000), 'name_{}'.format(rng.randrange(100))])
+
+
+def get_fields(line):
+    if line is None:
+        return None
+    return [getattr(line, field) for field in RedditConversationLine.stored_fields]
+
+
+def get_raw_lines(line_count, author_count, rng):
+    """Encoded json lines, so that every string is a fresh copy when decoded."""
+    return [json.dumps({
+        'body': 'x' * rng.randint(8, 120), 'ups': rng.randint(0, 50), 'downs': 0,
+        'author': 'user_{}'.format(rng.randrange(author_count)),
+        'subreddit': rng.choice(['AskReddit', 'funny', 'pics']),
+        'created_utc': 1500000000 + index, 'name': 't1_c{}'.format(base36(10 ** 8 + index)),
+        'parent_id': 't1_c{}'.format(base36(10 ** 8 + rng.randrange(index + 1)))})
+        for index in range(line_count)]
+
+
+def get_footprint(raw_lines, cache, cache_line):
+    """Bytes held per line by a cache filled from the raw lines."""
+    tracemalloc.start()
+    for raw_line in raw_lines:
+        name, line = cache_line(json.loads(raw_line))
+        cache[name] = line
+        del line
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(cache)
+
+
+class CommentStoreTest(ParseTestCase):
+
+    def assertSameStores(self, packed_store, memory_store):
+        self.assertEqual(len(packed_store), len(memory_store))
+        for method in ['items', 'roots']:
+            self.assertEqual(
+                [(name, get_fields(line)) for name, line in getattr(packed_store, method)()],
+                [(name, get_fields(line)) for name, line in getattr(memory_store, method)()])
+
+    def test_same_lines_as_memory_store(self):
+        rng = random.Random(0)
+        packed_store = PackedCommentStore(RedditConversationLine)
+        memory_store = MemoryCommentStore()
+        for step in range(30000):
+            choice = rng.random()
+            names = list(memory_store)
+            if choice < 0.6 or not names:
+                # The packed store copies the line, so both can be given it
+                name = get_name(rng)
+                line = get_line(rng)
+                packed_store[name] = line
+                memory_store[name] = line
+            elif choice < 0.7:
+                # Removing most of the lines packs the arrays again
+                names = rng.sample(names, rng.randrange(1, len(names) + 1))
+                packed_store.remove(names)
+                memory_store.remove(names)
+            elif choice < 0.85:
+                name = rng.choice(names)
+                child_id = get_name(rng)
+                packed_store.set_child_id(name, packed_store[name], child_id)
+                memory_store.set_child_id(name, memory_store[name], child_id)
+            elif choice < 0.9:
+                name = rng.choice(names)
+                packed_store.clear_parent_id(name, packed_store[name])
+                memory_store.clear_parent_id(name, memory_store[name])
+            else:
+                name = get_name(rng)
+                self.assertEqual(name in packed_store, name in memory_store)
+                self.assertEqual(get_fields(packed_store.get(name)),
+                                 get_fields(memory_store.get(name)))
+            if step % 1000 == 0:
+                self.assertSameStores(packed_store, memory_store)
+        self.assertSameStores(packed_store, memory_store)
+
+    def test_same_conversations_as_memory_store(self):
+        for params in [{}, {'conversation_line_cache_size': 1000},
+                       {'conversation_window': 3600}]:
+            self.assertEqual(self.parse(dict({'comment_store': 'packed'}, **params)),
+                             self.parse(dict({'comment_store': 'memory'}, **params)))
+
+    def test_footprint(self):
+        raw_lines = get_raw_lines(50000, 5000, random.Random(0))
+
+        # The interned authors are shared by many lines and the table of
+        # interned strings grows in steps, neither is a cost of a line
+        authors = {sys.intern(json.loads(raw_line)['author']) for raw_line in raw_lines}
+        dict_size = get_footprint(raw_lines, {}, lambda json_object: (
+            json_object['name'], DictConversationLine(json_object)))
+        packed_size = get_footprint(
+            raw_lines, PackedCommentStore(RedditConversationLine), lambda json_object: (
+                encode_reddit_id(json_object['name']), RedditConversationLine(json_object)))
+        del authors
+        self.assertGreaterEqual(dict_size / packed_size, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
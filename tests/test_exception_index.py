@@ -0,0 +1,97 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TEST EXCEPTION INDEX
+=====================
+
+Checks that the exception index can be handed to other processes, and that
+the parser filters pairs with it the same way with one or more workers.
+
+    Z:\\alice>py -m unittest discover tests
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import sys
+import pickle
+import subprocess
+import unittest
+
+from fixtures import ParseTestCase, package_dir
+import alice_config as alice
+import exception_index
+
+exception_words = ['the', 'quick', 'fox'] + ['word{}'.format(index) for index in range(1000)]
+
+# Looks the words up in a pickled index, in a process with another hash seed
+lookup_script = '''
+import pickle, sys
+sys.path.insert(0, sys.argv[1])
+index = pickle.load(sys.stdin.buffer)
+words = sys.argv[2:]
+print(sum(word in index for word in words), sum(word + '#' in index for word in words))
+'''
+
+
+class ExceptionIndexTest(ParseTestCase):
+
+    def setUp(self):
+        super(ExceptionIndexTest, self).setUp()
+        self.exception_file = os.path.join(self.root_dir, 'exception.xames3')
+        with open(self.exception_file, 'w') as output_file:
+            for word in exception_words:
+                output_file.write('{}\n'.format(word))
+
+    def test_pickled_index_in_other_process(self):
+        with exception_index.load_exception_index(self.exception_file, 0) as index:
+            self.assertIn('fox', index)
+            pickled_index = pickle.dumps(index)
+
+        for hash_seed in ['1', '2']:
+            environment = dict(os.environ, PYTHONHASHSEED=hash_seed)
+            output = subprocess.run(
+                [sys.executable, '-c', lookup_script, os.path.join(package_dir, 'utils')] +
+                exception_words, input=pickled_index, stdout=subprocess.PIPE,
+                env=environment, check=True).stdout.decode().split()
+            self.assertEqual(output[0], str(len(exception_words)))
+            self.assertEqual(output[1], '0')
+
+    def parse(self, params):
+        alice.exception_file = self.exception_file
+        return super(ExceptionIndexTest, self).parse(
+            params, [('RC_a.bz2', 5000, 0), ('RC_b.bz2', 5000, 1)])
+
+    def test_pair_filters_with_workers(self):
+        unfiltered = self.parse({'parse_workers': 2})
+        filtered = self.parse({'pair_filters': True, 'pair_filter_exceptions': True,
+                               'exception_set_file_size': 10 ** 9})
+        self.assertLess(len(filtered), len(unfiltered))
+        for parse_workers in [1, 2]:
+            self.assertEqual(self.parse({'pair_filters': True, 'pair_filter_exceptions': True,
+                                         'exception_set_file_size': 10,
+                                         'parse_workers': parse_workers}), filtered)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TEST FILTERS
+=============
+
+Checks that the precompiled filters of the cleaner give the same results as
+the code they replaced, on random lines made of what every rule looks for
+and of every kind of character.
+
+    Z:\\alice>py -m unittest discover tests
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import re
+import random
+import unittest
+
+import fixtures
+from filters import get_formatted_line, has_allowed_chars, special_chars
+
+format_pieces = ['.', '.', '..', '...', '-', '--', ' ', ' ', '  ', '\t', '\n', '\xa0', '\u2003',
+                 '\x1c', "'", " ' ", '?', '??', '!', '!!', 'm', 'mm', 'mmm', 'M', '<', '>',
+                 '<b>', '</i>', ' .', ' ?', ' !', 'word', 'Hello', 'it', 'x', '<a href>', '. .',
+                 '- -', '.\t.', '-\n-', '<', '\xe9']
+
+
+def reference_formatted_line(line):
+    """The formatting of the cleaner before it was precompiled."""
+    pattern_dot = re.compile(r'\.\s+\.')
+    pattern_dash = re.compile(r'-\s+-')
+    pattern_html = re.compile(r'<.*?>')
+
+    while re.search(pattern_dot, line):
+        line = re.sub(pattern_dot, '..', line)
+
+    while re.search(pattern_dash, line):
+        line = re.sub(pattern_dash, '--', line)
+
+    line = re.sub('\\.{3,}', '... ', line)
+    line = re.sub('-{2,}', ' -- ', line)
+    line = line.replace(' \' ', '\'')
+    line = re.sub('\\s+', ' ', line).strip()
+    line = line.replace(' .', '.').replace(' ?', '?').replace(' !', '!')
+    line = re.sub(pattern_html, '', line)
+    line = re.sub('\\?{2,}', '?', line)
+    line = re.sub('!{2,}', '!', line)
+    line = re.sub('m{3,}', 'mm', line)
+    return line
+
+
+def reference_allowed_chars(line):
+    """The character test of the cleaner before it was compiled."""
+    return all(ord(char) < 123 and ord(char) not in special_chars for char in line)
+
+
+def get_random_lines(pieces, line_count, max_pieces, rng):
+    return [''.join(rng.choice(pieces) for _ in range(rng.randrange(0, max_pieces)))
+            for _ in range(line_count)]
+
+
+class FiltersTest(unittest.TestCase):
+
+    def test_formatted_line(self):
+        rng = random.Random(0)
+        lines = get_random_lines(format_pieces, 50000, 30, rng)
+        lines += [' '.join(rng.choices(fixtures.words, k=rng.randrange(1, 30))) + ending
+                  for ending in ['', '.', ' . .', '...', ' - - right', '!!', '??'] * 1000]
+        for line in lines:
+            self.assertEqual(get_formatted_line(line), reference_formatted_line(line),
+                             repr(line))
+
+    def test_allowed_chars(self):
+        # Every control, ASCII and Latin-1 character, the edges of the
+        # allowed range and characters outside the basic plane
+        chars = [chr(code) for code in range(300)] + [
+            '\u2019', '\u2028', '\ufeff', '\uffff', '\U0001f600', '\U0010ffff', '\udcff']
+        lines = [''] + chars + get_random_lines(chars, 50000, 4, random.Random(0))
+        lines += [' '.join(fixtures.words) + char for char in chars]
+        for line in lines:
+            self.assertEqual(has_allowed_chars(line), reference_allowed_chars(line), repr(line))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TEST RUNNER
+============
+
+Checks that the runner skips the stages which are up to date and runs again
+only the stages after a changed file or pparam.
+
+    Z:\\alice>py -m unittest discover tests
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import contextlib
+import io
+import json
+import shutil
+import unittest
+
+from fixtures import ParseTestCase, package_dir, write_dump
+import alice_config as alice
+import runner
+
+all_stages = ['parse', 'clean', 'preprocess', 'temp_vocab', 'refine', 'vocab']
+
+
+class RunnerTest(ParseTestCase):
+
+    def setUp(self):
+        super(RunnerTest, self).setUp()
+        self.set_up_folders({'exception_set_file_size': 0})
+        self.dump_file = os.path.join(alice.datasets_dir, 'RC_a.bz2')
+        write_dump(self.dump_file, 3000)
+
+        # The core files are read by the vocab stages, a copy is changed here
+        alice.core_dir = os.path.join(self.root_dir, 'core')
+        shutil.copytree(os.path.join(package_dir, 'engine', 'core'), alice.core_dir)
+        alice.vocab_file = os.path.join(self.root_dir, 'vocab.xames3')
+        alice.exception_file = os.path.join(self.root_dir, 'exception.xames3')
+
+    def run_stages(self, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return runner.run_stages(*args, **kwargs)
+
+    def set_params(self, **params):
+        with open(alice.pparams_file, 'r') as params_file:
+            config_file = json.load(params_file)
+        config_file.update(params)
+        with open(alice.pparams_file, 'w') as params_file:
+            json.dump(config_file, params_file)
+
+    def test_second_run_skips_every_stage(self):
+        self.assertEqual(self.run_stages(), all_stages)
+        outputs = [os.stat(path).st_mtime_ns for path in
+                   [alice.cassiopeia_file, alice.vocab_file, alice.exception_file]]
+        self.assertEqual(self.run_stages(), [])
+        self.assertEqual(self.run_stages(dry_run=True), [])
+        self.assertEqual([os.stat(path).st_mtime_ns for path in
+                          [alice.cassiopeia_file, alice.vocab_file, alice.exception_file]],
+                         outputs)
+
+    def test_touched_file_is_not_a_change(self):
+        self.run_stages()
+        os.utime(self.dump_file, ns=(0, 0))
+        os.utime(os.path.join(alice.core_dir, 'character', 'name.xames3'), ns=(0, 0))
+        self.assertEqual(self.run_stages(), [])
+
+    def test_changed_file_runs_the_stages_after_it(self):
+        self.run_stages()
+        with open(os.path.join(alice.core_dir, 'character', 'name.xames3'), 'a') as core_file:
+            core_file.write('X: Who named you ?\nA: Somebody called Zyxwvut .\n')
+        ran = self.run_stages()
+        self.assertEqual(ran[0], 'temp_vocab')
+        self.assertIn('vocab', ran)
+        self.assertEqual(self.run_stages(), [])
+
+    def test_changed_output_runs_its_stage(self):
+        self.run_stages()
+        os.remove(runner.get_pipeline_path('temp.xames3'))
+        # The cleaner writes the same file again, so the stages after it skip
+        self.assertEqual(self.run_stages(), ['clean'])
+
+    def test_changed_param_runs_the_stages_after_it(self):
+        self.run_stages()
+        self.set_params(clean_workers=2)
+        self.assertEqual(self.run_stages(), [])
+        self.set_params(dedup_threshold=0.7)
+        self.assertEqual(self.run_stages(), ['dedup', 'temp_vocab', 'refine'])
+        self.set_params(substring_blacklist=['a'])
+        self.assertEqual(self.run_stages(), all_stages[:3] + ['dedup'] + all_stages[3:])
+
+    def test_forced_target(self):
+        self.run_stages()
+        self.assertEqual(self.run_stages(['refine'], force=True), ['refine'])
+        self.assertEqual(self.run_stages(['clean']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TEST THREAD BUILDER
+====================
+
+Checks that the NumPy thread builder writes exactly the same conversations as
+the Python one, with the cache flushed once at the end or many times.
+
+    Z:\\alice>py -m unittest discover tests
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import unittest
+
+from fixtures import ParseTestCase
+import parser
+from thread_builder import np
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed.')
+class ThreadBuilderTest(ParseTestCase):
+
+    def test_same_conversations_as_python_builder(self):
+        dumps = (('RC_a.bz2', 5000, 0), ('RC_b.bz2', 3000, 1))
+        for params in [{}, {'conversation_line_cache_size': 1000},
+                       {'conversation_line_cache_size': 137}]:
+            numpy_output = self.parse(dict({'thread_builder': 'numpy'}, **params), dumps)
+            # The parser falls back to the Python builder when it cannot use
+            # NumPy, which would compare the Python builder with itself
+            self.assertEqual(parser.Parser().thread_builder, 'numpy')
+            python_output = self.parse(dict({'thread_builder': 'python'}, **params), dumps)
+            self.assertTrue(python_output)
+            self.assertEqual(numpy_output, python_output)
+
+
+if __name__ == '__main__':
+    unittest.main()
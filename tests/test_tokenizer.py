@@ -0,0 +1,108 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TEST TOKENIZER
+===============
+
+Checks that the tokenizer gives the same tokens as the word tokenizer of
+"nltk" on random lines heavy on quotes, contractions and sentence ends, and
+that the cached tokens of a text are the ones it would have without the
+cache. Both split sentences with an untrained "punkt", so that the tests do
+not need its data.
+
+    Z:\\alice>py -m unittest discover tests
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import random
+import unittest
+
+import nltk
+from nltk.tokenize.destructive import NLTKWordTokenizer
+from nltk.tokenize.punkt import PunktSentenceTokenizer
+
+import fixtures
+import tokenizer
+
+pieces = ['word', 'Hello', 'it', "it's", "don't", "can't", 'cannot', 'gonna', 'Wanna', "'tis",
+          "I'm", "you're", "we'll", "'s", ' ', ' ', ' ', '  ', '\t', '.', '.', '. ', '...', '?',
+          '? ', '!', '! ', ',', ':', ';', '$', '%', '&', '*', '-', '--', '"', "'", "''", '``',
+          '(', ')', '[', ']', '<', '>', '3', '3.5', '1,000', 'A', 'The', 'e.g.', 'Mr.',
+          '\u201c', '\u201d', '\u2019', '\u2014', '\xa0']
+
+
+def get_comment_lines(line_count, rng):
+    """Lines shaped like the cleaned conversations."""
+    lines = []
+    for _ in range(line_count):
+        line = ' '.join(rng.choices(fixtures.words, k=rng.randrange(8, 30)))
+        line = line.replace(' i ', rng.choice([' i ', " i'm ", " don't ", ', ']), 1)
+        if rng.random() < 0.3:
+            line = line.replace(' so ', '. So ', 1)
+        lines.append(line + rng.choice(['', '.', '?', '!', '...', '."']))
+    return lines
+
+
+class TokenizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sent_tokenize = nltk.sent_tokenize
+        self.sentence_tokenizer = PunktSentenceTokenizer()
+        self.word_tokenizer = NLTKWordTokenizer()
+        nltk.sent_tokenize = self.sentence_tokenizer.tokenize
+        tokenizer.get_tokens.cache_clear()
+
+    def tearDown(self):
+        nltk.sent_tokenize = self.sent_tokenize
+        tokenizer.get_tokens.cache_clear()
+
+    def reference_tokenize(self, text):
+        return [token for sentence in self.sentence_tokenizer.tokenize(text)
+                for token in self.word_tokenizer.tokenize(sentence)]
+
+    def test_same_tokens_as_nltk(self):
+        rng = random.Random(0)
+        lines = [''.join(rng.choice(pieces) for _ in range(rng.randrange(0, 30)))
+                 for _ in range(20000)]
+        lines += get_comment_lines(5000, rng)
+        for line in lines:
+            self.assertEqual(tokenizer.word_tokenize(line), self.reference_tokenize(line),
+                             repr(line))
+
+    def test_cached_tokens(self):
+        lines = get_comment_lines(1000, random.Random(1))
+        uncached = [list(tokenizer.get_tokens.__wrapped__(line)) for line in lines]
+        first = [tokenizer.word_tokenize(line) for line in lines]
+        misses = tokenizer.get_tokens.cache_info().misses
+
+        # A caller changing its tokens does not change the cached ones
+        for tokens in first:
+            tokens.append('changed')
+        second = [tokenizer.word_tokenize(line) for line in lines]
+        self.assertEqual(tokenizer.get_tokens.cache_info().misses, misses)
+        self.assertEqual(second, uncached)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -40,8 +40,19 @@ from datetime import datetime, date
 import os
 import random
 import socket
+import sys
 import requests
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 try:
     from urllib2 import urlopen, URLError
     from urlparse import urlparse
@@ -119,6 +130,23 @@ def file_size(file_path):
         return convert_bytes(file_size_info.st_size)
 
 
+def peak_memory_usage():
+    """
+    Returns the peak resident memory of the current process in bytes, or None
+    if it cannot be read on this system.
+
+    Windows needs "psutil" for it, the other systems report it themselves.
+    """
+    if resource is not None:
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports it in kilobytes, macOS in bytes
+        return peak_memory if sys.platform == 'darwin' else peak_memory * 1024
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, 'peak_wset', memory_info.rss)
+    return None
+
+
 def location_details(location):
     checker = NetworkStatus()
     net_stat, alice_stat = checker.test_internet()
@@ -202,6 +230,12 @@ jokes_file = os.path.join(layers_dir, 'jokes.xames3')
 # Bz2 file (Do not change)
 cassiopeia_output_file = os.path.join(parsed_dir, 'cassiopeia.bz2')
 
+# Sqlite file (Do not change)
+cassiopeia_index_file = os.path.join(parsed_dir, 'cassiopeia_index.sqlite')
+
+# Checkpoint file (Do not change)
+cassiopeia_checkpoint_file = os.path.join(parsed_dir, 'cassiopeia.checkpoint')
+
 # Extensions
 py_file = '.py'
 pdf_file = '.pdf'
@@ -209,6 +243,9 @@ png_file = '.png'
 gif_file = '.gif'
 bmp_file = '.bmp'
 bz2_file = '.bz2'
+gz_file = '.gz'
+xz_file = '.xz'
+zst_file = '.zst'
 zip_file = '.zip'
 mp3_file = '.mp3'
 mp4_file = '.mp4'
@@ -220,8 +257,10 @@ xml_file = '.xml'
 apk_file = '.apk'
 jpeg_file = '.jpeg'
 json_file = '.json'
+ndjson_file = '.ndjson'
 html_file = '.html'
 xames3_file = '.xames3'
+tmp_file = '.tmp'
 
 # Comment and conversation line seperator
 comment_line_sep = '=='
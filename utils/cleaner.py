@@ -32,16 +32,24 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from datetime import datetime
+from multiprocessing import Pool
 import os
 import re
 import sys
+import json
+import shutil
 
-import nltk
-
+from filters import has_allowed_chars, pattern_curse
+import filters
+from stages import batched, ordered_pool_map
+from tokenizer import word_tokenize
 import alice_config as alice
 
 start_time = datetime.now()
 
+# Conversations are handed to the workers in batches of this size
+clean_batch_size = 1000
+
 
 class Cleaner():
     """Cleans unwanted punctuations in data."""
@@ -50,36 +58,56 @@ class Cleaner():
         """
         Creates a new cleaning instance for each file.
 
+        The files are only listed here, their conversations are read one at
+        a time while the cleaned conversations are written.
+
         Arguments:
             self: An instance of the class.
             core_dir: Directory for training files.
 
         """
-        self.conversations = []
+        pparams_file = alice.pparams_file
+        with open(pparams_file, 'r') as params_file:
+            config_file = json.load(params_file)
+
+        self.workers = config_file['clean_workers']
+        self.data_files = []
+        self.conversation_count = 0
 
         # Looping through all files that end with ".xames3" in directory
         for data_file in sorted(os.listdir(core_dir)):
             full_path_name = os.path.join(core_dir, data_file)
             if os.path.isfile(full_path_name) and data_file.lower().endswith(alice.xames3_file):
-                loading_start_time = datetime.now()
-                print('\r# Loading "{}" file in memory at {}.'.format(
-                    data_file, loading_start_time.strftime('%I:%M %p')))
-                with open(full_path_name, 'r', encoding='iso-8859-1') as file:
-                    samples = []
-                    for line in file:
-                        lnstrp = line.strip()
-                        if not lnstrp:
-                            continue
-                        if lnstrp == '===':
-                            if len(samples):
-                                self.conversations.append(samples)
-                            samples = []
-                        else:
-                            lnstrp = lnstrp[2:].strip()
-                            samples.append({'text': lnstrp})
-
-                    if len(samples):
-                        self.conversations.append(samples)
+                self.data_files.append(full_path_name)
+
+    def get_conversations(self):
+        """
+        Yields every conversation of the files as a list of lines, without
+        the conversation delimiters.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        for full_path_name in self.data_files:
+            loading_start_time = datetime.now()
+            print('\r# Loading "{}" file at {}.'.format(
+                os.path.basename(full_path_name), loading_start_time.strftime('%I:%M %p')))
+            with open(full_path_name, 'r', encoding='iso-8859-1') as file:
+                samples = []
+                for line in file:
+                    lnstrp = line.strip()
+                    if not lnstrp:
+                        continue
+                    if lnstrp == '===':
+                        if len(samples):
+                            yield samples
+                        samples = []
+                    else:
+                        samples.append(lnstrp[2:].strip())
+
+                if len(samples):
+                    yield samples
 
     def write_cleaned_conversations(self, cleaned_file):
         """
@@ -90,92 +118,120 @@ class Cleaner():
             cleaned_file: Cleaned file.
 
         """
-        pattern_curse = re.compile(
-            r'\b(ass|asshole|bastard|bitch|child-fucker|damn|fuck|fucking|motherfucker|motherfucking|'
-            r'nigger|shit|shitass)\b',
-            re.IGNORECASE)
-        special_chars = [34, 35, 36, 37, 38, 40, 41, 42, 43, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56, 57,
-                         60, 61, 62, 64, 91, 92, 93, 94, 95, 96]
-
-        with open(cleaned_file, 'a') as output_file:
-            counter_index = 0
-            for conversation in self.conversations:
-                written = False
-
-                # Iterate over all the samples of the conversation to get pairs
-                for conv_id in range(0, len(conversation) - 1, 2):
-                    input_line = conversation[conv_id]['text'].strip()
-                    target_line = conversation[conv_id + 1]['text'].strip()
-
-                    if all(ord(char) < 123 and ord(char) not in special_chars for char in input_line) and \
-                            all(ord(char) < 123 and ord(char) not in special_chars for char in target_line):
-                        input_line = self.get_formatted_line(input_line)
-                        target_line = self.get_formatted_line(target_line)
-
-                        # Discard conversations where answer has curse words
-                        if re.search(pattern_curse, target_line):
-                            continue
-
-                        # Discard sentences starting with a dot
-                        if input_line.startswith('.') or target_line.startswith('.'):
-                            continue
-
-                        # Discard sentences starting with a dash
-                        if input_line.startswith('-') or target_line.startswith('-'):
-                            continue
-
-                        # This is to speed up the parsing below
-                        if len(input_line) > 180 or len(target_line) > 180:
-                            continue
-
-                        in_tokens = nltk.word_tokenize(input_line)
-                        tg_tokens = nltk.word_tokenize(target_line)
-                        if 8 <= len(in_tokens) <= 32 and 8 <= len(tg_tokens) <= 32:
-                            output_file.write('{}\n'.format(input_line))
-                            output_file.write('{}\n'.format(target_line))
-                            written = True
-
-                if written:
-                    output_file.write('===\n')
-                    counter_index += 1
-                    end_time = datetime.now()
-                    elapsed_time = (end_time - start_time)
-                    print('\r# {:,} conversations wrote temporarily in {}.'.format(
-                        counter_index, str(elapsed_time).split('.')[0]), end='')
+        # A cleaned file which is also read is only appended to at the end
+        output_path = cleaned_file
+        if os.path.abspath(cleaned_file) in map(os.path.abspath, self.data_files):
+            output_path = cleaned_file + alice.tmp_file
+
+        cleaning_start_time = datetime.now()
+        written_count = 0
+        batches = batched(self.get_conversations(), clean_batch_size)
+        pool = Pool(self.workers) if self.workers > 1 else None
+        try:
+            if pool is not None:
+                # Batches are cleaned by the workers and written in order
+                cleaned_batches = ordered_pool_map(
+                    pool, clean_conversations, batches, 2 * self.workers)
+            else:
+                cleaned_batches = map(clean_conversations, batches)
+
+            with open(output_path, 'a') as output_file:
+                for cleaned_batch in cleaned_batches:
+                    for cleaned_conversation in cleaned_batch:
+                        if cleaned_conversation:
+                            output_file.write(cleaned_conversation)
+                            written_count += 1
+                    self.conversation_count += len(cleaned_batch)
+                    elapsed_time = datetime.now() - cleaning_start_time
+                    print('\r# {:,} conversations wrote temporarily in {}, {:,.0f} conversations/s '
+                          'cleaned by {} worker(s).'.format(
+                              written_count, str(elapsed_time).split('.')[0],
+                              self.conversation_count / max(elapsed_time.total_seconds(), 1e-6),
+                              self.workers), end='')
                     sys.stdout.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        if output_path != cleaned_file:
+            with open(output_path, 'rb') as input_file, open(cleaned_file, 'ab') as output_file:
+                shutil.copyfileobj(input_file, output_file)
+            os.remove(output_path)
 
     @staticmethod
     def get_formatted_line(line):
-        pattern_dot = re.compile(r'\.\s+\.')
-        pattern_dash = re.compile(r'-\s+-')
-        pattern_html = re.compile(r'<.*?>')
+        return filters.get_formatted_line(line)
+
+
+def clean_pairs(conversation):
+    """
+    Yields the pairs of a conversation which are kept, as the formatted
+    input and target lines followed by their tokens, so that the tokens can
+    be used without tokenizing the lines again.
+
+    Arguments:
+        conversation: Lines of the conversation without the delimiters.
+
+    """
+    # Iterate over all the samples of the conversation to get pairs
+    for conv_id in range(0, len(conversation) - 1, 2):
+        input_line = conversation[conv_id].strip()
+        target_line = conversation[conv_id + 1].strip()
+
+        if has_allowed_chars(input_line) and has_allowed_chars(target_line):
+            input_line = filters.get_formatted_line(input_line)
+            target_line = filters.get_formatted_line(target_line)
+
+            # Discard conversations where answer has curse words
+            if re.search(pattern_curse, target_line):
+                continue
+
+            # Discard sentences starting with a dot
+            if input_line.startswith('.') or target_line.startswith('.'):
+                continue
+
+            # Discard sentences starting with a dash
+            if input_line.startswith('-') or target_line.startswith('-'):
+                continue
+
+            # This is to speed up the parsing below
+            if len(input_line) > 180 or len(target_line) > 180:
+                continue
+
+            in_tokens = word_tokenize(input_line)
+            tg_tokens = word_tokenize(target_line)
+            if 8 <= len(in_tokens) <= 32 and 8 <= len(tg_tokens) <= 32:
+                yield input_line, target_line, in_tokens, tg_tokens
+
 
-        # Use formal ellipsis and dashes
-        while re.search(pattern_dot, line):
-            line = re.sub(pattern_dot, '..', line)
+def clean_conversation(conversation):
+    """
+    Returns the pairs of a conversation which are kept, followed by "===", or
+    an empty string if none is kept.
 
-        while re.search(pattern_dash, line):
-            line = re.sub(pattern_dash, '--', line)
+    Arguments:
+        conversation: Lines of the conversation without the delimiters.
 
-        line = re.sub('\.{3,}', '... ', line)
-        line = re.sub('-{2,}', ' -- ', line)
+    """
+    cleaned_lines = []
+    for input_line, target_line, _, _ in clean_pairs(conversation):
+        cleaned_lines.append('{}\n'.format(input_line))
+        cleaned_lines.append('{}\n'.format(target_line))
 
-        # Use formal apostrophe
-        line = line.replace(' \' ', '\'')
+    if cleaned_lines:
+        cleaned_lines.append('===\n')
+    return ''.join(cleaned_lines)
 
-        # Remove extra spaces
-        line = re.sub('\s+', ' ', line).strip()
-        line = line.replace(' .', '.').replace(' ?', '?').replace(' !', '!')
 
-        # Remove HTML tags
-        line = re.sub(pattern_html, '', line)
+def clean_conversations(conversations):
+    """
+    Cleans a batch of conversations, see "clean_conversation".
 
-        # Remove extra punctuations and m's
-        line = re.sub('\?{2,}', '?', line)
-        line = re.sub('!{2,}', '!', line)
-        line = re.sub('m{3,}', 'mm', line)
+    Arguments:
+        conversations: List of conversations.
 
-        return line
+    """
+    return [clean_conversation(conversation) for conversation in conversations]
 
 
 if __name__ == '__main__':
@@ -186,11 +242,9 @@ if __name__ == '__main__':
             alice.cassiopeia_output_file))
 
     cleaned_file = Cleaner(alice.parsed_dir)
-    end_time = datetime.now()
-    elapsed_time = (end_time - start_time)
-    print('\r# {:,} decent conversations to be considered.'.format(
-        len(cleaned_file.conversations)))
     cleaned_file.write_cleaned_conversations(alice.cassiopeia_temp_file)
-    print('\n# {} temporary file created.'.format(
+    print('\n# {:,} decent conversations were considered.'.format(
+        cleaned_file.conversation_count))
+    print('# {} temporary file created.'.format(
         alice.file_size(alice.cassiopeia_temp_file)))
     print('# Run .\\preprocessing.py file to continue.')
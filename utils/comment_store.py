@@ -0,0 +1,529 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+COMMENT STORE
+==============
+
+Comment Store keeps the conversation lines cached by the parser, keyed by the
+comment name and in the order they were added.
+
+## Stores:
+    * MemoryCommentStore: A dictionary, fast but bound by RAM.
+    * PackedCommentStore: Parallel arrays and a hash table of packed ids,
+      about three times as many lines as the dictionary in the same RAM but
+      slower to link into conversations, for parses bound by memory.
+    * SqliteCommentStore: A local sqlite file indexed by name, slower but
+      with bounded memory on inputs of any size.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from array import array
+import os
+import sqlite3
+
+# Lines are written to and read from sqlite in chunks of this size
+sqlite_chunk_size = 10000
+
+# Ids are spread over the hash table of the packed store by this multiplier
+hash_multiplier = 0x9e3779b97f4a7c15
+min_table_size = 1024
+max_uint64 = (1 << 64) - 1
+max_packed_id = (1 << 63) - 1
+
+
+class MemoryCommentStore(dict):
+    """Comment store held in a dictionary."""
+
+    def set_child_id(self, name, line, child_id):
+        """
+        Sets the child of a cached line.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the cached line.
+            line: The cached line itself.
+            child_id: Name of its child.
+
+        """
+        line.child_id = child_id
+
+    def clear_parent_id(self, name, line):
+        """
+        Marks a cached line as the start of a conversation.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the cached line.
+            line: The cached line itself.
+
+        """
+        line.parent_id = None
+
+    def roots(self):
+        """
+        Yields (name, line) for every line starting a conversation.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        for name, line in self.items():
+            if line.parent_id is None and line.child_id is not None:
+                yield name, line
+
+    def remove(self, names):
+        """
+        Removes cached lines.
+
+        Arguments:
+            self: An instance of the class.
+            names: Names of the lines to remove.
+
+        """
+        for name in names:
+            del self[name]
+
+    def close(self):
+        self.clear()
+
+
+class PackedCommentStore(object):
+    """Comment store held in parallel arrays, without an object per line."""
+
+    def __init__(self, line_class):
+        """
+        Creates an empty store.
+
+        Arguments:
+            self: An instance of the class.
+            line_class: Class of the cached lines, made again from the arrays
+                every time a line is read.
+
+        """
+        self.line_class = line_class
+        self.clear()
+
+    def clear(self):
+        # Ids are kept as integers, None as -1 and the ids which are not
+        # packed as -2 - their index in "other_ids". The name of a removed
+        # line is set to -1. Times fit in 32 bits until 2106.
+        self.names = array('q')
+        self.parent_ids = array('q')
+        self.child_ids = array('q')
+        self.scores = array('i')
+        self.created_utcs = array('I')
+        self.authors = array('I')
+        self.subreddits = array('I')
+        self.body_ends = array('Q')
+        self.bodies = array('B')
+        self.replaced_bodies = {}
+        self.other_ids = []
+        self.other_id_codes = {}
+        self.strings = []
+        self.string_codes = {}
+        self.line_count = 0
+
+        # Open addressing table of the rows, -1 for an empty slot
+        self.table = array('i', [-1]) * min_table_size
+
+    def close(self):
+        self.clear()
+
+    def _encode_id(self, reddit_id):
+        if reddit_id is None:
+            return -1
+        if isinstance(reddit_id, int) and 0 <= reddit_id <= max_packed_id:
+            return reddit_id
+        code = self.other_id_codes.get(reddit_id)
+        if code is None:
+            code = self.other_id_codes[reddit_id] = -2 - len(self.other_ids)
+            self.other_ids.append(reddit_id)
+        return code
+
+    def _decode_id(self, code):
+        if code >= 0:
+            return code
+        if code == -1:
+            return None
+        return self.other_ids[-2 - code]
+
+    def _encode_string(self, text):
+        code = self.string_codes.get(text)
+        if code is None:
+            code = self.string_codes[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+
+    def _find_slot(self, code):
+        """Slot of the id in the table, or the empty slot it would take."""
+        table = self.table
+        names = self.names
+        size = len(table)
+        slot = ((code * hash_multiplier) & max_uint64) * size >> 64
+        while True:
+            row = table[slot]
+            if row < 0 or names[row] == code:
+                return slot
+            slot += 1
+            if slot == size:
+                slot = 0
+
+    def _find_row(self, name):
+        if name is None:
+            return -1
+        if isinstance(name, int) and 0 <= name <= max_packed_id:
+            code = name
+        else:
+            code = self.other_id_codes.get(name)
+            if code is None:
+                return -1
+        return self.table[self._find_slot(code)]
+
+    def _resize_table(self, size):
+        self.table = array('i', [-1]) * size
+        for row, code in enumerate(self.names):
+            if code != -1:
+                self.table[self._find_slot(code)] = row
+
+    def _get_body(self, row):
+        if row in self.replaced_bodies:
+            return self.replaced_bodies[row]
+        return self.bodies[self.body_ends[row - 1] if row else 0:
+                           self.body_ends[row]].tobytes().decode('utf-8', 'surrogatepass')
+
+    def _make_line(self, row):
+        line = self.line_class.__new__(self.line_class)
+        line.body = self._get_body(row)
+        line.score = self.scores[row]
+        line.author = self.strings[self.authors[row]]
+        line.subreddit = self.strings[self.subreddits[row]]
+        line.created_utc = self.created_utcs[row]
+        line.parent_id = self._decode_id(self.parent_ids[row])
+        line.child_id = self._decode_id(self.child_ids[row])
+        return line
+
+    def __setitem__(self, name, line):
+        # Adding a name twice keeps its first position, like a dictionary,
+        # a new body is kept aside until the arrays are packed
+        row = self._find_row(name)
+        if row >= 0:
+            if line.body != self._get_body(row):
+                self.replaced_bodies[row] = line.body
+            self.scores[row] = line.score
+            self.created_utcs[row] = line.created_utc
+            self.authors[row] = self._encode_string(line.author)
+            self.subreddits[row] = self._encode_string(line.subreddit)
+            self.parent_ids[row] = self._encode_id(line.parent_id)
+            self.child_ids[row] = self._encode_id(line.child_id)
+            return
+
+        code = self._encode_id(name)
+        row = len(self.names)
+        self.names.append(code)
+        self.bodies.frombytes(line.body.encode('utf-8', 'surrogatepass'))
+        self.body_ends.append(len(self.bodies))
+        self.scores.append(line.score)
+        self.created_utcs.append(line.created_utc)
+        self.authors.append(self._encode_string(line.author))
+        self.subreddits.append(self._encode_string(line.subreddit))
+        self.parent_ids.append(self._encode_id(line.parent_id))
+        self.child_ids.append(self._encode_id(line.child_id))
+        self.line_count += 1
+        self.table[self._find_slot(code)] = row
+        if 4 * len(self.names) > 3 * len(self.table):
+            self._resize_table(3 * len(self.table) // 2)
+
+    def __contains__(self, name):
+        return self._find_row(name) >= 0
+
+    def __getitem__(self, name):
+        row = self._find_row(name)
+        if row < 0:
+            raise KeyError(name)
+        return self._make_line(row)
+
+    def __len__(self):
+        return self.line_count
+
+    def get(self, name, default=None):
+        row = self._find_row(name)
+        if row < 0:
+            return default
+        return self._make_line(row)
+
+    def items(self):
+        """
+        Yields (name, line) for every cached line in the order it was added.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        for row, code in enumerate(self.names):
+            if code != -1:
+                yield self._decode_id(code), self._make_line(row)
+
+    def roots(self):
+        """
+        Yields (name, line) for every line starting a conversation.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        for row, code in enumerate(self.names):
+            if code != -1 and self.parent_ids[row] == -1 and self.child_ids[row] != -1:
+                yield self._decode_id(code), self._make_line(row)
+
+    def set_child_id(self, name, line, child_id):
+        """
+        Sets the child of a cached line.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the cached line.
+            line: The cached line itself.
+            child_id: Name of its child.
+
+        """
+        line.child_id = child_id
+        self.child_ids[self._find_row(name)] = self._encode_id(child_id)
+
+    def clear_parent_id(self, name, line):
+        """
+        Marks a cached line as the start of a conversation.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the cached line.
+            line: The cached line itself.
+
+        """
+        line.parent_id = None
+        self.parent_ids[self._find_row(name)] = -1
+
+    def remove(self, names):
+        """
+        Removes cached lines. Their rows are only marked, the arrays are
+        packed again once most of the rows are removed ones.
+
+        Arguments:
+            self: An instance of the class.
+            names: Names of the lines to remove.
+
+        """
+        for name in names:
+            row = self._find_row(name)
+            if row < 0:
+                raise KeyError(name)
+            self.names[row] = -1
+            self.replaced_bodies.pop(row, None)
+            self.line_count -= 1
+
+        if len(self.names) > 2 * self.line_count + min_table_size:
+            self._pack()
+
+    def _pack(self):
+        """Copies the rows which are not removed into new arrays."""
+        fields = ['names', 'parent_ids', 'child_ids', 'scores', 'created_utcs',
+                  'authors', 'subreddits']
+        old_arrays = [getattr(self, field) for field in fields]
+        new_arrays = [array(old_array.typecode) for old_array in old_arrays]
+        body_ends = array('Q')
+        bodies = array('B')
+        for row, code in enumerate(self.names):
+            if code == -1:
+                continue
+            for old_array, new_array in zip(old_arrays, new_arrays):
+                new_array.append(old_array[row])
+            if row in self.replaced_bodies:
+                bodies.frombytes(self.replaced_bodies[row].encode('utf-8', 'surrogatepass'))
+            else:
+                bodies += self.bodies[self.body_ends[row - 1] if row else 0:self.body_ends[row]]
+            body_ends.append(len(bodies))
+
+        for field, new_array in zip(fields, new_arrays):
+            setattr(self, field, new_array)
+        self.body_ends = body_ends
+        self.bodies = bodies
+        self.replaced_bodies = {}
+        self._resize_table(max(min_table_size, 2 * len(self.names)))
+
+
+class SqliteCommentStore(object):
+    """Comment store kept in a sqlite file on disk."""
+
+    def __init__(self, path, line_class):
+        """
+        Creates an empty store.
+
+        Arguments:
+            self: An instance of the class.
+            path: Sqlite file, replaced if it already exists.
+            line_class: Class of the cached lines, its "stored_fields" are
+                saved as columns.
+
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.line_class = line_class
+        self.fields = list(line_class.stored_fields)
+        self.pending_lines = []
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = OFF')
+        self.connection.execute('PRAGMA synchronous = OFF')
+        self.connection.execute('CREATE TABLE lines (id INTEGER PRIMARY KEY, name UNIQUE, {})'.format(
+            ', '.join(self.fields)))
+
+        # Adding a name twice keeps its first position, like a dictionary
+        self.insert_query = 'INSERT INTO lines (name, {0}) VALUES (?, {1}) ON CONFLICT (name) DO UPDATE SET {2}'.format(
+            ', '.join(self.fields), ', '.join('?' for _ in self.fields),
+            ', '.join('{0} = excluded.{0}'.format(field) for field in self.fields))
+        self.select_query = 'SELECT {} FROM lines WHERE name = ?'.format(
+            ', '.join(self.fields))
+
+    def _make_line(self, row):
+        line = self.line_class.__new__(self.line_class)
+        for field, value in zip(self.fields, row):
+            setattr(line, field, value)
+        return line
+
+    def _flush(self):
+        if self.pending_lines:
+            self.connection.executemany(self.insert_query, self.pending_lines)
+            self.pending_lines = []
+
+    def __setitem__(self, name, line):
+        self.pending_lines.append(
+            [name] + [getattr(line, field) for field in self.fields])
+        if len(self.pending_lines) >= sqlite_chunk_size:
+            self._flush()
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __getitem__(self, name):
+        line = self.get(name)
+        if line is None:
+            raise KeyError(name)
+        return line
+
+    def __len__(self):
+        self._flush()
+        return self.connection.execute('SELECT COUNT(*) FROM lines').fetchone()[0]
+
+    def get(self, name, default=None):
+        if name is None:
+            return default
+        self._flush()
+        row = self.connection.execute(self.select_query, (name,)).fetchone()
+        if row is None:
+            return default
+        return self._make_line(row)
+
+    def _select_chunks(self, condition=''):
+        self._flush()
+        last_id = 0
+        query = 'SELECT id, name, {} FROM lines WHERE id > ? {} ORDER BY id LIMIT {}'.format(
+            ', '.join(self.fields), condition, sqlite_chunk_size)
+        while True:
+            rows = self.connection.execute(query, (last_id,)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[1], self._make_line(row[2:])
+            last_id = rows[-1][0]
+
+    def items(self):
+        """
+        Yields (name, line) for every cached line in the order it was added.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        return self._select_chunks()
+
+    def roots(self):
+        """
+        Yields (name, line) for every line starting a conversation.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        return self._select_chunks('AND parent_id IS NULL AND child_id IS NOT NULL')
+
+    def set_child_id(self, name, line, child_id):
+        """
+        Sets the child of a cached line.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the cached line.
+            line: The cached line itself.
+            child_id: Name of its child.
+
+        """
+        line.child_id = child_id
+        self._flush()
+        self.connection.execute(
+            'UPDATE lines SET child_id = ? WHERE name = ?', (child_id, name))
+
+    def clear_parent_id(self, name, line):
+        """
+        Marks a cached line as the start of a conversation.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the cached line.
+            line: The cached line itself.
+
+        """
+        line.parent_id = None
+        self._flush()
+        self.connection.execute(
+            'UPDATE lines SET parent_id = NULL WHERE name = ?', (name,))
+
+    def remove(self, names):
+        """
+        Removes cached lines.
+
+        Arguments:
+            self: An instance of the class.
+            names: Names of the lines to remove.
+
+        """
+        self._flush()
+        self.connection.executemany(
+            'DELETE FROM lines WHERE name = ?', ((name,) for name in names))
+
+    def clear(self):
+        self.pending_lines = []
+        self.connection.execute('DELETE FROM lines')
+
+    def close(self):
+        self.connection.close()
+        os.remove(self.path)
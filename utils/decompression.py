@@ -0,0 +1,117 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+DECOMPRESSION
+==============
+
+Decompression opens the Reddit dump files as streams of decompressed bytes,
+picking the decompressor by the file extension.
+
+## Dump files:
+    * ".bz2": Older comment dumps.
+    * ".xz": Comment dumps from 2017 and 2018.
+    * ".zst": Newer comment dumps, read with "zstandard" when it is installed.
+      These are compressed with a window of up to 2 GB, which is streamed
+      rather than read into memory.
+    * ".json" and ".ndjson": Dumps which are already decompressed.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from bz2 import BZ2File
+import io
+import lzma
+
+import alice_config as alice
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Largest zstd window the dumps are compressed with, zstandard refuses windows
+# above 128 MB unless told otherwise
+zstd_max_window_size = 2 ** 31
+read_buffer_size = 2 ** 20
+
+
+def _open_zst_file(path):
+    if zstandard is None:
+        raise ImportError(
+            '"zstandard" is not installed, it is needed for reading "{}".'.format(path))
+    decompressor = zstandard.ZstdDecompressor(max_window_size=zstd_max_window_size)
+    reader = decompressor.stream_reader(
+        open(path, 'rb'), read_size=read_buffer_size, read_across_frames=True)
+    return io.BufferedReader(reader, read_buffer_size)
+
+
+def _open_plain_file(path):
+    return open(path, 'rb', buffering=read_buffer_size)
+
+
+input_openers = {
+    alice.bz2_file: lambda path: BZ2File(path, 'r'),
+    alice.xz_file: lambda path: lzma.open(path, 'rb'),
+    alice.zst_file: _open_zst_file,
+    alice.json_file: _open_plain_file,
+    alice.ndjson_file: _open_plain_file,
+}
+
+
+def is_input_file(path):
+    """
+    Returns True if the file is a dump file which can be read.
+
+    Arguments:
+        path: Name or path of the file.
+
+    """
+    return path.endswith(tuple(input_openers))
+
+
+def open_input_file(path, offset=0):
+    """
+    Opens a dump file for reading decompressed bytes.
+
+    Arguments:
+        path: Path of the dump file.
+        offset: Decompressed byte offset to start reading at. Streams which
+            cannot seek read up to it instead.
+
+    """
+    for extension, opener in input_openers.items():
+        if path.endswith(extension):
+            break
+    else:
+        raise ValueError('"{}" is not a supported dump file.'.format(path))
+    input_data = opener(path)
+    if offset > 0:
+        if input_data.seekable():
+            input_data.seek(offset)
+        else:
+            while offset > 0:
+                skipped = len(input_data.read(min(offset, read_buffer_size)))
+                if skipped == 0:
+                    break
+                offset -= skipped
+    return input_data
@@ -0,0 +1,313 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+DEDUP
+======
+
+Dedup removes the pairs of "cassiopeia_cleaned.xames3" which are nearly the
+same as a pair kept before them, like bot replies, copypasta and the many
+"this" and "lol" threads. Run it after "preprocessing.py" and before
+"temp_vocab.py", or set "dedup_threshold" in pparams for "prepare.py" and
+"runner.py" to do it.
+
+Every pair is fingerprinted with a MinHash of the shingles of its "X:" and
+"A:" tokens. The fingerprints are cut into bands and a pair is only compared
+with the kept pairs which share a band with it (LSH). A pair whose estimated
+Jaccard similarity with one of them is at least "dedup_threshold" is
+removed.
+
+Only the fingerprints of the last "dedup_window" kept pairs are remembered,
+so the memory used does not grow with the size of the file, and a duplicate
+further apart than that is kept. A band is remembered for at most
+"bucket_size" of them, the oldest one is forgotten for that band first.
+
+    Z:\\alice\\utils>py dedup.py
+    Z:\\alice\\utils>py dedup.py --threshold 0.7
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from array import array
+from datetime import datetime
+import os
+import sys
+import argparse
+import json
+import random
+import zlib
+
+from refiner import get_conversations
+import alice_config as alice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+start_time = datetime.now()
+
+# The permutations are (a * shingle + b) mod 2 ** 64 mod this prime, the
+# wrap to 64 bits is how NumPy multiplies so both give the same hashes
+mersenne_prime = (1 << 61) - 1
+max_uint64 = (1 << 64) - 1
+
+# Number of kept pairs remembered for the same band
+bucket_size = 8
+
+
+class MinHasher(object):
+    """Fingerprints the tokens of a pair with a MinHash of their shingles."""
+
+    def __init__(self, permutations=64, shingle_size=3, seed=1):
+        """
+        Creates an instance of the class.
+
+        Arguments:
+            self: An instance of the class.
+            permutations: Number of hash values in a fingerprint.
+            shingle_size: Number of tokens in a shingle.
+            seed: Seed of the permutations, the same seed gives the same
+                fingerprints.
+
+        """
+        rng = random.Random(seed)
+        self.permutations = permutations
+        self.shingle_size = shingle_size
+        self.a = [rng.randrange(1, mersenne_prime) for _ in range(permutations)]
+        self.b = [rng.randrange(0, mersenne_prime) for _ in range(permutations)]
+        if np is not None:
+            self.np_a = np.array(self.a, dtype=np.uint64)
+            self.np_b = np.array(self.b, dtype=np.uint64)
+
+    def get_shingles(self, source_tokens, target_tokens):
+        """
+        Returns the hashes of the shingles of a pair, the shingles of the
+        input and the target line are told apart.
+
+        Arguments:
+            self: An instance of the class.
+            source_tokens: Tokens of the "X:" line.
+            target_tokens: Tokens of the "A:" line.
+
+        """
+        shingles = set()
+        for prefix, tokens in [('X', source_tokens), ('A', target_tokens)]:
+            tokens = [token.lower() for token in tokens]
+            for index in range(max(1, len(tokens) - self.shingle_size + 1)):
+                shingle = prefix + ' ' + ' '.join(tokens[index:index + self.shingle_size])
+                shingles.add(zlib.crc32(shingle.encode('utf-8')))
+        return sorted(shingles)
+
+    def get_signature(self, shingles):
+        """
+        Returns the MinHash of the shingles, the same with or without NumPy.
+
+        Arguments:
+            self: An instance of the class.
+            shingles: Hashes of the shingles, see "get_shingles".
+
+        """
+        if np is not None:
+            values = np.array(shingles, dtype=np.uint64)[:, None] * self.np_a + self.np_b
+            return (values % np.uint64(mersenne_prime)).min(axis=0).tolist()
+        return [min(((a * shingle + b) & max_uint64) % mersenne_prime for shingle in shingles)
+                for a, b in zip(self.a, self.b)]
+
+
+class NearDuplicateIndex(object):
+    """Fingerprints of the last kept pairs, bucketed by band."""
+
+    def __init__(self, threshold, permutations=64, bands=8, shingle_size=3, window=250000):
+        """
+        Creates an empty index.
+
+        Arguments:
+            self: An instance of the class.
+            threshold: Estimated Jaccard similarity from which a pair is a
+                near-duplicate.
+            permutations: Number of hash values in a fingerprint.
+            bands: Number of bands the fingerprint is cut into, more bands
+                find pairs which are less similar.
+            shingle_size: Number of tokens in a shingle.
+            window: Number of kept pairs whose fingerprints are remembered.
+
+        """
+        if permutations % bands:
+            raise ValueError('{} permutations cannot be cut into {} bands.'.format(
+                permutations, bands))
+        self.threshold = threshold
+        self.hasher = MinHasher(permutations, shingle_size)
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self.window = window
+
+        # A ring of the fingerprints, which grows until it has "window" of
+        # them, and the last slots of every band key, oldest first
+        self.signatures = array('Q')
+        self.buckets = {}
+        self.added_count = 0
+        self.checked_count = 0
+        self.duplicate_count = 0
+
+    def get_band_keys(self, signature):
+        return [hash((band,) + tuple(signature[band * self.rows:(band + 1) * self.rows]))
+                for band in range(self.bands)]
+
+    def get_similarity(self, signature, slot):
+        stored = self.signatures[slot * self.permutations:(slot + 1) * self.permutations]
+        return sum(1 for x, y in zip(signature, stored) if x == y) / self.permutations
+
+    def add(self, signature, band_keys):
+        slot = self.added_count % self.window
+        if self.added_count < self.window:
+            self.signatures.extend(signature)
+        else:
+            stored = self.signatures[slot * self.permutations:(slot + 1) * self.permutations]
+            for key in self.get_band_keys(stored):
+                slots = self.buckets.get(key)
+                if slots is not None and slot in slots:
+                    slots.remove(slot)
+                    if not slots:
+                        del self.buckets[key]
+            self.signatures[slot * self.permutations:(slot + 1) * self.permutations] = \
+                array('Q', signature)
+        for key in band_keys:
+            slots = self.buckets.setdefault(key, [])
+            if len(slots) >= bucket_size:
+                del slots[0]
+            slots.append(slot)
+        self.added_count += 1
+
+    def is_duplicate(self, source_tokens, target_tokens):
+        """
+        Returns True if the pair is a near-duplicate of a remembered pair,
+        otherwise remembers it and returns False.
+
+        Arguments:
+            self: An instance of the class.
+            source_tokens: Tokens of the "X:" line.
+            target_tokens: Tokens of the "A:" line.
+
+        """
+        self.checked_count += 1
+        signature = self.hasher.get_signature(
+            self.hasher.get_shingles(source_tokens, target_tokens))
+        band_keys = self.get_band_keys(signature)
+        compared = set()
+        for key in band_keys:
+            for slot in self.buckets.get(key, ()):
+                if slot in compared:
+                    continue
+                compared.add(slot)
+                if self.get_similarity(signature, slot) >= self.threshold:
+                    self.duplicate_count += 1
+                    return True
+
+        self.add(signature, band_keys)
+        return False
+
+
+def get_dedup_index(config_file):
+    """
+    Returns the index set up by pparams, or None if "dedup_threshold" is 0.
+
+    Arguments:
+        config_file: Pparams.
+
+    """
+    if config_file['dedup_threshold'] <= 0:
+        return None
+    return NearDuplicateIndex(config_file['dedup_threshold'], config_file['dedup_permutations'],
+                              config_file['dedup_bands'], config_file['dedup_shingle_size'],
+                              config_file['dedup_window'])
+
+
+def dedup_file(input_path, output_path, dedup_index):
+    """
+    Appends the pairs of a tokenized file which are not near-duplicates to
+    the output file, one conversation at a time.
+
+    Arguments:
+        input_path: Tokenized file, "cassiopeia_cleaned.xames3" for instance.
+        output_path: File the kept pairs are appended to.
+        dedup_index: Index the pairs are checked against.
+
+    Returns the number of pairs removed.
+    """
+    removed_count = 0
+    conversation_count = 0
+    with open(output_path, 'a') as output_file:
+        for conversation in get_conversations(input_path):
+            conversation_count += 1
+            written = False
+            for counter_index in range(0, len(conversation) - 1, 2):
+                src_line = conversation[counter_index]
+                tgt_line = conversation[counter_index + 1]
+                if dedup_index.is_duplicate(src_line[2:].strip().split(' '),
+                                            tgt_line[2:].strip().split(' ')):
+                    removed_count += 1
+                    continue
+                output_file.write('{}\n{}\n'.format(src_line, tgt_line))
+                written = True
+
+            if written:
+                output_file.write('===\n')
+
+            if conversation_count % 10000 == 0:
+                elapsed_time = datetime.now() - start_time
+                print('\r# {:,} conversations read, {:,} near-duplicate pairs removed in {}.'.format(
+                    conversation_count, removed_count, str(elapsed_time).split('.')[0]), end='')
+                sys.stdout.flush()
+
+    elapsed_time = datetime.now() - start_time
+    print('\r# {:,} conversations read, {:,} near-duplicate pairs removed in {}.'.format(
+        conversation_count, removed_count, str(elapsed_time).split('.')[0]))
+    return removed_count
+
+
+if __name__ == '__main__':
+    with open(alice.pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+
+    arg_parser = argparse.ArgumentParser(description='Remove the near-duplicate pairs.')
+    arg_parser.add_argument('--threshold', type=float, default=None,
+                            help='similarity from which a pair is removed, "dedup_threshold" '
+                            'of pparams if missing')
+    args = arg_parser.parse_args()
+    if args.threshold is not None:
+        config_file['dedup_threshold'] = args.threshold
+
+    dedup_index = get_dedup_index(config_file)
+    if dedup_index is None:
+        print('# Near-duplicate removal is off, set "dedup_threshold" or pass --threshold.')
+        sys.exit(1)
+
+    output_path = alice.cassiopeia_cleaned_file + alice.tmp_file
+    if os.path.isfile(output_path):
+        os.remove(output_path)
+    removed_count = dedup_file(alice.cassiopeia_cleaned_file, output_path, dedup_index)
+    os.replace(output_path, alice.cassiopeia_cleaned_file)
+    print('# {:,} of {:,} pairs removed, deduplicated file of {}.'.format(
+        removed_count, dedup_index.checked_count, alice.file_size(alice.cassiopeia_cleaned_file)))
+    print('# Run .\\temp_vocab.py file to continue.')
@@ -0,0 +1,286 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+EXCEPTION INDEX
+================
+
+Exception Index looks up the words of the exception file for the refiner and
+the pair filters of the parser.
+
+An exception file up to "exception_set_file_size" bytes is loaded into a
+set. A larger one is sorted once into "exception_index.xames3" next to it,
+which is memory mapped and searched by bisection, so only a Bloom filter of
+about 10 bits per word is kept in memory. The Bloom filter answers most
+lookups of words which are not exceptions without touching the file.
+
+Both are context managers, close the index once it is no longer needed so
+that the exception file can be written again. The index is pickled without
+its open file, which is opened again on the first lookup in a worker.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import hashlib
+import heapq
+import locale
+import math
+import mmap
+import itertools
+import tempfile
+
+# Largest exception file loaded into a set, in bytes
+max_set_file_size = 100 * 2 ** 20
+
+# Words sorted in memory at once while building the index
+sort_run_size = 10 ** 6
+
+# Share of the words which are not exceptions but pass the Bloom filter
+false_positive_rate = 0.01
+
+
+def load_exception_words(path):
+    """
+    Returns the set of words listed in the exception file.
+
+    Arguments:
+        path: Exception file, one word per line.
+
+    """
+    exception_words = ExceptionSet()
+    with open(path, 'r') as exception_file:
+        for line in exception_file:
+            lnstrp = line.strip()
+            if not lnstrp:
+                continue
+            exception_words.add(lnstrp)
+    return exception_words
+
+
+def get_index_path(exception_file):
+    """Returns the sorted index file of an exception file."""
+    base_name, extension = os.path.splitext(exception_file)
+    return base_name + '_index' + extension
+
+
+def write_sorted_index(exception_file, index_file):
+    """
+    Writes the words of the exception file sorted and without duplicates, a
+    word per line. Runs of "sort_run_size" words are sorted in memory and
+    merged, so the exception file does not have to fit in memory.
+
+    Arguments:
+        exception_file: Exception file, one word per line.
+        index_file: Sorted index file to be written.
+
+    """
+    run_files = []
+    try:
+        with open(exception_file, 'rb') as input_file:
+            while True:
+                lines = list(itertools.islice(input_file, sort_run_size))
+                if not lines:
+                    break
+                run_file = tempfile.TemporaryFile()
+                words = sorted({line.strip() for line in lines if line.strip()})
+                run_file.writelines(word + b'\n' for word in words)
+                run_file.seek(0)
+                run_files.append(run_file)
+
+        with open(index_file + '.tmp', 'wb') as output_file:
+            previous_line = None
+            for line in heapq.merge(*run_files, key=lambda line: line[:-1]):
+                if line != previous_line:
+                    output_file.write(line)
+                    previous_line = line
+        os.replace(index_file + '.tmp', index_file)
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+class ExceptionSet(set):
+    """Exception words in memory, closed like an "ExceptionIndex"."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+
+class BloomFilter(object):
+    """Set of words which may answer True for a word it does not have."""
+
+    def __init__(self, word_count, error_rate=false_positive_rate):
+        """
+        Creates an empty filter.
+
+        Arguments:
+            self: An instance of the class.
+            word_count: Number of words which will be added.
+            error_rate: Share of the other words for which it answers True.
+
+        """
+        bit_count = max(64, int(-word_count * math.log(error_rate) / math.log(2) ** 2))
+        self.bit_count = bit_count
+        self.hash_count = max(1, int(round(bit_count / max(word_count, 1) * math.log(2))))
+        self.bits = bytearray((bit_count + 7) // 8)
+
+    def get_hashes(self, word):
+        # Double hashing from the two halves of a hash of the word which is
+        # the same in every process, unlike "hash()" of a string
+        digest = hashlib.blake2b(word.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+        word_hash = int.from_bytes(digest, 'little')
+        return word_hash & 0xffffffff, (word_hash >> 32) | 1
+
+    def add(self, word):
+        position, step = self.get_hashes(word)
+        for _ in range(self.hash_count):
+            position %= self.bit_count
+            self.bits[position >> 3] |= 1 << (position & 7)
+            position += step
+
+    def __contains__(self, word):
+        position, step = self.get_hashes(word)
+        bits = self.bits
+        for _ in range(self.hash_count):
+            position %= self.bit_count
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+
+class ExceptionIndex(object):
+    """Exception words in a memory mapped sorted file behind a Bloom filter."""
+
+    def __init__(self, index_file):
+        """
+        Maps the sorted index file and fills the Bloom filter from it.
+
+        Arguments:
+            self: An instance of the class.
+            index_file: Sorted index file, see "write_sorted_index".
+
+        """
+        # Words are compared with the bytes the exception file was written in
+        self.encoding = locale.getpreferredencoding(False)
+        self.index_file = index_file
+        self.file = None
+        self.map = None
+
+        with open(index_file, 'rb') as input_file:
+            word_count = sum(block.count(b'\n')
+                             for block in iter(lambda: input_file.read(2 ** 20), b''))
+            self.bloom_filter = BloomFilter(word_count)
+            input_file.seek(0)
+            for line in input_file:
+                self.bloom_filter.add(line.rstrip(b'\n').decode(self.encoding, 'replace'))
+        self.word_count = word_count
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['file'] = None
+        state['map'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.word_count
+
+    def open(self):
+        """
+        Opens and maps the index file.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        self.file = open(self.index_file, 'rb')
+        if os.path.getsize(self.index_file):
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, word):
+        if word not in self.bloom_filter:
+            return False
+        if self.file is None:
+            self.open()
+        if self.map is None:
+            return False
+        try:
+            key = word.encode(self.encoding)
+        except UnicodeEncodeError:
+            return False
+
+        # Bisect the lines starting between "low" and "high"
+        low, high = 0, len(self.map)
+        while low < high:
+            start = self.map.rfind(b'\n', low, (low + high) // 2) + 1 or low
+            end = self.map.find(b'\n', start)
+            line = self.map[start:end]
+            if line == key:
+                return True
+            if line < key:
+                low = end + 1
+            else:
+                high = start
+        return False
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def load_exception_index(exception_file, set_file_size=max_set_file_size):
+    """
+    Returns the exception words as an "ExceptionSet", or as an
+    "ExceptionIndex" if the exception file is larger than "set_file_size"
+    bytes. The index file is written again whenever the exception file is
+    newer.
+
+    Arguments:
+        exception_file: Exception file, one word per line.
+        set_file_size: Largest exception file loaded into a set, in bytes.
+
+    """
+    if os.path.getsize(exception_file) <= set_file_size:
+        return load_exception_words(exception_file)
+
+    index_file = get_index_path(exception_file)
+    if not os.path.isfile(index_file) or \
+            os.path.getmtime(index_file) < os.path.getmtime(exception_file):
+        write_sorted_index(exception_file, index_file)
+    return ExceptionIndex(index_file)
@@ -0,0 +1,225 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+FILTERS
+========
+
+Filters holds the rules the cleaner and the refiner use for dropping
+conversation pairs, so that the parser can apply them before writing.
+
+A pair is an input line followed by its target line. The cleaner drops it if:
+    * Either line has a character outside the allowed ones.
+    * The formatted target line has a curse word.
+    * Either formatted line starts with a dot or a dash.
+    * Either formatted line is longer than 180 characters.
+    * Either formatted line is not 8 to 32 "nltk" tokens long.
+The refiner then drops it if either line has a token from the exception list.
+
+"PairFilter" only drops the pairs the cleaner would certainly drop later on,
+without "nltk": a word of letters and digits is a token of its own, and any
+other word is split into at least one and at most as many tokens as it has
+characters. Whatever it keeps still goes through the cleaner, which gives the
+same results as if the parser had not filtered anything.
+
+The exception words are only checked if an exception file is given. That
+file is written by "temp_vocab.py" from the corpus being parsed, so while
+parsing it is the one of an earlier run, or missing. Checking it drops pairs
+the refiner would keep and makes the vocab of a run depend on the previous
+one, which is why the parser only does it with "pair_filter_exceptions".
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import re
+
+from exception_index import ExceptionSet, load_exception_index, max_set_file_size
+
+pattern_curse = re.compile(
+    r'\b(ass|asshole|bastard|bitch|child-fucker|damn|fuck|fucking|motherfucker|motherfucking|'
+    r'nigger|shit|shitass)\b',
+    re.IGNORECASE)
+special_chars = [34, 35, 36, 37, 38, 40, 41, 42, 43, 47, 48, 49, 50, 51, 52, 53, 54, 55, 56, 57,
+                 60, 61, 62, 64, 91, 92, 93, 94, 95, 96]
+
+# Any character from 123 up or in "special_chars", found in one regex search
+pattern_disallowed_chars = re.compile('[^{}]'.format(re.escape(''.join(
+    chr(code) for code in range(123) if code not in special_chars))))
+pattern_html = re.compile(r'<.*?>')
+
+# Whitespace between two dots or two dashes, removing all of it at once is the
+# same as collapsing ". ." and "- -" until none is left
+pattern_dot_dash_spaces = re.compile(r'(?<=\.)\s+(?=\.)|(?<=-)\s+(?=-)')
+pattern_ellipsis = re.compile(r'\.{3,}')
+pattern_dashes = re.compile(r'-{2,}')
+pattern_repeats = re.compile(r'([?!])\1+|(mm)m+')
+
+max_line_length = 180
+min_line_tokens = 8
+max_line_tokens = 32
+
+# Words of letters and digits which "nltk" still splits in two
+split_words = {'cannot', 'gimme', 'gonna', 'gotta', 'lemme', 'wanna', 'whaddya', 'whatcha'}
+
+
+def has_allowed_chars(line):
+    """
+    Returns True if every character of the line is allowed in the cleaned
+    conversations.
+
+    Arguments:
+        line: Line to be checked.
+
+    """
+    return pattern_disallowed_chars.search(line) is None
+
+
+def get_formatted_line(line):
+    """
+    Formats the punctuation and spacing of a line the way the cleaner writes
+    it.
+
+    Every pattern is compiled once and skipped when the line cannot match it.
+
+    Arguments:
+        line: Line to be formatted.
+
+    """
+    # Use formal ellipsis and dashes
+    if '.' in line or '-' in line:
+        line = pattern_dot_dash_spaces.sub('', line)
+        if '...' in line:
+            line = pattern_ellipsis.sub('... ', line)
+        if '--' in line:
+            line = pattern_dashes.sub(' -- ', line)
+
+    # Use formal apostrophe
+    line = line.replace(' \' ', '\'')
+
+    # Remove extra spaces
+    line = ' '.join(line.split())
+    line = line.replace(' .', '.').replace(' ?', '?').replace(' !', '!')
+
+    # Remove HTML tags
+    if '<' in line:
+        line = pattern_html.sub('', line)
+
+    # Remove extra punctuations and m's
+    if '??' in line or '!!' in line or 'mmm' in line:
+        line = pattern_repeats.sub(r'\1\2', line)
+
+    return line
+
+
+class PairFilter(object):
+    """Drops the conversation pairs the cleaner would drop."""
+
+    def __init__(self, exception_file=None, set_file_size=max_set_file_size):
+        """
+        Creates an instance of the class.
+
+        Arguments:
+            self: An instance of the class.
+            exception_file: Exception file whose words drop a pair, they
+                are not checked if it is missing.
+            set_file_size: Largest exception file loaded into a set, see
+                "load_exception_index".
+
+        """
+        self.exception_words = ExceptionSet()
+        if exception_file is not None and os.path.isfile(exception_file):
+            self.exception_words = load_exception_index(exception_file, set_file_size)
+
+    def close(self):
+        self.exception_words.close()
+
+    def line_may_qualify(self, line):
+        """
+        Returns the formatted line if it may still be written by the
+        cleaner, and has no exception word, otherwise None.
+
+        Arguments:
+            self: An instance of the class.
+            line: Input or target line of a pair.
+
+        """
+        if not has_allowed_chars(line):
+            return None
+        line = get_formatted_line(line)
+        if line.startswith('.') or line.startswith('-') or len(line) > max_line_length:
+            return None
+
+        words = line.split()
+        if len(words) > max_line_tokens:
+            return None
+        max_tokens = 0
+        for word in words:
+            if word.isalnum() and word.lower() not in split_words:
+                max_tokens += 1
+                if word.lower() in self.exception_words:
+                    return None
+            else:
+                max_tokens += len(word)
+        if max_tokens < min_line_tokens:
+            return None
+        return line
+
+    def pair_may_qualify(self, input_line, target_line):
+        """
+        Returns False if the pair would certainly be dropped by the cleaner,
+        or has an exception word.
+
+        Arguments:
+            self: An instance of the class.
+            input_line: Input line of the pair.
+            target_line: Target line of the pair.
+
+        """
+        input_line = self.line_may_qualify(input_line.strip())
+        if input_line is None:
+            return False
+        target_line = self.line_may_qualify(target_line.strip())
+        if target_line is None:
+            return False
+        return re.search(pattern_curse, target_line) is None
+
+    def filter_conversation(self, conversation):
+        """
+        Returns the conversation without the pairs which would certainly be
+        dropped, or an empty string if none is left.
+
+        Arguments:
+            self: An instance of the class.
+            conversation: Conversation as written by the parser, "X:" and
+                "A:" lines followed by "===".
+
+        """
+        lines = conversation.split('\n')[:-2]
+        kept_lines = []
+        for index in range(0, len(lines) - 1, 2):
+            if self.pair_may_qualify(lines[index][3:], lines[index + 1][3:]):
+                kept_lines.append(lines[index])
+                kept_lines.append(lines[index + 1])
+        if not kept_lines:
+            return ''
+        return '\n'.join(kept_lines) + '\n===\n'
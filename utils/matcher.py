@@ -0,0 +1,169 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+MATCHER
+========
+
+Matcher is used for checking a text against many substrings in a single pass
+using an Aho-Corasick automaton.
+
+## Basic usage as a module:
+
+    from matcher import SubstringMatcher
+
+    matcher = SubstringMatcher(['http://', 'reddit'])
+    matcher.search('visit reddit')  # True
+
+The "pyahocorasick" package is used when it is installed, otherwise the
+automaton is built in pure Python. A pure Python scan costs about the same as
+40 calls of the C level substring search, so smaller sets are checked with a
+plain loop instead.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import deque
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Below this many patterns a plain loop beats the pure Python automaton
+loop_threshold = 40
+
+
+class SubstringMatcher(object):
+    """Finds whether any of the given substrings occurs in a text."""
+
+    def __init__(self, patterns):
+        """
+        Compiles the substrings into an automaton.
+
+        Arguments:
+            self: An instance of the class.
+            patterns: Substrings to look for.
+
+        """
+        self.patterns = sorted(set(patterns))
+
+        # An empty substring is found in every text, same as str.find()
+        self.match_all = '' in self.patterns
+        self.patterns = [pattern for pattern in self.patterns if pattern]
+
+        if ahocorasick is not None and self.patterns:
+            self.automaton = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                self.automaton.add_word(pattern, pattern)
+            self.automaton.make_automaton()
+            self.backend = 'pyahocorasick'
+        elif len(self.patterns) >= loop_threshold:
+            self.automaton = None
+            self._build_transitions()
+            self.backend = 'automaton'
+        else:
+            self.automaton = None
+            self.backend = 'loop'
+
+    def _build_transitions(self):
+        """
+        Builds the goto, failure and output functions of the automaton and
+        folds the failure links into the transition table.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        goto = [{}]
+        output = [False]
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    output.append(False)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            output[state] = True
+
+        # Transitions into the first level are the same from every state, so
+        # they are served by the root table and only the deeper transitions,
+        # including the ones inherited through the failure links, are stored
+        # per state. States are visited breadth first so that the table of a
+        # failure state is always complete before it is inherited.
+        root_transitions = goto[0]
+        fail = [0] * len(goto)
+        transitions = [None] * len(goto)
+        transitions[0] = {}
+        states = deque(root_transitions.values())
+        while states:
+            state = states.popleft()
+            output[state] = output[state] or output[fail[state]]
+            transitions[state] = dict(transitions[fail[state]])
+            for char, next_state in goto[state].items():
+                transitions[state][char] = next_state
+                fail_state = transitions[fail[state]].get(char)
+                if fail_state is None:
+                    fail_state = root_transitions.get(char, 0)
+                fail[next_state] = fail_state
+                states.append(next_state)
+
+        self.root_transitions = root_transitions
+        self.transitions = transitions
+        self.output = output
+
+    def search(self, text):
+        """
+        Returns True if any of the substrings occurs in the text.
+
+        Arguments:
+            self: An instance of the class.
+            text: Text to be scanned.
+
+        """
+        if self.match_all:
+            return True
+        if not self.patterns:
+            return False
+        if self.automaton is not None:
+            for _ in self.automaton.iter(text):
+                return True
+            return False
+        if self.backend == 'loop':
+            for pattern in self.patterns:
+                if pattern in text:
+                    return True
+            return False
+
+        root_transitions = self.root_transitions
+        transitions = self.transitions
+        output = self.output
+        state = 0
+        for char in text:
+            next_state = transitions[state].get(char)
+            if next_state is None:
+                next_state = root_transitions.get(char, 0)
+            state = next_state
+            if output[state]:
+                return True
+        return False
@@ -31,16 +31,55 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from bz2 import BZ2File
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from multiprocessing import Pool
 import os
+import argparse
 import re
 import sys
+import bz2
+import gzip
 import json
-
+import pickle
+import shutil
+import zlib
+
+from comment_store import MemoryCommentStore, PackedCommentStore, SqliteCommentStore
+from decompression import is_input_file, open_input_file
+from filters import PairFilter
+from matcher import SubstringMatcher
+from projection import CommentPrefilter, loads
+from sampling import ConversationReservoir
+from stages import BackgroundWriter, batched, ordered_thread_map
+from thread_builder import NumpyThreadBuilder, np
 import alice_config as alice
 
 start_time = datetime.now()
 
+# Qualifying posts are handed from the parse workers in batches of this size
+spool_batch_size = 10000
+spool_extension = '.spool'
+
+# Length limits of a qualifying post body
+min_post_length = 8
+max_post_length = 240
+
+# Raw lines are handed from the reader thread to the decoders in batches
+pipeline_batch_size = 1000
+
+# Output codecs and the extension of their files
+output_extensions = {'bz2': alice.bz2_file, 'gzip': alice.gz_file, 'none': alice.txt_file}
+
+# Compressed output is cut into independent streams of this size when it is
+# compressed by a thread pool
+output_block_size = 900000
+
+# Reddit ids like "t1_c0299an", a base-36 number of at most 11 digits fits in
+# a 64 bit sqlite integer along with its type prefix
+reddit_id_pattern = re.compile(r't([1-6])_([1-9a-z][0-9a-z]{0,10})\Z')
+
 
 class Parser(object):
     """Parse relevant data from Reddit datasets."""
@@ -61,19 +100,62 @@ class Parser(object):
         self.output_path = alice.parsed_dir
         self.output_file = alice.cassiopeia_output_file
         self.conversation_line_cache_size = config_file['conversation_line_cache_size']
+        self.conversation_window = config_file['conversation_window']
+        self.checkpoint_every = config_file['checkpoint_every']
+        self.thread_builder = config_file['thread_builder']
         self.output_file_size = config_file['output_file_size']
+        self.output_codec = config_file['output_codec']
+        self.tee_output = config_file['tee_output']
+        self.sample_subreddit_weights = config_file['sample_subreddit_weights']
+        self.sample_seed = config_file['sample_seed']
+        self.output_compression_level = config_file['output_compression_level']
+        self.output_compression_workers = config_file['output_compression_workers']
         self.print_every = config_file['print_every']
+        self.parse_workers = config_file['parse_workers']
+        self.comment_store = config_file['comment_store']
+        self.pipeline_workers = config_file['pipeline_workers']
+        self.pipeline_queue_size = config_file['pipeline_queue_size']
+        self.stage_queues = []
 
         self.subreddit_blacklist = set(config_file['subreddit_blacklist'])
         self.subreddit_whitelist = set(config_file['subreddit_whitelist'])
         self.substring_blacklist = set(config_file['substring_blacklist'])
-
-    def parse(self):
+        self.substring_matcher = SubstringMatcher(self.substring_blacklist)
+
+        if self.thread_builder == 'numpy':
+            if np is None:
+                print('# NumPy is not installed, using the Python thread builder.')
+                self.thread_builder = 'python'
+            elif self.comment_store != 'memory' or self.conversation_window > 0:
+                print('# The NumPy thread builder needs the memory comment store '
+                      'without a conversation window, using the Python thread builder.')
+                self.thread_builder = 'python'
+
+        # Pairs the cleaner would drop are not written, the exception file is
+        # the one of an earlier run so its words are only checked on request
+        self.pair_filter = None
+        if config_file['pair_filters']:
+            self.pair_filter = PairFilter(
+                alice.exception_file if config_file['pair_filter_exceptions'] else None,
+                config_file['exception_set_file_size'])
+
+        self.prefilter = None
+        if config_file['prefilter_raw_lines']:
+            self.prefilter = CommentPrefilter(min_post_length, max_post_length,
+                                              self.subreddit_whitelist,
+                                              self.subreddit_blacklist)
+
+    def parse(self, resume=False, sample_size=0):
         """
         Parse the Reddit data into a "./parsed/" folder.
 
         Arguments:
             self: An instance of the class.
+            resume: If set, continues from the last checkpoint of a parse
+                which did not finish.
+            sample_size: If set, only this many conversations sampled from
+                all of them are written, straight to the "cassiopeia" file
+                and without any output shards.
 
         """
         if os.path.isfile(self.output_path):
@@ -84,61 +166,352 @@ class Parser(object):
             os.mkdir(self.output_path)
 
         subreddit_dict = {}
-        conversation_line_dict = {}
+        conversation_line_dict = self.get_comment_store()
         cache_count = 0
-        raw_data = self.get_raw_data_enumerator()
-        output_handler = OutputHandler(os.path.join(
-            self.output_path, self.output_file), self.output_file_size)
-
-        for count_lines, line in enumerate(raw_data):
-            line = line.decode('utf-8')
-            if len(line) > 1 and (line[-1] == '}' or line[-2] == '}'):
-                conversation_line = json.loads(line)
-                if self.post_qualifies(conversation_line):
-                    sub = conversation_line['subreddit']
-                    if sub in subreddit_dict:
-                        subreddit_dict[sub] += 1
+        pending_names = []
+        newest_time = 0
+        if sample_size > 0:
+            output_handler = ConversationReservoir(
+                alice.cassiopeia_file, sample_size,
+                self.sample_subreddit_weights, self.sample_seed)
+        else:
+            output_handler = OutputHandler(os.path.join(
+                self.output_path, self.output_file), self.output_file_size,
+                self.pipeline_queue_size if self.pipeline_workers > 0 else 0,
+                self.output_codec, self.output_compression_level,
+                self.output_compression_workers,
+                alice.cassiopeia_file if self.tee_output else None)
+
+        position = None
+        checkpoint = self.load_checkpoint(conversation_line_dict) if resume else None
+        if checkpoint is not None:
+            position = checkpoint['position']
+            subreddit_dict = checkpoint['subreddit_dict']
+            cache_count = checkpoint['cache_count']
+            pending_names = checkpoint['pending_names']
+            newest_time = checkpoint['newest_time']
+            output_handler.restore(checkpoint['output_state'])
+            print('# Resuming from "{}" at byte {:,}.'.format(*position) if position else
+                  '# Resuming from the beginning.')
+        elif self.checkpoint_every > 0:
+            self.save_checkpoint(position, subreddit_dict, cache_count, pending_names,
+                                 newest_time, conversation_line_dict, output_handler)
+        checkpoint_count = 0
+
+        for position, parsed_lines in self.get_conversation_batch_enumerator(position):
+            for sub, name, conversation_line in parsed_lines:
+                if sub in subreddit_dict:
+                    subreddit_dict[sub] += 1
+                else:
+                    subreddit_dict[sub] = 1
+                conversation_line_dict[name] = conversation_line
+                if self.conversation_window > 0:
+                    pending_names.append(name)
+                    newest_time = max(newest_time, conversation_line.created_utc)
+                cache_count += 1
+                checkpoint_count += 1
+                if cache_count % self.print_every == 0:
+                    end_time = datetime.now()
+                    elapsed_time = (end_time - start_time)
+                    print('\r# {:,} lines cached in {}.'.format(
+                        cache_count, str(elapsed_time).split('.')[0]), end='')
+                    sys.stdout.flush()
+                if cache_count > self.conversation_line_cache_size:
+                    print()
+                    if self.conversation_window > 0:
+                        # Only the conversations which can no longer get a
+                        # reply are written, the rest carry over to the next
+                        # flush
+                        self.process_cached_conversation_lines(
+                            conversation_line_dict, pending_names)
+                        self.write_cached_conversation_lines(
+                            conversation_line_dict, output_handler,
+                            newest_time - self.conversation_window)
+                        pending_names = []
+                    elif self.thread_builder == 'numpy':
+                        self.build_cached_conversation_lines(
+                            conversation_line_dict, output_handler)
+                        conversation_line_dict.clear()
                     else:
-                        subreddit_dict[sub] = 1
-                    conversation_line_dict[conversation_line['name']] = RedditConversationLine(
-                        conversation_line)
-                    cache_count += 1
-                    if cache_count % self.print_every == 0:
-                        end_time = datetime.now()
-                        elapsed_time = (end_time - start_time)
-                        print('\r# {:,} lines cached in {}.'.format(
-                            cache_count, str(elapsed_time).split('.')[0]), end='')
-                        sys.stdout.flush()
-                    if cache_count > self.conversation_line_cache_size:
-                        print()
                         self.process_cached_conversation_lines(
                             conversation_line_dict)
                         self.write_cached_conversation_lines(
                             conversation_line_dict, output_handler)
-                        self.generate_subreddit_report(
-                            subreddit_dict)
                         conversation_line_dict.clear()
-                        cache_count = 0
-                    end_time = datetime.now()
-                    elapsed_time = (end_time - start_time)
-
-        self.process_cached_conversation_lines(conversation_line_dict)
-        self.write_cached_conversation_lines(
-            conversation_line_dict, output_handler)
+                    self.generate_subreddit_report(
+                        subreddit_dict)
+                    cache_count = 0
+
+            if self.checkpoint_every > 0 and checkpoint_count >= self.checkpoint_every:
+                self.save_checkpoint(position, subreddit_dict, cache_count, pending_names,
+                                     newest_time, conversation_line_dict, output_handler)
+                checkpoint_count = 0
+
+        if self.conversation_window > 0:
+            self.process_cached_conversation_lines(
+                conversation_line_dict, pending_names)
+            self.write_cached_conversation_lines(
+                conversation_line_dict, output_handler)
+        elif self.thread_builder == 'numpy':
+            self.build_cached_conversation_lines(
+                conversation_line_dict, output_handler)
+        else:
+            self.process_cached_conversation_lines(conversation_line_dict)
+            self.write_cached_conversation_lines(
+                conversation_line_dict, output_handler)
+        output_handler.close()
+        conversation_line_dict.close()
+        if self.pair_filter is not None:
+            self.pair_filter.close()
+        self.conversation_count = output_handler.conversation_count
         self.generate_subreddit_report(subreddit_dict)
+        self.generate_stage_report(output_handler)
+        if os.path.exists(alice.cassiopeia_checkpoint_file):
+            os.remove(alice.cassiopeia_checkpoint_file)
+
+    def save_checkpoint(self, position, subreddit_dict, cache_count, pending_names,
+                        newest_time, conversation_line_dict, output_handler):
+        """
+        Saves everything needed to continue the parse from the current
+        position, replacing the previous checkpoint only once it is complete.
+
+        Arguments:
+            self: An instance of the class.
+            position: (input file, decompressed byte offset) parsed so far,
+                None at the start.
+            subreddit_dict: Subreddit dictionary from json object.
+            cache_count: Lines cached since the last cache flush.
+            pending_names: Names not processed yet in the conversation
+                window mode.
+            newest_time: Newest "created_utc" cached.
+            conversation_line_dict: Comment store of the cached lines.
+            output_handler: Output handler, its current file is finished up
+                to this point.
+
+        """
+        checkpoint_file = alice.cassiopeia_checkpoint_file
+        state = {'position': position,
+                 'subreddit_dict': subreddit_dict,
+                 'cache_count': cache_count,
+                 'pending_names': pending_names,
+                 'newest_time': newest_time,
+                 'output_state': output_handler.checkpoint()}
+        with open(checkpoint_file + alice.tmp_file, 'wb') as checkpoint:
+            pickle.dump(state, checkpoint, pickle.HIGHEST_PROTOCOL)
+            for conversation_lines in batched(conversation_line_dict.items(), spool_batch_size):
+                pickle.dump(conversation_lines, checkpoint, pickle.HIGHEST_PROTOCOL)
+        os.replace(checkpoint_file + alice.tmp_file, checkpoint_file)
+
+    def load_checkpoint(self, conversation_line_dict):
+        """
+        Loads the last checkpoint, None if there is none.
+
+        Arguments:
+            self: An instance of the class.
+            conversation_line_dict: Empty comment store, the cached lines of
+                the checkpoint are added to it.
+
+        """
+        checkpoint_file = alice.cassiopeia_checkpoint_file
+        if not os.path.exists(checkpoint_file):
+            print('# No checkpoint found, starting from the beginning.')
+            return None
+        with open(checkpoint_file, 'rb') as checkpoint:
+            state = pickle.load(checkpoint)
+            while True:
+                try:
+                    conversation_lines = pickle.load(checkpoint)
+                except EOFError:
+                    break
+                for name, conversation_line in conversation_lines:
+                    conversation_line.intern_strings()
+                    conversation_line_dict[name] = conversation_line
+        return state
+
+    def get_comment_store(self):
+        """
+        Creates the store for the cached conversation lines configured by
+        "comment_store", either "memory", "packed" or "sqlite". The NumPy
+        thread builder is a memory store of its own.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        if self.comment_store == 'sqlite':
+            return SqliteCommentStore(alice.cassiopeia_index_file, RedditConversationLine)
+        if self.comment_store == 'packed':
+            return PackedCommentStore(RedditConversationLine)
+        if self.thread_builder == 'numpy':
+            return NumpyThreadBuilder()
+        return MemoryCommentStore()
+
+    def get_input_files(self):
+        """
+        Lists the dump files in the datasets folder in a stable order, see
+        "decompression" for the extensions which are read.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        return [input_file for input_file in sorted(os.listdir(alice.datasets_dir))
+                if is_input_file(input_file)]
+
+    def get_raw_batch_enumerator(self, position=None):
+        """
+        Yields (position, raw lines) from the Reddit dump files one file at a
+        time, where position is (input file, decompressed byte offset) after
+        the batch.
+
+        Arguments:
+            self: An instance of the class.
+            position: Position to start reading at, defaults to the start of
+                the first file.
+
+        """
+        for input_file, offset in self.get_input_positions(position):
+            loading_start_time = datetime.now()
+            self.input_file = os.path.join(alice.datasets_dir, input_file)
+            print('\n# Loading "{}" file in memory at {}.'.format(
+                input_file, loading_start_time.strftime('%I:%M %p')))
+            for raw_batch in _read_raw_batches(input_file, offset):
+                yield raw_batch
+
+    def get_input_positions(self, position=None):
+        """
+        Returns (input file, decompressed byte offset) for every dump file
+        which is left to be parsed from the position on.
 
-    def get_raw_data_enumerator(self):
-        for input_file in os.listdir(alice.datasets_dir):
-            if input_file.endswith(alice.bz2_file):
-                loading_start_time = datetime.now()
-                current_input_file = os.path.join(
-                    alice.datasets_dir, input_file)
-                self.input_file = current_input_file
-                print('\n# Loading "{}" file in memory at {}.'.format(
-                    input_file, loading_start_time.strftime('%I:%M %p')))
-                with BZ2File(self.input_file, 'r') as raw_data:
-                    for line in raw_data:
-                        yield line
+        Arguments:
+            self: An instance of the class.
+            position: Position reached by a previous parse, if any.
+
+        """
+        input_positions = []
+        for input_file in self.get_input_files():
+            if position is None:
+                input_positions.append((input_file, 0))
+            elif input_file == position[0]:
+                input_positions.append(position)
+            elif input_file > position[0]:
+                input_positions.append((input_file, 0))
+        return input_positions
+
+    def get_conversation_batch_enumerator(self, position=None):
+        """
+        Yields (position, parsed lines) where the parsed lines are
+        (subreddit, name, conversation line) for every qualifying post and
+        position is where the parse can continue from after the batch.
+
+        With "parse_workers" above 1 the dump files are parsed in a process
+        pool, otherwise they are parsed serially. Both yield the posts in the
+        same order.
+
+        Arguments:
+            self: An instance of the class.
+            position: Position to start parsing at, defaults to the start of
+                the first file.
+
+        """
+        if self.parse_workers > 1:
+            return self._get_parallel_conversation_batch_enumerator(position)
+        return self._get_serial_conversation_batch_enumerator(position)
+
+    def _get_serial_conversation_batch_enumerator(self, position):
+        raw_batches = self.get_raw_batch_enumerator(position)
+
+        # Decompression runs in a reader thread ahead of the decoders
+        if self.pipeline_workers > 0:
+            for parsed_batch in ordered_thread_map(self.parse_raw_batch,
+                                                   raw_batches,
+                                                   self.pipeline_workers,
+                                                   self.pipeline_queue_size,
+                                                   self.stage_queues):
+                yield parsed_batch
+            return
+
+        for raw_batch in raw_batches:
+            yield self.parse_raw_batch(raw_batch)
+
+    def _get_parallel_conversation_batch_enumerator(self, position):
+        pending_files = []
+        with Pool(processes=self.parse_workers) as pool:
+            for input_file, offset in self.get_input_positions(position):
+                spool_file = os.path.join(
+                    self.output_path, input_file + spool_extension)
+                pending_files.append((input_file, spool_file, pool.apply_async(
+                    _parse_dump_file, (self, input_file, offset, spool_file))))
+
+                # Keep at most one pending file per worker so that the
+                # spools on disk stay bounded.
+                if len(pending_files) >= self.parse_workers:
+                    for parsed_batch in self._read_spool(*pending_files.pop(0)):
+                        yield parsed_batch
+
+            while pending_files:
+                for parsed_batch in self._read_spool(*pending_files.pop(0)):
+                    yield parsed_batch
+
+    @staticmethod
+    def _read_spool(input_file, spool_file, result):
+        result.get()
+        loading_start_time = datetime.now()
+        print('\n# Merging parsed "{}" file at {}.'.format(
+            input_file, loading_start_time.strftime('%I:%M %p')))
+        with open(spool_file, 'rb') as spool:
+            while True:
+                try:
+                    position, parsed_lines = pickle.load(spool)
+                except EOFError:
+                    break
+                for index, (sub, name, conversation_line) in enumerate(parsed_lines):
+                    # Interned strings arrive as copies from the workers
+                    conversation_line.intern_strings()
+                    parsed_lines[index] = conversation_line.subreddit, name, conversation_line
+                yield position, parsed_lines
+        os.remove(spool_file)
+
+    def parse_raw_line(self, line):
+        """
+        Decodes a raw line and returns (subreddit, name, conversation line)
+        if it qualifies, otherwise None.
+
+        Arguments:
+            self: An instance of the class.
+            line: Raw line read from the dump file.
+
+        """
+        if self.prefilter is not None and not self.prefilter.may_qualify(line):
+            return None
+        line = line.decode('utf-8')
+        if len(line) <= 1 or (line[-1] != '}' and line[-2] != '}'):
+            return None
+        conversation_line = loads(line)
+
+        if self.post_qualifies(conversation_line):
+            parsed_line = RedditConversationLine(conversation_line)
+            return (parsed_line.subreddit,
+                    encode_reddit_id(conversation_line['name']),
+                    parsed_line)
+        return None
+
+    def parse_raw_batch(self, raw_batch):
+        """
+        Parses a batch of raw lines, keeping only the qualifying posts.
+
+        Arguments:
+            self: An instance of the class.
+            raw_batch: (position, raw lines read from the dump file).
+
+        """
+        position, lines = raw_batch
+        parsed_lines = []
+        for line in lines:
+            parsed_line = self.parse_raw_line(line)
+            if parsed_line is not None:
+                parsed_lines.append(parsed_line)
+        return position, parsed_lines
 
     def post_qualifies(self, json_object):
         """
@@ -153,7 +526,7 @@ class Parser(object):
         body = body.decode('utf-8')
 
         post_length = len(body)
-        if post_length < 8 or post_length > 240:
+        if post_length < min_post_length or post_length > max_post_length:
             return False
 
         subreddit = json_object['subreddit']
@@ -163,10 +536,8 @@ class Parser(object):
             return False
         if len(self.subreddit_blacklist) > 0 and subreddit in self.subreddit_blacklist:
             return False
-        if len(self.substring_blacklist) > 0:
-            for substring in self.substring_blacklist:
-                if body.find(substring) >= 0:
-                    return False
+        if self.substring_matcher.search(body):
+            return False
 
         # Preprocess the conversation lines text
         body = re.sub('[ \t\n]+', ' ', body)  # Strip whitespace with space.
@@ -177,24 +548,30 @@ class Parser(object):
         body = re.sub('&amp;', '&', body)  # Replace '&amp;' with '&'
 
         post_length = len(body)
-        if post_length < 8 or post_length > 240:
+        if post_length < min_post_length or post_length > max_post_length:
             return False
 
         json_object['body'] = body  # Save changes
 
         return True
 
-    def process_cached_conversation_lines(self, conversation_line_dict):
+    def process_cached_conversation_lines(self, conversation_line_dict, names=None):
         """
         Process conversations.
 
         Arguments:
             self: An instance of the class.
-            conversation_line_dict: Dictionary of json object.
+            conversation_line_dict: Comment store of the cached lines.
+            names: Names of the lines to process, defaults to all of them.
 
         """
+        if names is None:
+            conversation_lines = conversation_line_dict.items()
+        else:
+            conversation_lines = ((name, conversation_line_dict[name]) for name in names)
+
         counter_index = 0
-        for my_id, my_conversation_line in conversation_line_dict.items():
+        for my_id, my_conversation_line in conversation_lines:
             counter_index += 1
             if counter_index % self.print_every == 0:
                 end_time = datetime.now()
@@ -204,62 +581,138 @@ class Parser(object):
                 sys.stdout.flush()
 
             if my_conversation_line.parent_id is not None:
-                if my_conversation_line.parent_id in conversation_line_dict:
-                    parent = conversation_line_dict[my_conversation_line.parent_id]
+                parent = conversation_line_dict.get(
+                    my_conversation_line.parent_id)
+                if parent is not None:
                     if parent.child_id is None:
-                        parent.child_id = my_id
+                        conversation_line_dict.set_child_id(
+                            my_conversation_line.parent_id, parent, my_id)
                     else:
                         parent_previous_child = conversation_line_dict[parent.child_id]
-                        if parent.parent_id in conversation_line_dict:
-                            grandparent = conversation_line_dict[parent.parent_id]
+                        grandparent = conversation_line_dict.get(
+                            parent.parent_id)
+                        if grandparent is not None:
                             if my_conversation_line.author == grandparent.author:
-                                parent.child_id = my_id
+                                conversation_line_dict.set_child_id(
+                                    my_conversation_line.parent_id, parent, my_id)
                             elif (parent_previous_child.author != grandparent.author and my_conversation_line.score > parent_previous_child.score):
-                                parent.child_id = my_id
+                                conversation_line_dict.set_child_id(
+                                    my_conversation_line.parent_id, parent, my_id)
                         elif my_conversation_line.score > parent_previous_child.score:
-                            parent.child_id = my_id
+                            conversation_line_dict.set_child_id(
+                                my_conversation_line.parent_id, parent, my_id)
                 else:
-                    my_conversation_line.parent_id = None
+                    conversation_line_dict.clear_parent_id(
+                        my_id, my_conversation_line)
 
-    def write_cached_conversation_lines(self, conversation_line_dict, output_handler):
+    def write_cached_conversation_lines(self, conversation_line_dict, output_handler, cutoff=None):
         """
         Writes conversations in memory.
 
+        With a cutoff time only the conversations whose lines are all older
+        than it are written. These, and every other line older than the
+        cutoff which is not part of an unfinished conversation, are removed
+        from the comment store.
+
         Arguments:
             self: An instance of the class.
-            conversation_line_dict: Dictionary of json object.
+            conversation_line_dict: Comment store of the cached lines.
+            output_handler: Output handler the conversations are written to.
+            cutoff: Time ("created_utc") before which no more replies are
+                expected, defaults to writing every conversation.
 
         """
         counter_index = 0
         prev_print_count = 0
-        for k, v in conversation_line_dict.items():
-            if v.parent_id is None and v.child_id is not None:
+        open_names = set()
+        for k, v in conversation_line_dict.roots():
+            conversation_line = v
+            if cutoff is not None:
+                chain_names = [k]
+                chain_time = conversation_line.created_utc
+                while conversation_line.child_id is not None:
+                    chain_names.append(conversation_line.child_id)
+                    conversation_line = conversation_line_dict.get(
+                        conversation_line.child_id)
+                    if conversation_line is None:
+                        break
+                    chain_time = max(chain_time, conversation_line.created_utc)
+                if chain_time >= cutoff:
+                    open_names.update(chain_names)
+                    continue
                 conversation_line = v
-                depth = 0
-                output_string = ''
-                while conversation_line is not None:
-                    depth += 1
-                    if depth % 2 == 1:
-                        output_string += 'X: '
-                    else:
-                        output_string += 'A: '
-                    output_string += conversation_line.body + '\n'
-                    if conversation_line.child_id in conversation_line_dict:
-                        conversation_line = conversation_line_dict[conversation_line.child_id]
-                    else:
-                        conversation_line = None
-                        if depth % 2 == 0:
-                            output_handler.write(output_string + '===\n')
-                            counter_index += depth
-                            if counter_index > prev_print_count + self.print_every:
-                                end_time = datetime.now()
-                                elapsed_time = (end_time - start_time)
-                                prev_print_count = counter_index
-                                print('\r# {:,} lines wrote in memory in {}.'.format(
-                                    counter_index, str(elapsed_time).split('.')[0]), end='')
-                                sys.stdout.flush()
+            depth = 0
+            output_string = ''
+            while conversation_line is not None:
+                depth += 1
+                if depth % 2 == 1:
+                    output_string += 'X: '
+                else:
+                    output_string += 'A: '
+                output_string += conversation_line.body + '\n'
+                conversation_line = conversation_line_dict.get(
+                    conversation_line.child_id)
+                if conversation_line is None:
+                    if depth % 2 == 0:
+                        self.write_conversation(output_handler, output_string + '===\n', v.subreddit)
+                        counter_index += depth
+                        if counter_index > prev_print_count + self.print_every:
+                            end_time = datetime.now()
+                            elapsed_time = (end_time - start_time)
+                            prev_print_count = counter_index
+                            print('\r# {:,} lines wrote in memory in {}.'.format(
+                                counter_index, str(elapsed_time).split('.')[0]), end='')
+                            sys.stdout.flush()
         print()
 
+        if cutoff is not None:
+            conversation_line_dict.remove([
+                name for name, conversation_line in conversation_line_dict.items()
+                if conversation_line.created_utc < cutoff and name not in open_names])
+
+    def build_cached_conversation_lines(self, conversation_line_dict, output_handler):
+        """
+        Processes and writes conversations with the NumPy thread builder,
+        same as "process_cached_conversation_lines" followed by
+        "write_cached_conversation_lines".
+
+        Arguments:
+            self: An instance of the class.
+            conversation_line_dict: NumPy thread builder holding the cached
+                lines.
+            output_handler: Output handler the conversations are written to.
+
+        """
+        counter_index = 0
+        for conversation in conversation_line_dict.conversations():
+            self.write_conversation(output_handler, ''.join(
+                ('A: ' if depth % 2 else 'X: ') + conversation_line.body + '\n'
+                for depth, conversation_line in enumerate(conversation)) + '===\n',
+                conversation[0].subreddit)
+            counter_index += len(conversation)
+        end_time = datetime.now()
+        elapsed_time = (end_time - start_time)
+        print('# {:,} lines wrote in memory in {}.'.format(
+            counter_index, str(elapsed_time).split('.')[0]))
+
+    def write_conversation(self, output_handler, conversation, subreddit):
+        """
+        Writes a conversation, without the pairs the cleaner would drop if
+        "pair_filters" is set.
+
+        Arguments:
+            self: An instance of the class.
+            output_handler: Output handler the conversation is written to.
+            conversation: The conversation with its "===" separator.
+            subreddit: Subreddit the conversation was posted in.
+
+        """
+        if self.pair_filter is not None:
+            conversation = self.pair_filter.filter_conversation(conversation)
+            if not conversation:
+                return
+        output_handler.write(conversation, subreddit)
+
     def generate_subreddit_report(self, subreddit_dict):
         """
         Creates subreddit file.
@@ -279,10 +732,89 @@ class Parser(object):
         print('# {} subreddit file created.'.format(
             alice.file_size(self.report_file)))
 
+    def generate_stage_report(self, output_handler):
+        """
+        Prints how busy every queue between the parsing stages was.
+
+        Arguments:
+            self: An instance of the class.
+            output_handler: Output handler used for the parse.
+
+        """
+        stage_queues = self.stage_queues + output_handler.stage_queues
+        if stage_queues:
+            print('# Stage queues:')
+            for stage_queue in stage_queues:
+                print('#   {}.'.format(stage_queue.report()))
+
+
+def _read_raw_batches(input_file, offset=0):
+    """
+    Yields (position, raw lines) from a single dump file, where position is
+    (input file, decompressed byte offset) after the batch.
+
+    Arguments:
+        input_file: Dump file to be read.
+        offset: Decompressed byte offset to start reading at.
+
+    """
+    with open_input_file(os.path.join(alice.datasets_dir, input_file), offset) as raw_data:
+        for lines in batched(raw_data, pipeline_batch_size):
+            offset += sum(len(line) for line in lines)
+            yield (input_file, offset), lines
+
+
+def _parse_dump_file(parser, input_file, offset, spool_file):
+    """
+    Parses a single dump file inside a worker process and spools the
+    qualifying posts to disk in their original order, along with the
+    position reached after every batch.
+
+    Arguments:
+        parser: Parser instance with the filtering configuration.
+        input_file: Dump file to be parsed.
+        offset: Decompressed byte offset to start parsing at.
+        spool_file: File where the parsed posts are pickled in batches.
+
+    """
+    batch = []
+    with open(spool_file, 'wb') as spool:
+        for raw_batch in _read_raw_batches(input_file, offset):
+            position, parsed_lines = parser.parse_raw_batch(raw_batch)
+            batch.extend(parsed_lines)
+            if len(batch) >= spool_batch_size:
+                pickle.dump((position, batch), spool, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump((position, batch), spool, pickle.HIGHEST_PROTOCOL)
+
+
+def encode_reddit_id(reddit_id):
+    """
+    Packs a Reddit id like "t1_c0299an" into an integer, ids of any other
+    form are returned unchanged.
+
+    Arguments:
+        reddit_id: Id of the comment or of its parent.
+
+    """
+    match = reddit_id_pattern.match(reddit_id)
+    if match is None:
+        return reddit_id
+    return int(match.group(2), 36) * 8 + int(match.group(1))
+
 
 class RedditConversationLine(object):
     """Class to read through reddit json file."""
 
+    # Millions of these are cached at a time, so no per-instance dictionary
+    __slots__ = ['body', 'score', 'author', 'subreddit', 'created_utc',
+                 'parent_id', 'child_id']
+
+    # Attributes saved by the sqlite comment store
+    stored_fields = ['body', 'score', 'author', 'subreddit', 'created_utc',
+                     'parent_id', 'child_id']
+
     def __init__(self, json_object):
         """
         Creates an instance of class which reads through reddit json file.
@@ -294,15 +826,36 @@ class RedditConversationLine(object):
         """
         self.body = json_object['body']
         self.score = json_object['ups'] - json_object['downs']
-        self.author = json_object['author']
-        self.parent_id = json_object['parent_id']
+        self.author = sys.intern(json_object['author'])
+        self.subreddit = sys.intern(json_object['subreddit'])
+        self.created_utc = int(json_object['created_utc'])
+        self.parent_id = encode_reddit_id(json_object['parent_id'])
         self.child_id = None
 
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __setstate__(self, state):
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+
+    def intern_strings(self):
+        """
+        Interns the author and subreddit, which are shared by many lines.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        self.author = sys.intern(self.author)
+        self.subreddit = sys.intern(self.subreddit)
+
 
 class OutputHandler(object):
     """Output loading class."""
 
-    def __init__(self, path, output_file_size):
+    def __init__(self, path, output_file_size, queue_size=0, codec='bz2',
+                 compression_level=9, compression_workers=0, tee_path=None):
         """
         Creates an instance of the class.
 
@@ -310,49 +863,298 @@ class OutputHandler(object):
             self: An instance of the class.
             path: Folder where the output file will be created.
             output_file_size: Size of the output file created.
+            queue_size: If set, the output file is owned by a writer thread
+                with a queue of this size.
+            codec: Compression of the output files, "bz2", "gzip" or "none".
+            compression_level: Compression level from 1 to 9.
+            compression_workers: If set, the output is compressed by this
+                many threads as a series of independent streams, which the
+                ".bz2" and ".gz" readers decompress as a single file.
+            tee_path: If set, the output is also appended uncompressed to
+                this file.
 
         """
         if path.endswith(alice.bz2_file):
             path = path[:-len(alice.bz2_file)]
         self.base_path = path
         self.output_file_size = output_file_size
+        self.codec = codec
+        self.compression_level = compression_level
+        self.raw_file = None
         self.file_reference = None
-
-    def write(self, data):
+        self.writer = None
+        self.stage_queues = []
+
+        # Conversations are counted by their "X:" lines as they are written
+        self.conversation_count = 0
+        self.tee_file = open(tee_path, 'ab') if tee_path is not None else None
+
+        # New output files are numbered after the existing ones
+        output_files = get_output_file_indexes(self.base_path)
+        self.counter_index = max(output_files) if output_files else 0
+
+        self.compressor = None
+        if compression_workers > 0 and codec != 'none':
+            self.compressor = ThreadPoolExecutor(compression_workers)
+            self.compression_workers = compression_workers
+            self.pending_blocks = []
+            self.pending_size = 0
+            self.compressed_blocks = deque()
+
+        if queue_size > 0:
+            self.writer = BackgroundWriter(self._write, queue_size)
+            self.stage_queues.append(self.writer.queue)
+
+    def write(self, data, subreddit=None):
         """
         Writes data.
 
         Arguments:
             self: An instance of the class.
             data: Data read through json object.
+            subreddit: Subreddit of the conversation, only used when
+                sampling.
 
         """
-        if self.file_reference is None:
+        if self.writer is not None:
+            self.writer.put(data)
+        else:
+            self._write(data)
+
+    def close(self):
+        """
+        Flushes any queued data and closes the current output file.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self._close_current_file()
+        if self.compressor is not None:
+            self.compressor.shutdown()
+        if self.tee_file is not None:
+            self.tee_file.close()
+            self.tee_file = None
+
+    def checkpoint(self):
+        """
+        Finishes the compressed stream of the current output file, so that
+        everything written so far can be read back, and returns the state
+        "restore" needs to continue from here.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        if self.writer is not None:
+            self.writer.flush()
+        state = {'counter_index': self.counter_index,
+                 'current_path': None,
+                 'conversation_count': self.conversation_count}
+        if self.tee_file is not None:
+            self.tee_file.flush()
+            state['tee_length'] = self.tee_file.tell()
+        if self.raw_file is not None:
+            self._finish_stream()
+            state.update({'current_path': self.current_path,
+                          'current_file_size': self.current_file_size,
+                          'file_length': self.raw_file.tell()})
+        return state
+
+    def restore(self, state):
+        """
+        Drops whatever was written after a checkpoint and continues the
+        output from there.
+
+        Arguments:
+            self: An instance of the class.
+            state: State returned by "checkpoint".
+
+        """
+        for counter_index, path in get_output_file_indexes(self.base_path).items():
+            if counter_index > state['counter_index']:
+                os.remove(path)
+        self.counter_index = state['counter_index']
+        self.conversation_count = state['conversation_count']
+        if self.tee_file is not None and 'tee_length' in state:
+            self.tee_file.truncate(state['tee_length'])
+        if state['current_path'] is not None:
+            self.current_path = state['current_path']
+            self.current_file_size = state['current_file_size']
+            self.raw_file = open(self.current_path, 'r+b')
+            self.raw_file.truncate(state['file_length'])
+            self.raw_file.seek(state['file_length'])
+
+    def _write(self, data):
+        if self.raw_file is None:
             self._get_current_path()
-        self.file_reference.write(data.encode('ascii', 'ignore'))
+        if self.file_reference is None:
+            self._open_stream()
+        encoded_data = data.encode('ascii', 'ignore')
+        if self.compressor is None:
+            self.file_reference.write(encoded_data)
+        else:
+            self.pending_blocks.append(encoded_data)
+            self.pending_size += len(encoded_data)
+            if self.pending_size >= output_block_size:
+                self._compress_pending_blocks()
+        if self.tee_file is not None:
+            self.tee_file.write(encoded_data)
+        self.conversation_count += encoded_data.count(b'\nX:') + encoded_data.startswith(b'X:')
         self.current_file_size += len(data)
         if self.current_file_size >= self.output_file_size:
+            self._close_current_file()
+
+    def _open_stream(self):
+        if self.compressor is not None or self.codec == 'none':
+            self.file_reference = self.raw_file
+        elif self.codec == 'bz2':
+            self.file_reference = BZ2File(
+                self.raw_file, 'w', compresslevel=self.compression_level)
+        else:
+            self.file_reference = gzip.GzipFile(
+                fileobj=self.raw_file, mode='wb',
+                compresslevel=self.compression_level, mtime=0)
+
+    def _compress_pending_blocks(self):
+        """
+        Hands the buffered data to the compression threads as one stream and
+        writes the streams which are done, in order.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        if self.pending_blocks:
+            if self.codec == 'bz2':
+                stream = self.compressor.submit(
+                    bz2.compress, b''.join(self.pending_blocks), self.compression_level)
+            else:
+                stream = self.compressor.submit(
+                    _gzip_compress, b''.join(self.pending_blocks), self.compression_level)
+            self.compressed_blocks.append(stream)
+            self.pending_blocks = []
+            self.pending_size = 0
+
+        # Waits only when every thread has a few streams queued
+        while self.compressed_blocks and (
+                self.compressed_blocks[0].done() or
+                len(self.compressed_blocks) > 2 * self.compression_workers):
+            self.raw_file.write(self.compressed_blocks.popleft().result())
+
+    def _finish_stream(self):
+        if self.compressor is not None:
+            self._compress_pending_blocks()
+            while self.compressed_blocks:
+                self.raw_file.write(self.compressed_blocks.popleft().result())
+        elif self.file_reference is not None and self.file_reference is not self.raw_file:
+            # Closing the compressor leaves the file itself open
             self.file_reference.close()
-            self.file_reference = None
+        self.file_reference = None
+        self.raw_file.flush()
+
+    def _close_current_file(self):
+        if self.raw_file is None:
+            return
+        self._finish_stream()
+        self.raw_file.close()
+        self.raw_file = None
 
     def _get_current_path(self):
         """
-        Checks if the path for loading ".bz2" file exists or not.
+        Checks if the path for loading the next output file exists or not.
 
         Arguments:
             self: An instance of the class.
 
         """
-        counter_index = 1
+        counter_index = self.counter_index + 1
         while True:
             path = '{}_{}{}'.format(
-                self.base_path, counter_index, alice.bz2_file)
+                self.base_path, counter_index, output_extensions[self.codec])
             if not os.path.exists(path):
                 break
             counter_index += 1
+        self.counter_index = counter_index
         self.current_path = path
         self.current_file_size = 0
-        self.file_reference = BZ2File(self.current_path, 'w')
+        self.raw_file = open(self.current_path, 'wb')
+
+
+def _gzip_compress(data, compression_level):
+    # Same as gzip.compress() with a fixed header time
+    compressor = zlib.compressobj(compression_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def get_output_file_indexes(base_path):
+    """
+    Returns {counter index: path} of the output files of any codec.
+
+    Arguments:
+        base_path: Output file path without the counter index and extension.
+
+    """
+    output_folder, base_name = os.path.split(base_path)
+    output_files = {}
+    if not os.path.isdir(output_folder):
+        return output_files
+    for output_file in os.listdir(output_folder):
+        name, extension = os.path.splitext(output_file)
+        counter_index = name[len(base_name) + 1:]
+        if name.startswith(base_name + '_') and counter_index.isdigit() and \
+                extension in output_extensions.values():
+            output_files[int(counter_index)] = os.path.join(output_folder, output_file)
+    return output_files
+
+
+def get_output_files():
+    """Lists the output files of any codec in the order they were written."""
+    output_files = get_output_file_indexes(
+        os.path.splitext(alice.cassiopeia_output_file)[0])
+    return [os.path.basename(output_files[counter_index])
+            for counter_index in sorted(output_files)]
+
+
+def uncompress_output_files(path):
+    """
+    Appends the uncompressed conversations of the output files, in the order
+    they were written, to a file.
+
+    Arguments:
+        path: File the conversations are appended to, it is created even if
+            there are no output files.
+
+    """
+    open(path, 'a').close()
+
+    for input_file in get_output_files():
+        loading_start_time = datetime.now()
+        print('\r# Loading compressed "{}" file in memory at {}.'.format(
+            input_file, loading_start_time.strftime('%I:%M %p')), end='')
+        sys.stdout.flush()
+        current_input_file = os.path.join(alice.parsed_dir, input_file)
+        with open_output_file(current_input_file) as zipfile, \
+                open(path, 'a+b') as cassiopeia_file:
+            shutil.copyfileobj(zipfile, cassiopeia_file, output_block_size)
+
+
+def open_output_file(path):
+    """
+    Opens an output file of any codec for reading bytes.
+
+    Arguments:
+        path: Output file written by the parser.
+
+    """
+    if path.endswith(alice.bz2_file):
+        return BZ2File(path, 'r')
+    if path.endswith(alice.gz_file):
+        return gzip.GzipFile(path, 'rb')
+    return open(path, 'rb')
 
 
 if __name__ == '__main__':
@@ -360,15 +1162,29 @@ if __name__ == '__main__':
     for dir in dirs_to_create:
         alice.create_dir(dir)
 
-    Parser().parse()
+    arg_parser = argparse.ArgumentParser(description='Parse the Reddit datasets.')
+    arg_parser.add_argument('--resume', action='store_true',
+                            help='continue from the last checkpoint of an unfinished parse, '
+                            'checkpoints are saved when "checkpoint_every" is set')
+    arg_parser.add_argument('--sample', type=int, default=0, metavar='N',
+                            help='write only N conversations sampled from the whole parse')
+    args = arg_parser.parse_args()
 
+    parser = Parser()
+    parser.parse(resume=args.resume, sample_size=args.sample)
+
+    # The teed or sampled output was counted and uncompressed while it was
+    # written
+    uncompressed_output = parser.tee_output or args.sample > 0
     line_count = 0
-    print('# Reading number of conversations logged.')
-    for input_file in os.listdir(alice.parsed_dir):
-        if input_file.endswith(alice.bz2_file):
+    if uncompressed_output:
+        line_count = parser.conversation_count
+    else:
+        print('# Reading number of conversations logged.')
+        for input_file in get_output_files():
             loading_start_time = datetime.now()
             current_input_file = os.path.join(alice.parsed_dir, input_file)
-            with BZ2File(current_input_file, 'r') as raw_data:
+            with open_output_file(current_input_file) as raw_data:
                 for line in raw_data:
                     lnstrp = line.strip()
                     if not lnstrp:
@@ -383,28 +1199,19 @@ if __name__ == '__main__':
 
     end_time = datetime.now()
     elapsed_time = (end_time - start_time)
-    total_data_memory = 0
-    for input_file in os.listdir(alice.parsed_dir):
-        if input_file.endswith(alice.bz2_file):
+    if args.sample == 0:
+        total_data_memory = 0
+        for input_file in get_output_files():
             current_input_file = os.path.join(alice.parsed_dir, input_file)
             total_data_memory = total_data_memory + \
                 float(alice.file_size(current_input_file)[:-3])
-    print('# Compressed "cassiopeia" files created. Memory used {} MB on disk.'.format(
-        total_data_memory))
-
-    open(alice.cassiopeia_file, 'a').close()
+        print('# Compressed "cassiopeia" files created. Memory used {} MB on disk.'.format(
+            total_data_memory))
 
-    for input_file in list(os.listdir(alice.parsed_dir)):
-        current_input_file = os.path.join(alice.parsed_dir, input_file)
-        if input_file.endswith(alice.bz2_file):
-            loading_start_time = datetime.now()
-            print('\r# Loading compressed "{}" file in memory at {}.'.format(
-                input_file, loading_start_time.strftime('%I:%M %p')), end='')
-            sys.stdout.flush()
-            current_input_file = os.path.join(alice.parsed_dir, input_file)
-            zipfile = BZ2File(current_input_file)
-            data = zipfile.read()
-            open(alice.cassiopeia_file, 'a+b').write(data)
+    if uncompressed_output:
+        open(alice.cassiopeia_file, 'a').close()
+    else:
+        uncompress_output_files(alice.cassiopeia_file)
 
     end_time = datetime.now()
     elapsed_time = (end_time - start_time)
@@ -413,4 +1220,4 @@ if __name__ == '__main__':
     sys.stdout.flush()
     print('# Uncompressed data is of {}'.format(
         alice.file_size(alice.cassiopeia_file)))
-    print('# Run .\\cleaner.py file to continue.')
+    print('# Run .\\prepare.py file, or .\\cleaner.py and the steps after it, to continue.')
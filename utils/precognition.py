@@ -34,8 +34,6 @@ import os
 import random
 import string
 
-import nltk
-
 import tensorflow as tf
 
 from session import SessionData
@@ -44,6 +42,7 @@ from precognition_data import invoke_precognition
 from tokenized import TokenizedData
 from layers import Layers
 from recognizer import check_patterns_and_replace
+from tokenizer import word_tokenize
 import alice_config as alice
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
@@ -125,7 +124,7 @@ class AlicePrecognition(object):
             question)
 
         for previous_question in range(2):
-            tokens = nltk.word_tokenize(new_question.lower())
+            tokens = word_tokenize(new_question.lower())
             tmp_sentence = [' '.join(tokens[:]).strip()]
 
             self.session.run(self.inference_batch.initializer,
@@ -0,0 +1,208 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+PREPARE
+========
+
+Prepare runs the cleaner, preprocessing, dedup, temp vocab, refiner and vocab
+steps on the parsed conversations in one go, and writes the same
+"cassiopeia.xames3", vocab and exception files as running them one after
+another. Near-duplicate pairs are only removed if "dedup_threshold" is set.
+
+The parsed conversations are read once. Every conversation is cleaned and
+tokenized, the temporary vocab is counted from its tokens and the tokenized
+pairs are kept in a spool file. The refiner needs the exception words of the
+whole corpus, so once they are known the spool is read back, refined and
+counted into the final vocab while "cassiopeia.xames3" is written.
+
+"cassiopeia_temp.xames3" and "cassiopeia_cleaned.xames3" are only written
+with "--keep-intermediate", for debugging.
+
+    Z:\\alice\\utils>py prepare.py
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from datetime import datetime
+from multiprocessing import Pool
+import os
+import sys
+import argparse
+import json
+
+from cleaner import Cleaner, clean_batch_size, clean_pairs
+from dedup import get_dedup_index
+from preprocessing import get_tokenized_pair
+from refiner import get_conversations, has_exception_word
+from stages import batched, ordered_pool_map
+from vocab import VocabCounter
+import alice_config as alice
+
+start_time = datetime.now()
+
+
+def prepare_conversations(conversations):
+    """
+    Cleans and tokenizes a batch of conversations, the kept pairs of every
+    conversation are listed as returned by "clean_pairs".
+
+    Arguments:
+        conversations: List of conversations.
+
+    """
+    return [list(clean_pairs(conversation)) for conversation in conversations]
+
+
+def print_progress(message, count):
+    elapsed_time = datetime.now() - start_time
+    print('\r# {:,} {} in {}.'.format(count, message, str(elapsed_time).split('.')[0]), end='')
+    sys.stdout.flush()
+
+
+def prepare(parsed_dir, core_dir, keep_intermediate=False):
+    """
+    Writes the refined conversations, the vocab and the exception files from
+    the parsed conversations.
+
+    Arguments:
+        parsed_dir: Folder of the parsed ".xames3" files.
+        core_dir: Core folder with the inbuilt data files.
+        keep_intermediate: Whether to also write "cassiopeia_temp.xames3"
+            and "cassiopeia_cleaned.xames3".
+
+    Returns the number of conversations written.
+    """
+    pparams_file = alice.pparams_file
+    with open(pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+
+    intermediate_files = [alice.cassiopeia_temp_file, alice.cassiopeia_cleaned_file]
+    cleaner = Cleaner(parsed_dir)
+    cleaner.data_files = [
+        data_file for data_file in cleaner.data_files
+        if os.path.abspath(data_file) not in map(os.path.abspath, intermediate_files)]
+
+    for intermediate_file in intermediate_files:
+        if os.path.isfile(intermediate_file):
+            os.remove(intermediate_file)
+    spool_path = alice.cassiopeia_cleaned_file
+    if not keep_intermediate:
+        spool_path += alice.tmp_file
+
+    # Clean, tokenize, remove the near-duplicates and count the temporary
+    # vocab in one read
+    dedup_index = get_dedup_index(config_file)
+    temp_vocab = VocabCounter(core_dir)
+    cleaned_count = 0
+    batches = batched(cleaner.get_conversations(), clean_batch_size)
+    pool = Pool(cleaner.workers) if cleaner.workers > 1 else None
+    temp_file = open(alice.cassiopeia_temp_file, 'w') if keep_intermediate else None
+    try:
+        if pool is not None:
+            prepared_batches = ordered_pool_map(
+                pool, prepare_conversations, batches, 2 * cleaner.workers)
+        else:
+            prepared_batches = map(prepare_conversations, batches)
+
+        with open(spool_path, 'w') as spool_file:
+            for prepared_batch in prepared_batches:
+                for pairs in prepared_batch:
+                    if not pairs:
+                        continue
+                    written = False
+                    for input_line, target_line, in_tokens, tg_tokens in pairs:
+                        if temp_file is not None:
+                            temp_file.write('{}\n{}\n'.format(input_line, target_line))
+                        if dedup_index is not None and \
+                                dedup_index.is_duplicate(in_tokens, tg_tokens):
+                            continue
+                        spool_file.write(get_tokenized_pair(in_tokens, tg_tokens))
+                        temp_vocab.add_tokens(in_tokens, False)
+                        temp_vocab.add_tokens(tg_tokens, True)
+                        written = True
+                    if temp_file is not None:
+                        temp_file.write('===\n')
+                    if written:
+                        spool_file.write('===\n')
+                    cleaned_count += 1
+                print_progress('conversations cleaned and tokenized', cleaned_count)
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if temp_file is not None:
+            temp_file.close()
+
+    if dedup_index is not None:
+        print('\n# {:,} of {:,} pairs removed as near-duplicates.'.format(
+            dedup_index.duplicate_count, dedup_index.checked_count), end='')
+    exception_list = set(temp_vocab.get_exception_words())
+    print('\n# {:,} exception words found.'.format(len(exception_list)))
+
+    # Refine the spooled pairs and count the final vocab, the refined file
+    # replaces the parsed one only once it is complete
+    vocab_counter = VocabCounter(core_dir)
+    output_path = alice.cassiopeia_file + alice.tmp_file
+    refined_count = 0
+    with open(output_path, 'w') as output_file:
+        for conversation in get_conversations(spool_path):
+            written = False
+            for counter_index in range(0, len(conversation) - 1, 2):
+                src_line = conversation[counter_index]
+                tgt_line = conversation[counter_index + 1]
+                tokens = (src_line[2:] + ' ' + tgt_line[2:]).split(' ')
+                if has_exception_word(tokens, exception_list):
+                    continue
+                output_file.write('{}\n{}\n'.format(src_line, tgt_line))
+                vocab_counter.add_tokens(src_line[2:].strip().split(' '), False)
+                vocab_counter.add_tokens(tgt_line[2:].strip().split(' '), True)
+                written = True
+
+            if written:
+                output_file.write('===\n')
+                refined_count += 1
+                if refined_count % 1000 == 0:
+                    print_progress('conversations refined', refined_count)
+    print_progress('conversations refined', refined_count)
+
+    os.replace(output_path, alice.cassiopeia_file)
+    if not keep_intermediate:
+        os.remove(spool_path)
+
+    for vocab_file in [alice.vocab_file, alice.exception_file]:
+        if os.path.isfile(vocab_file):
+            os.remove(vocab_file)
+    vocab_counter.write(alice.vocab_file, alice.exception_file)
+    print('\n# {} vocabs generated.'.format(len(vocab_counter.vocab_list)))
+    return refined_count
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Prepare the parsed conversations for training.')
+    arg_parser.add_argument('--keep-intermediate', action='store_true',
+                            help='also write the cleaned and tokenized files of the steps')
+    args = arg_parser.parse_args()
+
+    prepare(alice.parsed_dir, alice.core_dir, args.keep_intermediate)
+    print('# Cassiopeia file created of {}.'.format(
+        alice.file_size(alice.cassiopeia_file)))
+    print('# Run .\\train.py file to continue.')
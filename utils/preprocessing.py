@@ -35,13 +35,62 @@ from datetime import datetime
 import os
 import sys
 
-import nltk
-
+from refiner import get_conversations
+from tokenizer import word_tokenize
 import alice_config as alice
 
 start_time = datetime.now()
 
 
+def get_tokenized_pair(source_tokens, target_tokens):
+    """
+    Returns the "X:" and "A:" lines of a pair from the tokens of its lines.
+
+    Arguments:
+        source_tokens: Tokens of the input line.
+        target_tokens: Tokens of the target line.
+
+    """
+    source_line = 'X: ' + ' '.join(source_tokens).strip()
+    target_line = 'A: ' + ' '.join(target_tokens).strip()
+    return '{}\n{}\n'.format(source_line, target_line)
+
+
+def preprocess_file(input_path, output_path):
+    """
+    Appends the tokenized conversations of a cleaned file to the output file,
+    one conversation at a time.
+
+    Arguments:
+        input_path: Cleaned file, "cassiopeia_temp.xames3" for instance.
+        output_path: Tokenized file.
+
+    """
+    with open(output_path, 'a') as output_file:
+        depth = 0
+        for conversation in get_conversations(input_path):
+            step = 2
+            for counter_index in range(0, len(conversation) - 1, step):
+                source_tokens = word_tokenize(conversation[counter_index])
+                target_tokens = word_tokenize(conversation[counter_index + 1])
+
+                output_file.write(get_tokenized_pair(source_tokens, target_tokens))
+
+            output_file.write('===\n')
+            depth += 1
+            if depth % 1000 == 0:
+                end_time = datetime.now()
+                elapsed_time = (end_time - start_time)
+                print('\r# {:,} conversations processed in {}.'.format(
+                    depth, str(elapsed_time).split('.')[0]), end='')
+                sys.stdout.flush()
+
+    end_time = datetime.now()
+    elapsed_time = (end_time - start_time)
+    print('\r# {:,} conversations processed in {}.'.format(
+        depth, str(elapsed_time).split('.')[0]), end='')
+
+
 def core_preprocess(parsed_dir):
     """
     Converts "cassiopeia_temp.xames3" to "cassiopeia_cleaned.xames3" and
@@ -57,50 +106,9 @@ def core_preprocess(parsed_dir):
             new_name = data_file.lower().replace('_temp.xames3', '_cleaned.xames3')
             full_new_name = os.path.join(parsed_dir, new_name)
 
-            conversations = []
-            with open(full_path_name, 'r') as file:
-                samples = []
-                for line in file:
-                    lnstrp = line.strip()
-                    if not lnstrp or lnstrp.startswith('#=='):
-                        continue
-                    if lnstrp == '===':
-                        if len(samples):
-                            conversations.append(samples)
-                        samples = []
-                    else:
-                        samples.append({'text': lnstrp})
-
-                if len(samples):
-                    conversations.append(samples)
-
-            with open(full_new_name, 'a') as output_file:
-                counter_index = 0
-                depth = 0
-                for conversation in conversations:
-                    counter_index += 1
-                    step = 2
-                    for counter_index in range(0, len(conversation) - 1, step):
-                        source_tokens = nltk.word_tokenize(
-                            conversation[counter_index]['text'])
-                        target_tokens = nltk.word_tokenize(
-                            conversation[counter_index + 1]['text'])
-
-                        source_line = 'X: ' + \
-                            ' '.join(source_tokens[:]).strip()
-                        target_line = 'A: ' + \
-                            ' '.join(target_tokens[:]).strip()
-
-                        output_file.write('{}\n'.format(source_line))
-                        output_file.write('{}\n'.format(target_line))
-
-                    output_file.write('===\n')
-                    depth += 1
-                    end_time = datetime.now()
-                    elapsed_time = (end_time - start_time)
-                    print('\r# {:,} conversations processed in {}.'.format(
-                        depth, str(elapsed_time).split('.')[0]), end='')
-                    sys.stdout.flush()
+            # Other files would be read while they are appended to
+            if new_name != data_file.lower():
+                preprocess_file(full_path_name, full_new_name)
 
 
 if __name__ == '__main__':
@@ -111,4 +119,4 @@ if __name__ == '__main__':
     core_preprocess(alice.parsed_dir)
     print('\n# {} processed file created.'.format(
         alice.file_size(alice.cassiopeia_cleaned_file)))
-    print('# Run .\\temp_vocab.py file to continue.')
+    print('# Run .\\temp_vocab.py file, or .\\dedup.py first, to continue.')
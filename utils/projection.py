@@ -0,0 +1,146 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+PROJECTION
+===========
+
+Projection is used for rejecting raw Reddit comment lines before they are
+decoded, by reading only the "subreddit" and "body" fields from the bytes.
+
+Lines are rejected when the subreddit is filtered out or when the body is
+certainly too short or too long to qualify. Lines which cannot be read safely
+(missing or repeated fields, escaped subreddit names) are passed on to the
+json decoder, so the prefilter never changes which lines qualify.
+
+The remaining lines are decoded with "orjson" when it is installed, falling
+back to the standard json decoder.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import re
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Whitespace stripped by str.strip(), backslashes and non-ascii bytes. What is
+# left of a body after deleting these are characters which certainly survive
+# the ascii encoding and the stripping in "post_qualifies".
+_uncounted_bytes = bytes(bytearray(
+    [9, 10, 11, 12, 13, 28, 29, 30, 31, 32, 92] + list(range(128, 256))))
+_ascii_bytes = bytes(bytearray(range(128)))
+
+_subreddit_key = b'"subreddit":"'
+_body_key = b'"body":"'
+_string_end = re.compile(br'[^"\\]*(?:\\.[^"\\]*)*"')
+
+
+def loads(line):
+    """
+    Decodes a json line.
+
+    Arguments:
+        line: Line read from the dump file.
+
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(line)
+
+
+class CommentPrefilter(object):
+    """Rejects raw Reddit comment lines which can never qualify."""
+
+    def __init__(self, min_length, max_length, subreddit_whitelist, subreddit_blacklist):
+        """
+        Creates an instance of the class.
+
+        Arguments:
+            self: An instance of the class.
+            min_length: Shortest body that can qualify.
+            max_length: Longest body that can qualify.
+            subreddit_whitelist: If not empty, the only subreddits allowed.
+            subreddit_blacklist: Subreddits which are never allowed.
+
+        """
+        self.min_length = min_length
+        self.max_length = max_length
+        self.subreddit_whitelist = subreddit_whitelist
+        self.subreddit_blacklist = subreddit_blacklist
+        self.check_subreddit = len(subreddit_whitelist) > 0 or len(subreddit_blacklist) > 0
+
+    def may_qualify(self, line):
+        """
+        Returns False if the line certainly does not qualify, otherwise True
+        and the line has to be decoded.
+
+        Arguments:
+            self: An instance of the class.
+            line: Raw line read from the dump file.
+
+        """
+        if self.check_subreddit and not self._subreddit_may_qualify(line):
+            return False
+
+        # A field which is missing or repeated is left to the json decoder
+        start = line.find(_body_key)
+        if start < 0 or line.find(_body_key, start + 1) >= 0:
+            return True
+        start += len(_body_key)
+        match = _string_end.match(line, start)
+        if match is None:
+            return True
+        end = match.end() - 1
+
+        # Every escape sequence is at most six bytes long and turns into at
+        # most one character, so the counts below bound the length of the
+        # body after it is ascii encoded and stripped.
+        if end - start > self.max_length:
+            body = line[start:end]
+            if len(body.translate(None, _uncounted_bytes)) - 5 * body.count(b'\\') > self.max_length:
+                return False
+        elif end - start < 4 * self.min_length:
+            body = line[start:end]
+            if len(body) - len(body.translate(None, _ascii_bytes)) < self.min_length:
+                return False
+        return True
+
+    def _subreddit_may_qualify(self, line):
+        start = line.find(_subreddit_key)
+        if start < 0 or line.find(_subreddit_key, start + 1) >= 0:
+            return True
+        start += len(_subreddit_key)
+        end = line.find(b'"', start)
+        subreddit = line[start:end]
+        if end < 0 or b'\\' in subreddit:
+            return True
+        subreddit = subreddit.decode('utf-8')
+        if len(self.subreddit_whitelist) > 0 and subreddit not in self.subreddit_whitelist:
+            return False
+        return subreddit not in self.subreddit_blacklist
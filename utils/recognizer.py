@@ -32,7 +32,7 @@ from __future__ import division
 from __future__ import print_function
 import re
 
-import nltk
+from tokenizer import word_tokenize
 
 
 def check_patterns_and_replace(question):
@@ -183,7 +183,7 @@ def _check_not_username_pattern_and_replace(sentence):
     Arguments:
         sentence: Statement during inference.
     """
-    tokens = nltk.word_tokenize(sentence)
+    tokens = word_tokenize(sentence)
     tmp_sentence = ' '.join(tokens[:]).strip()
 
     patt_not_but = re.compile(
@@ -223,7 +223,7 @@ def _check_username_call_me_pattern_and_replace(sentence):
     Arguments:
         sentence: Statement during inference.
     """
-    tokens = nltk.word_tokenize(sentence)
+    tokens = word_tokenize(sentence)
     tmp_sentence = ' '.join(tokens[:]).strip()
 
     patt_name = re.compile(
@@ -266,7 +266,7 @@ def _check_google_search_and_replace(sentence):
     Arguments:
         sentence: Statement during inference.
     """
-    tokens = nltk.word_tokenize(sentence)
+    tokens = word_tokenize(sentence)
     tmp_sentence = ' '.join(tokens[:]).strip()
 
     patt_name = re.compile(
@@ -32,84 +32,114 @@ from __future__ import division
 from __future__ import print_function
 from datetime import datetime
 import sys
+import json
 
+from exception_index import load_exception_index
 import alice_config as alice
 
 start_time = datetime.now()
 
 
-def refiner():
-    """Removes unwanted spaces and adds delimiters."""
+def has_exception_word(tokens, exception_list):
+    """
+    Returns True if a token of a pair is in the exception list.
 
-    exception_list = []
+    Arguments:
+        tokens: Tokens of the input and target lines.
+        exception_list: Lowercased exception words, a set or an
+            "ExceptionIndex".
+
+    """
+    for token in tokens:
+        if len(token) and token.lower() in exception_list:
+            return True
+    return False
 
-    # Add more words to exception file
-    with open(alice.exception_file, 'r') as exception_file:
-        for line in exception_file:
-            lnstrp = line.strip()
-            if not lnstrp:
-                continue
-            exception_list.append(lnstrp)
 
-    conversations = []
+def get_conversations(path):
+    """
+    Yields the conversations of a tokenized file one at a time, as lists of
+    "X:" and "A:" lines.
 
-    # Correct the conversation endings
-    with open(alice.cassiopeia_cleaned_file, 'r') as input_file:
+    Arguments:
+        path: Tokenized file, "cassiopeia_cleaned.xames3" for instance.
+
+    """
+    with open(path, 'r') as input_file:
         samples = []
-        for num, line in enumerate(input_file):
-            end_time = datetime.now()
-            elapsed_time = (end_time - start_time)
-            print('\r# {:,} lines cached in {}.'.format(
-                num, str(elapsed_time).split('.')[0]), end='')
-            sys.stdout.flush()
+        for line in input_file:
             lnstrp = line.strip()
             if not lnstrp or lnstrp.startswith('#=='):
                 continue
             if lnstrp == '===':
                 if len(samples):
-                    conversations.append(samples)
+                    yield samples
                 samples = []
             else:
-                samples.append({'text': lnstrp})
+                samples.append(lnstrp)
 
         if len(samples):
-            conversations.append(samples)
-
-    # Add back the delimiters
-    print('\n# {:,} conversations logged.'.format(len(conversations)))
-    with open(alice.cassiopeia_file, 'a') as output_file:
-        count = 0
-        for conversation in conversations:
+            yield samples
+
+
+def refiner(input_file=None, exception_file=None, output_file=None):
+    """
+    Removes unwanted spaces and adds delimiters.
+
+    Conversations are read, refined and written one at a time, so the memory
+    used does not grow with the size of the file.
+
+    Arguments:
+        input_file: Tokenized file, "cassiopeia_cleaned.xames3" if missing.
+        exception_file: Exception file, "exception.xames3" if missing.
+        output_file: File the refined conversations are appended to,
+            "cassiopeia.xames3" if missing.
+
+    """
+    pparams_file = alice.pparams_file
+    with open(pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+
+    # Add back the delimiters, the exception words are closed once the pairs
+    # are refined so that the exception file can be written again
+    conversation_count = 0
+    count = 0
+    with load_exception_index(exception_file or alice.exception_file,
+                              config_file['exception_set_file_size']) as exception_list, \
+            open(output_file or alice.cassiopeia_file, 'a') as refined_file:
+        for conversation in get_conversations(input_file or alice.cassiopeia_cleaned_file):
+            conversation_count += 1
             written = False
             for counter_index in range(0, len(conversation) - 1, 2):
-                src_line = conversation[counter_index]['text'].strip()
-                tgt_line = conversation[counter_index + 1]['text'].strip()
+                src_line = conversation[counter_index]
+                tgt_line = conversation[counter_index + 1]
                 assert src_line.startswith('X:') and tgt_line.startswith('A:')
 
-                skip = False
-
                 tokens = (src_line[2:] + ' ' + tgt_line[2:]).split(' ')
-                for token in tokens:
-                    if len(token) and token != ' ':
-                        t = token.lower()
-                        if t in exception_list:
-                            skip = True
-                            count += 1
-                            if count % 1000 == 0:
-                                end_time = datetime.now()
-                                elapsed_time = (end_time - start_time)
-                                print('\r# {:,} conversations skipped in {}.'.format(
-                                    count, str(elapsed_time).split('.')[0]), end='')
-                                sys.stdout.flush()
-                            break
-
-                if not skip:
-                    output_file.write('{}\n'.format(src_line))
-                    output_file.write('{}\n'.format(tgt_line))
+                if has_exception_word(tokens, exception_list):
+                    count += 1
+                else:
+                    refined_file.write('{}\n'.format(src_line))
+                    refined_file.write('{}\n'.format(tgt_line))
                     written = True
 
             if written:
-                output_file.write('===\n')
+                refined_file.write('===\n')
+
+            if conversation_count % 10000 == 0:
+                end_time = datetime.now()
+                elapsed_time = (end_time - start_time)
+                print('\r# {:,} conversations refined and {:,} pairs skipped in {}.'.format(
+                    conversation_count, count, str(elapsed_time).split('.')[0]), end='')
+                sys.stdout.flush()
+
+    end_time = datetime.now()
+    elapsed_time = (end_time - start_time)
+    print('\r# {:,} conversations refined and {:,} pairs skipped in {}.'.format(
+        conversation_count, count, str(elapsed_time).split('.')[0]), end='')
+    peak_memory = alice.peak_memory_usage()
+    if peak_memory is not None:
+        print('\n# Peak memory used {:.1f} MB.'.format(peak_memory / 2 ** 20), end='')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,437 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+RUNNER
+=======
+
+Runner runs the data steps, from parsing the Reddit dumps to the vocab, as a
+graph of stages and skips every stage whose inputs did not change since it
+last ran.
+
+Every stage lists the files it reads, the pparams its output depends on and
+the files it writes. Files are known by the sha256 of their contents, which
+is kept in "state.json" along with their size and modification time so that
+an unchanged file is not read again. A stage runs when the hashes of its
+inputs, pparams and code differ from its last run, or when one of its outputs
+is missing or was changed. Outputs are hashed too, so a stage which writes
+the same files as before does not make the stages after it run again.
+
+Every stage reads what the one before it wrote, so they run one after
+another. Unlike the separate scripts, the runner keeps the files between the
+steps in "./parsed/pipeline/", so that a change to a late step does not
+parse the dumps again.
+
+    Z:\\alice\\utils>py runner.py
+    Z:\\alice\\utils>py runner.py refine vocab --force
+    Z:\\alice\\utils>py runner.py --dry-run
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from datetime import datetime
+import os
+import argparse
+import hashlib
+import json
+
+from cleaner import Cleaner
+from decompression import is_input_file
+from dedup import dedup_file, get_dedup_index
+from parser import Parser, get_output_files, uncompress_output_files
+from preprocessing import preprocess_file
+from refiner import refiner
+from vocab import generate_vocab_file
+import alice_config as alice
+
+start_time = datetime.now()
+
+# Files are hashed in blocks of this size
+hash_block_size = 2 ** 20
+
+# Pparams which change the pairs dedup removes
+dedup_params = [
+    'dedup_threshold', 'dedup_permutations', 'dedup_bands', 'dedup_shingle_size',
+    'dedup_window'
+]
+
+# Pparams which change what the parser writes
+parse_params = [
+    'conversation_line_cache_size', 'conversation_window', 'comment_store', 'pair_filters',
+    'pair_filter_exceptions',
+    'subreddit_whitelist', 'subreddit_blacklist', 'substring_blacklist',
+    'sample_subreddit_weights', 'sample_seed'
+]
+
+
+def get_pipeline_path(name):
+    """Returns the path of a file kept between the stages."""
+    return os.path.join(alice.parsed_dir, 'pipeline', name)
+
+
+def get_module_files(*names):
+    return [os.path.join(alice.utils_dir, name + alice.py_file) for name in names]
+
+
+def get_data_files(folder):
+    """Lists the ".xames3" files of a folder, if it exists."""
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, data_file) for data_file in sorted(os.listdir(folder))
+            if data_file.lower().endswith(alice.xames3_file)]
+
+
+def run_parse():
+    # The compressed output of an earlier parse would be added to
+    for output_file in get_output_files():
+        os.remove(os.path.join(alice.parsed_dir, output_file))
+
+    # The parser tees to the "cassiopeia" file, which is the refined one here
+    cassiopeia_file = alice.cassiopeia_file
+    alice.cassiopeia_file = get_pipeline_path('parsed.xames3')
+    try:
+        parser = Parser()
+        parser.parse()
+        if parser.tee_output:
+            open(alice.cassiopeia_file, 'a').close()
+        else:
+            uncompress_output_files(alice.cassiopeia_file)
+    finally:
+        alice.cassiopeia_file = cassiopeia_file
+
+
+def run_clean():
+    cleaner = Cleaner(os.path.dirname(get_pipeline_path('parsed.xames3')))
+    cleaner.data_files = [get_pipeline_path('parsed.xames3')]
+    cleaner.write_cleaned_conversations(get_pipeline_path('temp.xames3'))
+
+
+def run_preprocess():
+    preprocess_file(get_pipeline_path('temp.xames3'), get_pipeline_path('cleaned.xames3'))
+
+
+def run_dedup():
+    with open(alice.pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+    dedup_file(get_pipeline_path('cleaned.xames3'), get_pipeline_path('deduped.xames3'),
+               get_dedup_index(config_file))
+
+
+def get_tokenized_path():
+    """Returns the tokenized file the vocab and the refiner read."""
+    with open(alice.pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+    if config_file['dedup_threshold'] > 0:
+        return get_pipeline_path('deduped.xames3')
+    return get_pipeline_path('cleaned.xames3')
+
+
+def run_temp_vocab():
+    generate_vocab_file(alice.core_dir, get_tokenized_path(),
+                        get_pipeline_path('vocab_temp.xames3'),
+                        get_pipeline_path('exception_temp.xames3'))
+
+
+def run_refine():
+    refiner(get_tokenized_path(), get_pipeline_path('exception_temp.xames3'),
+            alice.cassiopeia_file)
+
+
+def run_vocab():
+    generate_vocab_file(alice.core_dir, alice.cassiopeia_file, alice.vocab_file,
+                        alice.exception_file)
+
+
+class Stage(object):
+    """A step of the data preparation with the files it reads and writes."""
+
+    def __init__(self, name, function, inputs, outputs, params=(), modules=()):
+        """
+        Creates an instance of the class.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the stage.
+            function: Function running the stage, without arguments.
+            inputs: Files the stage reads.
+            outputs: Files the stage writes, removed before it runs.
+            params: Pparams which change its outputs.
+            modules: Source files of the code it runs.
+
+        """
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = list(params)
+        self.modules = list(modules)
+
+
+def get_stages():
+    """Returns the stages in the order they run one after another."""
+    with open(alice.pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+
+    dump_files = []
+    if os.path.isdir(alice.datasets_dir):
+        dump_files = [os.path.join(alice.datasets_dir, input_file)
+                      for input_file in sorted(os.listdir(alice.datasets_dir))
+                      if is_input_file(input_file)]
+    if config_file['pair_filters'] and config_file['pair_filter_exceptions']:
+        dump_files.append(alice.exception_file)
+    core_files = get_data_files(os.path.join(alice.core_dir, 'assistance')) + \
+        get_data_files(os.path.join(alice.core_dir, 'character'))
+
+    # Dedup only runs if "dedup_threshold" is set
+    dedup_stages = []
+    if config_file['dedup_threshold'] > 0:
+        dedup_stages = [
+            Stage('dedup', run_dedup, [get_pipeline_path('cleaned.xames3')],
+                  [get_pipeline_path('deduped.xames3')], dedup_params,
+                  get_module_files('dedup', 'refiner'))]
+
+    return [
+        Stage('parse', run_parse, dump_files, [get_pipeline_path('parsed.xames3')],
+              parse_params, get_module_files(
+                  'parser', 'comment_store', 'decompression', 'exception_index', 'filters',
+                  'matcher', 'projection', 'sampling', 'stages', 'thread_builder')),
+        Stage('clean', run_clean, [get_pipeline_path('parsed.xames3')],
+              [get_pipeline_path('temp.xames3')],
+              modules=get_module_files('cleaner', 'filters', 'stages', 'tokenizer')),
+        Stage('preprocess', run_preprocess, [get_pipeline_path('temp.xames3')],
+              [get_pipeline_path('cleaned.xames3')],
+              modules=get_module_files('preprocessing', 'refiner', 'tokenizer')),
+    ] + dedup_stages + [
+        Stage('temp_vocab', run_temp_vocab, [get_tokenized_path()] + core_files,
+              [get_pipeline_path('vocab_temp.xames3'), get_pipeline_path('exception_temp.xames3')],
+              modules=get_module_files('vocab')),
+        Stage('refine', run_refine,
+              [get_tokenized_path(), get_pipeline_path('exception_temp.xames3')],
+              [alice.cassiopeia_file], modules=get_module_files('refiner', 'exception_index')),
+        Stage('vocab', run_vocab, [alice.cassiopeia_file] + core_files,
+              [alice.vocab_file, alice.exception_file], modules=get_module_files('vocab')),
+    ]
+
+
+def hash_file(path):
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(hash_block_size), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+class RunnerState(object):
+    """Hashes of the files and the last run of every stage."""
+
+    def __init__(self, state_file):
+        """
+        Loads the state of the last run, if there is one.
+
+        Arguments:
+            self: An instance of the class.
+            state_file: File the state is kept in.
+
+        """
+        self.state_file = state_file
+        self.files = {}
+        self.stages = {}
+        if os.path.isfile(state_file):
+            with open(state_file, 'r') as input_file:
+                state = json.load(input_file)
+            self.files = state['files']
+            self.stages = state['stages']
+
+    def get_file_hash(self, path):
+        """
+        Returns the hash of the contents of a file, or None if it is missing.
+        A file is hashed again only if its size or modification time changed.
+
+        Arguments:
+            self: An instance of the class.
+            path: File to be hashed.
+
+        """
+        if not os.path.isfile(path):
+            return None
+        file_stat = os.stat(path)
+        size, modified = self.files.get(path, [None, None, None])[:2]
+        if size != file_stat.st_size or modified != file_stat.st_mtime_ns:
+            self.files[path] = [file_stat.st_size, file_stat.st_mtime_ns, hash_file(path)]
+        return self.files[path][2]
+
+    def get_stage_key(self, stage, config_file):
+        """
+        Returns the hash of everything the outputs of a stage depend on.
+
+        Arguments:
+            self: An instance of the class.
+            stage: Stage whose inputs are ready.
+            config_file: Pparams.
+
+        """
+        stage_key = hashlib.sha256()
+        params = [[param, config_file[param]] for param in stage.params]
+        stage_key.update(json.dumps([stage.name, params], sort_keys=True).encode('utf-8'))
+        for path in stage.inputs + stage.modules:
+            stage_key.update('{}={}\n'.format(path, self.get_file_hash(path)).encode('utf-8'))
+        return stage_key.hexdigest()
+
+    def is_up_to_date(self, stage, stage_key):
+        """
+        Returns True if the stage last ran with the same key and its outputs
+        are still the ones it wrote.
+
+        Arguments:
+            self: An instance of the class.
+            stage: Stage to be checked.
+            stage_key: Key of the stage, see "get_stage_key".
+
+        """
+        last_run = self.stages.get(stage.name)
+        if last_run is None or last_run['key'] != stage_key:
+            return False
+        return all(self.get_file_hash(path) == last_run['outputs'].get(path)
+                   for path in stage.outputs)
+
+    def set_stage_run(self, stage, stage_key):
+        """
+        Records that a stage ran and saves the state.
+
+        Arguments:
+            self: An instance of the class.
+            stage: Stage which ran.
+            stage_key: Key of the stage it ran with.
+
+        """
+        self.stages[stage.name] = {
+            'key': stage_key,
+            'outputs': {path: self.get_file_hash(path) for path in stage.outputs}
+        }
+        self.save()
+
+    def save(self):
+        with open(self.state_file + alice.tmp_file, 'w') as output_file:
+            json.dump({'files': self.files, 'stages': self.stages}, output_file, indent=1)
+        os.replace(self.state_file + alice.tmp_file, self.state_file)
+
+
+def get_dependencies(stages):
+    """
+    Returns {stage name: names of the stages before it writing its inputs}.
+
+    Arguments:
+        stages: Stages in the order they run one after another.
+
+    """
+    dependencies = {}
+    writers = {}
+    for stage in stages:
+        dependencies[stage.name] = {writers[path] for path in stage.inputs if path in writers}
+        for path in stage.outputs:
+            writers[path] = stage.name
+    return dependencies
+
+
+def run_stages(targets=None, force=False, dry_run=False):
+    """
+    Runs the stages which are not up to date, with the stages they need.
+
+    Arguments:
+        targets: Names of the stages wanted, all of them if missing.
+        force: Whether to run the targets even if they are up to date.
+        dry_run: Whether to only print the stages which would run.
+
+    Returns the names of the stages which ran.
+    """
+    with open(alice.pparams_file, 'r') as params_file:
+        config_file = json.load(params_file)
+
+    stages = get_stages()
+    dependencies = get_dependencies(stages)
+    if not targets:
+        targets = [stage.name for stage in stages]
+
+    # The targets and every stage they need
+    needed = set()
+    wanted = list(targets)
+    while wanted:
+        name = wanted.pop()
+        if name not in needed:
+            needed.add(name)
+            wanted.extend(dependencies[name])
+
+    alice.create_dir(os.path.dirname(get_pipeline_path('state.json')))
+    state = RunnerState(get_pipeline_path('state.json'))
+    ran = []
+    for stage in stages:
+        if stage.name not in needed:
+            continue
+
+        # The outputs the earlier stages would write are not known without
+        # running them
+        if dry_run and dependencies[stage.name] & set(ran):
+            print('# Would run "{}" after the stages it needs.'.format(stage.name))
+            ran.append(stage.name)
+            continue
+
+        stage_key = state.get_stage_key(stage, config_file)
+        if state.is_up_to_date(stage, stage_key) and not (force and stage.name in targets):
+            print('# Skipping "{}", it is up to date.'.format(stage.name))
+            continue
+        ran.append(stage.name)
+        if dry_run:
+            print('# Would run "{}".'.format(stage.name))
+            continue
+
+        for path in stage.outputs:
+            if os.path.isfile(path):
+                os.remove(path)
+        print('# Running "{}" at {}.'.format(stage.name, datetime.now().strftime('%I:%M %p')))
+        stage.function()
+        state.set_stage_run(stage, stage_key)
+        elapsed_time = datetime.now() - start_time
+        print('\n# "{}" done in {}.'.format(stage.name, str(elapsed_time).split('.')[0]))
+    return ran
+
+
+if __name__ == '__main__':
+    stage_names = [stage.name for stage in get_stages()]
+    arg_parser = argparse.ArgumentParser(description='Run the data steps which are not up to date.')
+    arg_parser.add_argument('stages', nargs='*', metavar='stage',
+                            help='stages wanted, with the stages they need, all if none: ' +
+                            ', '.join(stage_names))
+    arg_parser.add_argument('--force', action='store_true',
+                            help='run the given stages even if they are up to date')
+    arg_parser.add_argument('--dry-run', action='store_true',
+                            help='only print the stages which would run')
+    args = arg_parser.parse_args()
+    for stage_name in args.stages:
+        if stage_name not in stage_names:
+            arg_parser.error('unknown stage "{}".'.format(stage_name))
+
+    alice.create_dir(alice.parsed_dir)
+    ran = run_stages(args.stages, args.force, args.dry_run)
+    if not args.dry_run:
+        print('# {} stage(s) ran, cassiopeia file of {}.'.format(
+            len(ran), alice.file_size(alice.cassiopeia_file)))
+        print('# Run .\\train.py file to continue.')
@@ -0,0 +1,135 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+SAMPLING
+=========
+
+Sampling keeps a fixed number of conversations picked at random from all the
+conversations written by the parser, in a single pass and with memory bound
+by the size of the sample.
+
+Every conversation gets the key log(u) / weight for a random u in (0, 1] and
+the conversations with the largest keys are kept (weighted reservoir
+sampling, "A-Res"). With the default weight of 1 every conversation is
+equally likely to be kept, a subreddit with a weight of 2 is twice as likely
+and one with a weight of 0 is never kept.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import heapq
+import math
+import random
+
+
+class ConversationReservoir(object):
+    """Output handler which keeps a weighted sample of the conversations."""
+
+    def __init__(self, path, sample_size, subreddit_weights=None, seed=None):
+        """
+        Creates an instance of the class.
+
+        Arguments:
+            self: An instance of the class.
+            path: File the sampled conversations are written to on "close".
+            sample_size: Number of conversations kept.
+            subreddit_weights: Weight of the conversations of a subreddit,
+                subreddits which are not listed have a weight of 1.
+            seed: Seed of the random keys, for a repeatable sample.
+
+        """
+        self.path = path
+        self.sample_size = sample_size
+        self.subreddit_weights = subreddit_weights or {}
+        self.random = random.Random(seed)
+        self.stage_queues = []
+
+        # Heap of (key, conversation number, encoded conversation), the
+        # smallest key is the next one to be replaced
+        self.reservoir = []
+        self.seen_count = 0
+        self.conversation_count = 0
+
+    def write(self, data, subreddit=None):
+        """
+        Offers a conversation to the sample.
+
+        Arguments:
+            self: An instance of the class.
+            data: The conversation with its "===" separator.
+            subreddit: Subreddit the conversation was posted in.
+
+        """
+        weight = self.subreddit_weights.get(subreddit, 1)
+        if weight <= 0:
+            return
+        self.seen_count += 1
+        key = math.log(1.0 - self.random.random()) / weight
+        if len(self.reservoir) < self.sample_size:
+            heapq.heappush(self.reservoir, (key, self.seen_count, data.encode('ascii', 'ignore')))
+        elif key > self.reservoir[0][0]:
+            heapq.heapreplace(self.reservoir, (key, self.seen_count, data.encode('ascii', 'ignore')))
+
+    def close(self):
+        """
+        Writes the sampled conversations in the order they were parsed.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        with open(self.path, 'wb') as sample_file:
+            for _, _, data in sorted(self.reservoir, key=lambda item: item[1]):
+                sample_file.write(data)
+        self.conversation_count = len(self.reservoir)
+        print('# {:,} of {:,} conversations sampled.'.format(
+            self.conversation_count, self.seen_count))
+
+    def checkpoint(self):
+        """
+        Returns the state "restore" needs to continue from here.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        return {'sample_size': self.sample_size,
+                'reservoir': list(self.reservoir),
+                'seen_count': self.seen_count,
+                'random_state': self.random.getstate()}
+
+    def restore(self, state):
+        """
+        Continues sampling from a checkpoint.
+
+        Arguments:
+            self: An instance of the class.
+            state: State returned by "checkpoint".
+
+        """
+        if 'reservoir' not in state or state['sample_size'] != self.sample_size:
+            raise ValueError('The checkpoint was not saved by a sample of {:,} conversations.'.format(
+                self.sample_size))
+        self.reservoir = state['reservoir']
+        self.seen_count = state['seen_count']
+        self.random.setstate(state['random_state'])
@@ -0,0 +1,299 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+STAGES
+=======
+
+Stages is used for running the data scripts as a chain of threads joined by
+bounded queues, so that decompression, decoding and compression can overlap.
+
+Every queue keeps track of its depth and of the time spent waiting on it:
+    * A queue that is mostly full means the stage after it is the bottleneck.
+    * A queue that is mostly empty means the stage before it is the bottleneck.
+
+The decode pool of "ordered_thread_map" is made of threads, so decoding the
+JSON and filtering the comments still hold the GIL and run one at a time.
+The threads only gain where the GIL is released, in decompression and
+compression and in waiting on the files, and "ordered_pool_map" is used
+where the work itself has to be spread over the cores.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import deque
+from threading import Event, Lock, Thread
+import queue
+import time
+
+# Marks the end of the items put on a queue
+end_of_stage = object()
+
+
+class MeteredQueue(queue.Queue):
+    """Bounded queue which records its depth and waiting times."""
+
+    def __init__(self, name, maxsize):
+        """
+        Creates an instance of the class.
+
+        Arguments:
+            self: An instance of the class.
+            name: Name of the queue used in the report.
+            maxsize: Maximum number of items in the queue.
+
+        """
+        queue.Queue.__init__(self, maxsize)
+        self.name = name
+        self.put_count = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+        # Several threads put and get on the same queue
+        self.metrics_lock = Lock()
+
+    def put(self, item, block=True, timeout=None):
+        depth = self.qsize()
+        wait_start = time.perf_counter()
+        queue.Queue.put(self, item, block, timeout)
+        wait = time.perf_counter() - wait_start
+        with self.metrics_lock:
+            self.put_count += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+            self.put_wait += wait
+
+    def get(self, block=True, timeout=None):
+        wait_start = time.perf_counter()
+        item = queue.Queue.get(self, block, timeout)
+        wait = time.perf_counter() - wait_start
+        with self.metrics_lock:
+            self.get_wait += wait
+        return item
+
+    def report(self):
+        """
+        Returns a one line summary of the queue usage.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        depth_mean = self.depth_total / self.put_count if self.put_count else 0.0
+        return '{}: mean depth {:.1f}/{}, max {}, producers waited {:.1f}s, consumers waited {:.1f}s'.format(
+            self.name, depth_mean, self.maxsize, self.depth_max, self.put_wait, self.get_wait)
+
+
+class StageError(object):
+    """Carries an exception raised inside a stage thread to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def batched(iterable, size):
+    """
+    Groups the items of an iterable into lists of at most size items.
+
+    Arguments:
+        iterable: Items to group.
+        size: Number of items per list.
+
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _start_thread(target, *args):
+    thread = Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def ordered_thread_map(function, batches, workers, queue_size, queues=None):
+    """
+    Applies function to every batch in a pool of threads and yields the
+    results in the original order of the batches.
+
+    A reader thread pulls the batches into a bounded queue, the workers
+    process them and the results are put back in order as they come out.
+
+    Arguments:
+        function: Called with a batch, returns its result.
+        batches: Iterable of batches, read in its own thread.
+        workers: Number of worker threads.
+        queue_size: Maximum number of batches waiting in each queue.
+        queues: Optional list, the metered queues are appended to it.
+
+    """
+    input_queue = MeteredQueue('read -> decode', queue_size)
+    output_queue = MeteredQueue('decode -> cache', queue_size)
+    if queues is not None:
+        queues.extend([input_queue, output_queue])
+
+    def read():
+        try:
+            for batch_id, batch in enumerate(batches):
+                input_queue.put((batch_id, batch))
+        except Exception as error:
+            output_queue.put((-1, StageError(error)))
+        for _ in range(workers):
+            input_queue.put(end_of_stage)
+
+    def work():
+        while True:
+            item = input_queue.get()
+            if item is end_of_stage:
+                output_queue.put(end_of_stage)
+                return
+            batch_id, batch = item
+            try:
+                output_queue.put((batch_id, function(batch)))
+            except Exception as error:
+                output_queue.put((-1, StageError(error)))
+
+    _start_thread(read)
+    for _ in range(workers):
+        _start_thread(work)
+
+    next_batch_id = 0
+    finished_workers = 0
+    pending_results = {}
+    while finished_workers < workers:
+        item = output_queue.get()
+        if item is end_of_stage:
+            finished_workers += 1
+            continue
+        batch_id, result = item
+        if isinstance(result, StageError):
+            raise result.error
+        pending_results[batch_id] = result
+        while next_batch_id in pending_results:
+            yield pending_results.pop(next_batch_id)
+            next_batch_id += 1
+
+
+def ordered_pool_map(pool, function, batches, queue_size):
+    """
+    Applies function to every batch in a process pool and yields the results
+    in the original order of the batches.
+
+    At most queue_size batches are handed to the pool at a time, so the
+    batches are read no faster than the workers get through them.
+
+    Arguments:
+        pool: A "multiprocessing" pool.
+        function: Module level function called with a batch, returns its
+            result.
+        batches: Iterable of batches.
+        queue_size: Maximum number of batches in the pool at a time.
+
+    """
+    pending_results = deque()
+    for batch in batches:
+        if len(pending_results) >= queue_size:
+            yield pending_results.popleft().get()
+        pending_results.append(pool.apply_async(function, (batch,)))
+    while pending_results:
+        yield pending_results.popleft().get()
+
+
+class BackgroundWriter(object):
+    """Runs a write function in its own thread behind a bounded queue."""
+
+    def __init__(self, write, queue_size, name='cache -> write'):
+        """
+        Creates an instance of the class.
+
+        Arguments:
+            self: An instance of the class.
+            write: Called with every item put on the queue.
+            queue_size: Maximum number of items waiting to be written.
+            name: Name of the queue used in the report.
+
+        """
+        self.queue = MeteredQueue(name, queue_size)
+        self.error = None
+        self._write = write
+        self._thread = _start_thread(self._run)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is end_of_stage:
+                return
+            if isinstance(item, Event):
+                item.set()
+                continue
+            if self.error is None:
+                try:
+                    self._write(item)
+                except Exception as error:
+                    self.error = error
+
+    def put(self, item):
+        """
+        Queues an item for writing.
+
+        Arguments:
+            self: An instance of the class.
+            item: Item passed on to the write function.
+
+        """
+        if self.error is not None:
+            raise self.error
+        self.queue.put(item)
+
+    def flush(self):
+        """
+        Waits until every item queued so far is written.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        written = Event()
+        self.queue.put(written)
+        written.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """
+        Waits until every queued item is written.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        self.queue.put(end_of_stage)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
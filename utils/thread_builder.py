@@ -0,0 +1,212 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+THREAD BUILDER
+===============
+
+Thread Builder links the cached conversation lines into conversations with
+NumPy array operations instead of one dictionary lookup after another. It
+takes the place of the memory comment store and copies the parents, authors
+and scores of the cached lines into arrays when conversations are built.
+
+Every parent keeps the same child as in "process_cached_conversation_lines":
+    * The last reply written by the author of the grandparent, if any.
+    * Otherwise the first of the replies with the highest score.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from itertools import count, repeat
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class NumpyThreadBuilder(object):
+    """Comment store which builds conversations with array operations."""
+
+    def __init__(self):
+        """
+        Creates an empty store.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        self.clear()
+
+    def __setitem__(self, name, conversation_line):
+        self.names.append(name)
+        self.conversation_lines.append(conversation_line)
+
+    def __len__(self):
+        return len(self.names)
+
+    def items(self):
+        return zip(self.names, self.conversation_lines)
+
+    def clear(self):
+        self.names = []
+        self.conversation_lines = []
+
+    def close(self):
+        self.clear()
+
+    def get_parent_index(self):
+        """
+        Returns the index of the parent of every line, -1 if it is not cached,
+        or None if a name was cached more than once.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        line_count = len(self.names)
+        parent_ids = list(map(attrgetter('parent_id'), self.conversation_lines))
+        try:
+            names = np.fromiter(self.names, np.int64, line_count)
+            parent_names = np.fromiter(parent_ids, np.int64, line_count)
+        except (TypeError, ValueError, OverflowError):
+            # Some ids are not packed into integers
+            positions = dict(zip(self.names, count()))
+            if len(positions) < line_count:
+                return None
+            return np.fromiter(
+                map(positions.get, parent_ids, repeat(-1)), np.int64, line_count)
+
+        # Packed ids are looked up in a sorted copy instead of a dictionary,
+        # dump files are mostly in the order of the ids already
+        if np.all(names[1:] > names[:-1]):
+            order = np.arange(line_count)
+            sorted_names = names
+        else:
+            order = np.argsort(names, kind='stable')
+            sorted_names = names[order]
+            if np.any(sorted_names[1:] == sorted_names[:-1]):
+                return None
+        found = np.searchsorted(sorted_names, parent_names)
+        found[found == line_count] = 0
+        return np.where(sorted_names[found] == parent_names, order[found], -1)
+
+    def deduplicate(self):
+        """
+        Keeps a name cached twice at its first position with its last line,
+        same as a dictionary.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        conversation_line_dict = dict(zip(self.names, self.conversation_lines))
+        self.clear()
+        for name, conversation_line in conversation_line_dict.items():
+            self[name] = conversation_line
+
+    def select_children(self, parent_index):
+        """
+        Returns the index of the child kept by every line, -1 if none.
+
+        Arguments:
+            self: An instance of the class.
+            parent_index: Index of the parent of every line.
+
+        """
+        child_index = np.full(len(self.names), -1, np.int64)
+        replies = np.flatnonzero(parent_index >= 0)
+        if len(replies) == 0:
+            return child_index
+
+        line_count = len(self.conversation_lines)
+        authors = np.fromiter(
+            map(attrgetter('author'), self.conversation_lines), object, line_count)
+        scores = np.fromiter(
+            map(attrgetter('score'), self.conversation_lines), np.int64, line_count)
+
+        parents = parent_index[replies]
+        grandparents = parent_index[parents]
+        by_grandparent_author = grandparents >= 0
+        by_grandparent_author[by_grandparent_author] = (
+            authors[replies[by_grandparent_author]] == authors[grandparents[by_grandparent_author]])
+
+        # First of the replies with the highest score. The stable sort keeps
+        # the replies of a parent with the same score in the order they were
+        # cached.
+        scores = scores[replies]
+        score_range = int(scores.max()) - int(scores.min()) + 1
+        if score_range * len(scores) < 2 ** 62:
+            order = np.argsort(parents * score_range + (scores.max() - scores), kind='stable')
+        else:
+            order = np.lexsort((-scores, parents))
+        first = np.append(True, parents[order][1:] != parents[order][:-1])
+        child_index[parents[order][first]] = replies[order][first]
+
+        # Unless there is a reply by the grandparent author, the last one wins
+        replies = replies[by_grandparent_author]
+        parents = parents[by_grandparent_author]
+        if len(replies) > 0:
+            order = np.argsort(parents, kind='stable')
+            last = np.append(parents[order][1:] != parents[order][:-1], True)
+            child_index[parents[order][last]] = replies[order][last]
+        return child_index
+
+    def conversations(self):
+        """
+        Yields the lines of every conversation with an even number of lines,
+        in the order their first lines were cached.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        parent_index = self.get_parent_index()
+        if parent_index is None:
+            self.deduplicate()
+            parent_index = self.get_parent_index()
+        child_index = self.select_children(parent_index)
+        roots = np.flatnonzero((parent_index < 0) & (child_index >= 0))
+
+        # Follows all the chains one level at a time
+        chain_ids = [np.arange(len(roots))]
+        chain_lines = [roots]
+        active_ids = chain_ids[0]
+        active_lines = roots
+        while len(active_lines) > 0:
+            active_lines = child_index[active_lines]
+            continues = active_lines >= 0
+            active_ids = active_ids[continues]
+            active_lines = active_lines[continues]
+            chain_ids.append(active_ids)
+            chain_lines.append(active_lines)
+
+        chain_ids = np.concatenate(chain_ids)
+        chain_lines = np.concatenate(chain_lines)[np.argsort(chain_ids, kind='stable')]
+        depths = np.bincount(chain_ids, minlength=len(roots))
+        ends = np.cumsum(depths)
+        even = depths % 2 == 0
+        chain_lines = chain_lines.tolist()
+        conversation_lines = self.conversation_lines
+        for start, end in zip((ends - depths)[even].tolist(), ends[even].tolist()):
+            yield [conversation_lines[index] for index in chain_lines[start:end]]
@@ -0,0 +1,190 @@
+# Copyright 2019 XA. All Rights Reserved.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# =============================================================================
+#
+#                           A . L . I . C . E
+#                A Logically Interacting Computing Entity
+#
+# =============================================================================
+
+"""
+TOKENIZER
+==========
+
+Tokenizer splits text into the same Treebank style tokens as
+"nltk.word_tokenize", which the cleaner, the preprocessing and the inference
+all use, only faster.
+
+"nltk.word_tokenize" splits the text into sentences with "punkt" and runs
+every rule of its word tokenizer over each of them. Here the rules are the
+same and run in the same order, but a rule is skipped when the text has none
+of the characters it looks for, and the tokens of a text are cached.
+
+Splitting into sentences only changes the tokens where a sentence ends with
+a period, so a text without a period before its trailing punctuation is
+tokenized as a single sentence. Any other text is still split by "punkt", and
+without its data a LookupError is raised like "nltk.word_tokenize" does, only
+at the first such text instead of the first text.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from functools import lru_cache
+import re
+
+import nltk
+
+# Number of texts whose tokens are kept
+cache_size = 2 ** 16
+
+# The rules of "nltk.tokenize.NLTKWordTokenizer", each with the substrings one
+# of which the text must have for the rule to change anything
+starting_quotes = [
+    (('«', '“', '‘', '„', '`'), re.compile('([«“‘„]|[`]+)'), r' \1 '),
+    (('"',), re.compile(r'^\"'), r'``'),
+    (('``',), re.compile(r'(``)'), r' \1 '),
+    (('"', "''"), re.compile(r'([ \(\[{<])(\"|\'{2})'), r'\1 `` '),
+    (("'",), re.compile(r'(?i)(?<!\w)(\')(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)'), r'\1 '),
+]
+punctuation = [
+    (('.',), re.compile(r'([^\.])(\.)([\]\)}>"\'' '»”’ ' r']*)\s*$'), r'\1 \2 \3 '),
+    ((':', ','), re.compile(r'([:,])([^\d])'), r' \1 \2'),
+    ((':', ','), re.compile(r'([:,])$'), r' \1 '),
+    (('..',), re.compile(r'\.{2,}'), r' \g<0> '),
+    ((';', '@', '#', '$', '%', '&'), re.compile(r'[;@#$%&]'), r' \g<0> '),
+    (('\u2012', '\u2013', '\u2014', '\u2015'), re.compile('[\u2012-\u2015]'), r' \g<0> '),
+    (('.',), re.compile(r'([^\.])(\.)([\]\)}>"\']*)\s*$'), r'\1 \2\3 '),
+    (('?', '!'), re.compile(r'[?!]'), r' \g<0> '),
+    (("'",), re.compile(r"([^'])' "), r"\1 ' "),
+    (('*',), re.compile(r'[*]'), r' \g<0> '),
+    (('[', ']', '(', ')', '{', '}', '<', '>'), re.compile(r'[\]\[\(\)\{\}\<\>]'), r' \g<0> '),
+    (('--',), re.compile(r'--'), r' -- '),
+]
+ending_quotes = [
+    (('»', '”', '’'), re.compile('([»”’])'), r' \1 '),
+    (("''",), re.compile(r"''"), " '' "),
+    (('"',), re.compile(r'"'), " '' "),
+]
+ending_contractions = [
+    (("'",), re.compile(r"([^' ])('[sS]|'[mM]|'[dD]|') "), r'\1 \2 '),
+    (("'",), re.compile(r"([^' ])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T) "), r'\1 \2 '),
+]
+# These are matched on the lowercased text
+contractions = [
+    (('cannot',), re.compile(r'(?i)\b(can)(?#X)(not)\b'), r' \1 \2 '),
+    (("d'ye",), re.compile(r"(?i)\b(d)(?#X)('ye)\b"), r' \1 \2 '),
+    (('gimme',), re.compile(r'(?i)\b(gim)(?#X)(me)\b'), r' \1 \2 '),
+    (('gonna',), re.compile(r'(?i)\b(gon)(?#X)(na)\b'), r' \1 \2 '),
+    (('gotta',), re.compile(r'(?i)\b(got)(?#X)(ta)\b'), r' \1 \2 '),
+    (('lemme',), re.compile(r'(?i)\b(lem)(?#X)(me)\b'), r' \1 \2 '),
+    (("more'n",), re.compile(r"(?i)\b(more)(?#X)('n)\b"), r' \1 \2 '),
+    (('wanna',), re.compile(r'(?i)\b(wan)(?#X)(na)(?=\s)'), r' \1 \2 '),
+    ((" 'tis",), re.compile(r"(?i) ('t)(?#X)(is)\b"), r' \1 \2 '),
+    ((" 'twas",), re.compile(r"(?i) ('t)(?#X)(was)\b"), r' \1 \2 '),
+]
+
+# Characters which stay in a sentence after its closing period
+sentence_closers = '"\')]}'
+
+
+def apply_rules(rules, text, lowered=None):
+    """
+    Applies the rules whose substrings are found in the text.
+
+    Arguments:
+        rules: List of (substrings, pattern, replacement).
+        text: Text to be changed.
+        lowered: Lowercased text the substrings are looked for in, the text
+            itself if missing.
+
+    """
+    for substrings, pattern, replacement in rules:
+        searched = text if lowered is None else lowered
+        for substring in substrings:
+            if substring in searched:
+                text = pattern.sub(replacement, text)
+                if lowered is not None:
+                    lowered = text.lower()
+                break
+    return text
+
+
+def tokenize_sentence(sentence):
+    """
+    Returns the tokens of a single sentence, the same as
+    "nltk.tokenize.NLTKWordTokenizer().tokenize".
+
+    Arguments:
+        sentence: Sentence to be tokenized.
+
+    """
+    text = apply_rules(starting_quotes, sentence)
+    text = apply_rules(punctuation, text)
+    text = apply_rules(ending_quotes, ' ' + text + ' ')
+    text = ' ' + ' '.join(text.split()) + ' '
+    text = apply_rules(ending_contractions, text)
+    text = apply_rules(contractions, text, text.lower())
+    return text.split()
+
+
+def is_single_sentence(text):
+    """
+    Returns True if splitting the text into sentences cannot change its
+    tokens.
+
+    Arguments:
+        text: Text to be tokenized.
+
+    """
+    # Only the closing period of the text may be left, and the quotes which
+    # open a sentence right after a "?" or a "!" are not the same tokens
+    head = text.rstrip(sentence_closers).rstrip('.')
+    if '.' in head or "''" in text:
+        return False
+    return '"' not in text or ('?' not in text and '!' not in text)
+
+
+def split_sentences(text):
+    """
+    Splits text into sentences with "punkt", which raises a LookupError if
+    its data is not installed.
+
+    Arguments:
+        text: Text to be split.
+
+    """
+    return nltk.sent_tokenize(text)
+
+
+@lru_cache(maxsize=cache_size)
+def get_tokens(text):
+    # Like "punkt", the whitespace ending the text is left out
+    text = text.rstrip()
+    if is_single_sentence(text):
+        return tuple(tokenize_sentence(text))
+    return tuple(token for sentence in split_sentences(text)
+                 for token in tokenize_sentence(sentence))
+
+
+def word_tokenize(text):
+    """
+    Returns the tokens of a text, the same as "nltk.word_tokenize".
+
+    Arguments:
+        text: Text to be tokenized.
+
+    """
+    return list(get_tokens(text))
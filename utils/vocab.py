@@ -39,123 +39,176 @@ import alice_config as alice
 start_time = datetime.now()
 
 
-def generate_vocab_file(core_dir):
+# Input words starting or ending with these are never in the vocab
+excluded_prefixes = ('.', '-', '!', '@', '$', '%', '"', "'", ':', ';', ',')
+excluded_suffixes = ('..', '-', '@')
+
+
+class VocabCounter(object):
+    """Collects the vocab and the exception words from tokenized lines."""
+
+    def __init__(self, core_dir):
+        """
+        Creates an instance of the class with the special tokens and the
+        words of the inbuilt data files.
+
+        Arguments:
+            self: An instance of the class.
+            core_dir: Core folder.
+
+        """
+        self.vocab_list = []
+        self.vocab_words = set()
+
+        # Number of times every input word which is not in the vocab was seen
+        self.input_counts = {}
+
+        # Special tokens, with IDs: 0, 1, 2.
+        for t in ['_unk_', '_bos_', '_eos_']:
+            self.add_word(t)
+
+        # The word following this punctuation should be capitalized in the
+        # prediction output.
+        for t in ['.', '!', '?']:
+            self.add_word(t)
+
+        # The word following this punctuation should not precede with a space
+        # in the prediction output.
+        for t in ['(', '[', '{', '``', '$']:
+            self.add_word(t)
+
+        for file_core in range(2, 0, -1):
+            learn_1 = 'assistance'
+            learn_2 = 'character'
+            if file_core == 1:
+                file_dir = os.path.join(core_dir, learn_1)
+            else:
+                file_dir = os.path.join(core_dir, learn_2)
+
+            for data_file in sorted(os.listdir(file_dir)):
+                full_path_name = os.path.join(file_dir, data_file)
+                if os.path.isfile(full_path_name) and data_file.lower().endswith('.xames3'):
+                    with open(full_path_name, 'r') as f:
+                        for line in f:
+                            lnstrp = line.strip()
+                            if lnstrp.startswith('X:') or lnstrp.startswith('A:'):
+                                for token in lnstrp[2:].strip().split(' '):
+                                    if len(token):
+                                        self.add_word(token.lower())
+
+    def add_word(self, word):
+        """
+        Adds a word to the vocab.
+
+        Arguments:
+            self: An instance of the class.
+            word: Lowercased word.
+
+        """
+        if word not in self.vocab_words:
+            self.vocab_words.add(word)
+            self.vocab_list.append(word)
+
+    def add_tokens(self, tokens, target):
+        """
+        Counts the tokens of a line. Every word of a target line is added to
+        the vocab, a word of an input line only once it was seen twice.
+
+        Arguments:
+            self: An instance of the class.
+            tokens: Tokens of an "X:" or "A:" line.
+            target: Whether the tokens are of an "A:" line.
+
+        """
+        for token in tokens:
+            if not len(token):
+                continue
+            t = token.lower()
+            if t in self.vocab_words:
+                continue
+            if target:
+                self.add_word(t)
+                continue
+
+            count = self.input_counts.get(t, 0) + 1
+            self.input_counts[t] = count
+            if count >= 2 and not t.startswith(excluded_prefixes) and \
+                    not t.endswith(excluded_suffixes):
+                self.add_word(t)
+
+    def get_exception_words(self):
+        """
+        Returns the input words which are not in the vocab, in the order
+        they were first seen.
+
+        Arguments:
+            self: An instance of the class.
+
+        """
+        return [k for k in self.input_counts if k not in self.vocab_words]
+
+    def write(self, vocab_file, exception_file):
+        """
+        Appends the vocab and the exception words to their files.
+
+        Arguments:
+            self: An instance of the class.
+            vocab_file: Vocab file.
+            exception_file: Exception file.
+
+        """
+        with open(vocab_file, 'a') as final_vocab_file:
+            for v in self.vocab_list:
+                final_vocab_file.write('{}\n'.format(v))
+
+        with open(exception_file, 'a') as final_exception_file:
+            for k in self.get_exception_words():
+                final_exception_file.write('{}\n'.format(k))
+
+
+def generate_vocab_file(core_dir, cassiopeia_file=None, vocab_file=None, exception_file=None):
     """
     Creates "vocab.xames3" file for training and prediction.
 
     Arguments:
         core_dir: Core folder.
+        cassiopeia_file: Tokenized conversations the vocab is made of,
+            "cassiopeia.xames3" if missing.
+        vocab_file: Vocab file appended to, "vocab.xames3" if missing.
+        exception_file: Exception file appended to, "exception.xames3" if
+            missing.
     """
-    vocab_list = []
-
-    # Special tokens, with IDs: 0, 1, 2.
-    for t in ['_unk_', '_bos_', '_eos_']:
-        vocab_list.append(t)
-
-    # The word following this punctuation should be capitalized in the
-    # prediction output.
-    for t in ['.', '!', '?']:
-        vocab_list.append(t)
-
-    # The word following this punctuation should not precede with a space
-    # in the prediction output.
-    for t in ['(', '[', '{', '``', '$']:
-        vocab_list.append(t)
-
-    for file_core in range(2, 0, -1):
-        learn_1 = 'assistance'
-        learn_2 = 'character'
-        if file_core == 1:
-            file_dir = os.path.join(core_dir, learn_1)
-        else:
-            file_dir = os.path.join(core_dir, learn_2)
-
-        for data_file in sorted(os.listdir(file_dir)):
-            full_path_name = os.path.join(file_dir, data_file)
-            if os.path.isfile(full_path_name) and data_file.lower().endswith('.xames3'):
-                with open(full_path_name, 'r') as f:
-                    for line in f:
-                        lnstrp = line.strip()
-                        if not lnstrp:
-                            continue
-                        if lnstrp.startswith('X:') or lnstrp.startswith('A:'):
-                            tokens = lnstrp[2:].strip().split(' ')
-                            for token in tokens:
-                                if len(token) and token != ' ':
-                                    t = token.lower()
-                                    if t not in vocab_list:
-                                        vocab_list.append(t)
-
-    print('# {} vocabs created from the inbuilt data files.'.format(len(vocab_list)))
-
-    temp_dict = {}
-    cassiopeia_file = alice.cassiopeia_file
+    vocab_counter = VocabCounter(core_dir)
+    print('# {} vocabs created from the inbuilt data files.'.format(
+        len(vocab_counter.vocab_list)))
+
+    if cassiopeia_file is None:
+        cassiopeia_file = alice.cassiopeia_file
     if os.path.exists(cassiopeia_file):
         with open(cassiopeia_file, 'r') as raw_data:
             line_cnt = 0
             for line in raw_data:
                 line_cnt += 1
-                end_time = datetime.now()
-                elapsed_time = (end_time - start_time)
                 if line_cnt % 2000 == 0:
+                    end_time = datetime.now()
+                    elapsed_time = (end_time - start_time)
                     print('\r# {:,} lines read from the base file in {}.'.format(
                         line_cnt, str(elapsed_time).split('.')[0]), end='')
                     sys.stdout.flush()
 
                 lnstrp = line.strip()
-                if not lnstrp:
-                    continue
                 if lnstrp.startswith('X:') or lnstrp.startswith('A:'):
-                    tokens = lnstrp[2:].strip().split(' ')
-                    for token in tokens:
-                        if len(token) and token != ' ':
-                            t = token.lower()
-                            if t not in vocab_list:
-                                if lnstrp.startswith('A:'):
-                                    vocab_list.append(t)
-                                else:
-                                    if t not in temp_dict:
-                                        temp_dict[t] = 1
-                                    else:
-                                        temp_dict[t] += 1
-                                        if temp_dict[t] >= 2:
-                                            if t.startswith('.') or \
-                                                t.startswith('-') or \
-                                                t.startswith('!') or \
-                                                t.startswith('@') or \
-                                                t.startswith('$') or \
-                                                t.startswith('%') or \
-                                                t.startswith('"') or \
-                                                t.startswith("'") or \
-                                                t.startswith(':') or \
-                                                t.startswith(';') or \
-                                                t.startswith(',') or \
-                                                t.endswith('..') or \
-                                                t.endswith('-') or \
-                                                t.endswith('@') or \
-                                                    t.endswith('-'):
-                                                continue
-
-                                            vocab_list.append(t)
+                    vocab_counter.add_tokens(
+                        lnstrp[2:].strip().split(' '), lnstrp.startswith('A:'))
 
             print('\r')
 
-    counter_index = 0
-    with open(alice.vocab_file, 'a') as final_vocab_file:
-        for v in vocab_list:
-            final_vocab_file.write('{}\n'.format(v))
-            counter_index += 1
-            end_time = datetime.now()
-            elapsed_time = (end_time - start_time)
-            print('\r# {} vocabs generated. Total time took {}.'.format(
-                counter_index, str(elapsed_time).split('.')[0]), end='')
-            sys.stdout.flush()
-
-    with open(alice.exception_file, 'a') as exception_file:
-        for k, _ in temp_dict.items():
-            if k not in vocab_list:
-                exception_file.write('{}\n'.format(k))
-    print('\n# Exception file created.')
+    vocab_counter.write(vocab_file or alice.vocab_file, exception_file or alice.exception_file)
+    end_time = datetime.now()
+    elapsed_time = (end_time - start_time)
+    print('\r# {} vocabs generated. Total time took {}.'.format(
+        len(vocab_counter.vocab_list), str(elapsed_time).split('.')[0]))
+    print('# Exception file created.')
 
 
 if __name__ == '__main__':